@@ -3,7 +3,14 @@ from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_migrate import Migrate
 from models import db
-from services.email_service import mail # Import the mail instance
+from services.email_service import mail, mail_pool, mail_outbox # Import the mail instance
+from services.search import init_search_index
+from services.cache import response_cache
+from services.events import event_bus
+from services.passwords import password_hasher
+from services.json_provider import FastJSONProvider
+from services.storage import storage
+from services.images import image_pipeline
 from routes.auth import auth_bp, jwt
 from routes.properties import properties_bp
 from routes.users import users_bp
@@ -12,6 +19,8 @@ from routes.upload import upload_bp
 from routes.favourites import favourites_bp
 from routes.chat import chat_bp
 from config import Config
+from celery_app import create_celery_app
+from commands import properties_cli, passwords_cli
 
 migrate = Migrate()
 
@@ -22,12 +31,21 @@ def create_app(config_class=Config):
     
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = FastJSONProvider(app) # orjson when installed, stdlib json otherwise
 
     # Initialize Flask extensions here
     mail.init_app(app)  # Initialize Flask-Mail
+    mail_pool.init_app(app)
+    mail_outbox.init_app(app) # Batches queued emails, see services/email_service.py
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app) # Initialize JWTManager
+    response_cache.init_app(app)
+    event_bus.init_app(app)
+    password_hasher.init_app(app) # bcrypt pool and work factor (BCRYPT_ROUNDS)
+    storage.init_app(app) # Image storage backend, see services/storage.py
+    image_pipeline.init_app(app) # Thumbnail/medium/large WebP derivatives of uploaded images
+    create_celery_app(app) # Background tasks (emails), see services/tasks.py
     CORS(app, origins=['http://localhost:3310', 'https://realestate.cyberwizdev.com.ng'], supports_credentials=True)
 
     # Registering blueprints
@@ -39,6 +57,10 @@ def create_app(config_class=Config):
     app.register_blueprint(upload_bp, url_prefix='/api/upload')
     app.register_blueprint(chat_bp, url_prefix='/api/chat')
 
+    # CLI commands (flask properties import/export, flask passwords calibrate)
+    app.cli.add_command(properties_cli)
+    app.cli.add_command(passwords_cli)
+
     # Error handlers
     @app.errorhandler(400)
     def bad_request(error):
@@ -48,6 +70,22 @@ def create_app(config_class=Config):
     def not_found(error):
         return jsonify({'error': 'Not Found', 'message': error.description}), 404
 
+    @app.errorhandler(413)
+    def request_too_large(error):
+        return jsonify({'error': 'Request Entity Too Large', 'message': error.description}), 413
+
+    @app.errorhandler(429)
+    def too_many_requests(error):
+        response = jsonify({'error': 'Too Many Requests', 'message': error.description})
+        response.headers['Retry-After'] = '1'
+        return response, 429
+
+    @app.errorhandler(503)
+    def service_unavailable(error):
+        response = jsonify({'error': 'Service Unavailable', 'message': error.description})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
     @app.errorhandler(500)
     def internal_server_error(error):
         app.logger.error('Server Error: %s', error)
@@ -58,10 +96,12 @@ def create_app(config_class=Config):
     app.logger.info("Application started")
     with app.app_context():
          db.create_all()
+         init_search_index()
 
     return app
 
 app = create_app()
+celery = app.extensions['celery'] # For the worker: celery -A app:celery worker
 
 if __name__ == '__main__':
     # This block is for development purposes only.
@@ -0,0 +1,74 @@
+"""
+Benchmark of the image derivative pipeline (services/images.py): time to
+decode a listing photo and render its thumbnail/medium/large WebP variants,
+sequentially and on a pool sized to the CPU count, as images per second.
+
+Works on generated photos, so it needs neither storage nor a database:
+
+    python -m benchmarks.image_derivatives
+    python -m benchmarks.image_derivatives --images 48 --width 4000 --height 3000 --workers 8
+"""
+import argparse
+import io
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from services.images import render_derivatives
+
+
+def make_photo(width, height, seed):
+    """A JPEG with gradients, shapes and noise, so it compresses like a real photo rather than a flat fill."""
+    rng = random.Random(seed)
+    picture = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+    draw = ImageDraw.Draw(picture)
+    for _ in range(60):
+        x, y = rng.randrange(width), rng.randrange(height)
+        size = rng.randrange(width // 20, width // 4)
+        draw.ellipse((x, y, x + size, y + size), fill=tuple(rng.randrange(256) for _ in range(3)))
+    noise = Image.effect_noise((width, height), 40).convert('RGB')
+    picture = Image.blend(picture, noise, 0.25).filter(ImageFilter.SMOOTH)
+    buffer = io.BytesIO()
+    picture.save(buffer, 'JPEG', quality=88)
+    return buffer.getvalue()
+
+
+def timed_render(data):
+    started = time.perf_counter()
+    render_derivatives(data)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=24, help='photos processed per run')
+    parser.add_argument('--width', type=int, default=4032, help='source photo width (a 12MP phone photo by default)')
+    parser.add_argument('--height', type=int, default=3024)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='pool size for the parallel run')
+    options = parser.parse_args()
+
+    photos = [make_photo(options.width, options.height, seed) for seed in range(min(options.images, 4))]
+    jobs = [photos[i % len(photos)] for i in range(options.images)]
+    print(f"{options.images} photos of {options.width}x{options.height} (~{len(photos[0]) // 1024} KB JPEG each)")
+
+    started = time.perf_counter()
+    timings = [timed_render(data) for data in jobs]
+    sequential = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options.workers) as pool:
+        parallel_timings = list(pool.map(timed_render, jobs))
+    parallel = time.perf_counter() - started
+
+    print(f"{'run':<24}{'images/s':>10}{'p50 ms':>10}{'max ms':>10}")
+    print(f"{'sequential':<24}{options.images / sequential:>10.1f}{statistics.median(timings):>10.0f}{max(timings):>10.0f}")
+    label = f'pool of {options.workers}'
+    print(f"{label:<24}{options.images / parallel:>10.1f}{statistics.median(parallel_timings):>10.0f}{max(parallel_timings):>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark of GET /api/properties payload size and latency for the full
+Property.serialize() against sparse fieldsets (?view=card, ?fields=).
+
+Seeds properties with realistic descriptions and several images each into the
+database at DATABASE_URL, then requests the same pages through the Flask test
+client with the response cache disabled, reporting bytes per page and p50/p99
+latencies. Run from the server directory against a scratch database:
+
+    DATABASE_URL=sqlite:////tmp/listing_payload.db python -m benchmarks.listing_payload
+    python -m benchmarks.listing_payload --rows 5000 --page-size 50 --runs 200 --no-seed
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select
+
+from app import app
+from models import db, User, Property, Image
+from services.cache import response_cache
+
+CITIES = [('Lagos', 'Lagos'), ('Ikeja', 'Lagos'), ('Abuja', 'FCT'), ('Ibadan', 'Oyo'), ('Enugu', 'Enugu')]
+IMAGES_PER_PROPERTY = 8
+DESCRIPTION_WORDS = 250 # Roughly what agents write
+
+VARIANTS = {
+    'full': {},
+    'view=card': {'view': 'card'},
+    'fields=title,price': {'fields': 'title,price'},
+}
+
+
+def seed(rows, batch_size=1000):
+    owner = User.query.filter_by(username='bench_owner').first()
+    if not owner:
+        owner = User(username='bench_owner', email='bench_owner@example.com', password='!', role='user')
+        db.session.add(owner)
+        db.session.commit()
+
+    now = datetime.now(timezone.utc)
+    rng = random.Random(42)
+    words = ['spacious', 'bright', 'renovated', 'garden', 'quiet', 'estate', 'kitchen', 'parking', 'security', 'view']
+    for start in range(0, rows, batch_size):
+        batch = []
+        for i in range(start, min(start + batch_size, rows)):
+            city, state = rng.choice(CITIES)
+            batch.append({
+                'user_id': owner.id,
+                'title': f'Benchmark listing {i}',
+                'description': ' '.join(rng.choice(words) for _ in range(DESCRIPTION_WORDS)),
+                'address': f'{i} Benchmark Road',
+                'city': city,
+                'state': state,
+                'zip_code': f'{rng.randint(100000, 999999)}',
+                'price': float(rng.randint(5000, 2000000)),
+                'property_type': 'apartment',
+                'status': 'for_sale',
+                'bedrooms': rng.randint(0, 7),
+                'bathrooms': rng.randint(1, 5),
+                'area': float(rng.randint(30, 900)),
+                'amenities': 'pool, gym, generator, borehole',
+                'created_at': now - timedelta(minutes=i),
+                'updated_at': now - timedelta(minutes=i),
+            })
+        ids = db.session.scalars(insert(Property).returning(Property.id, sort_by_parameter_order=True), batch).all()
+        db.session.execute(insert(Image), [
+            {
+                'property_id': property_id,
+                'url': f'https://images.example.com/properties/{property_id}/{n}.jpg',
+                'derivatives': {
+                    size: {'url': f'https://images.example.com/derivatives/{property_id}/{n}/{size}.webp', 'width': edge, 'height': edge * 3 // 4}
+                    for size, edge in (('thumbnail', 320), ('medium', 800), ('large', 1600))
+                },
+            }
+            for property_id in ids for n in range(IMAGES_PER_PROPERTY)
+        ])
+        db.session.commit()
+        print(f'  seeded {min(start + batch_size, rows):,}/{rows:,}', end='\r', flush=True)
+    print()
+
+
+def time_variants(client, page_size, runs):
+    results = {}
+    for name, params in VARIANTS.items():
+        query = dict(params, page_size=page_size)
+        timings = []
+        size = 0
+        for _ in range(runs):
+            started = time.perf_counter()
+            response = client.get('/api/properties', query_string=query)
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.data
+            size = len(response.data)
+        timings.sort()
+        results[name] = (size, statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.99))])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000, help='number of properties to seed')
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--runs', type=int, default=100, help='timed requests per variant')
+    parser.add_argument('--no-seed', action='store_true', help='reuse rows seeded by a previous run')
+    options = parser.parse_args()
+
+    # Measure the query + serialization, not cache hits
+    app.config['CACHE_BACKEND'] = 'none'
+    response_cache.init_app(app)
+
+    with app.app_context():
+        if not options.no_seed or db.session.scalar(select(Property.id).limit(1)) is None:
+            print(f'Seeding {options.rows:,} properties...')
+            seed(options.rows)
+
+    results = time_variants(app.test_client(), options.page_size, options.runs)
+    full_size = results['full'][0]
+    print(f"\n{'variant':<22}{'bytes':>10}{'vs full':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, (size, p50, p99) in results.items():
+        print(f'{name:<22}{size:>10,}{size / full_size:>10.0%}{p50:>10.2f}{p99:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
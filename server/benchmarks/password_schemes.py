@@ -0,0 +1,47 @@
+"""
+Benchmark of password verification cost per hash scheme accepted by
+services/passwords.py: bcrypt at several work factors and the legacy werkzeug
+formats (scrypt, pbkdf2) that profile updates used to write.
+
+Needs no database:
+
+    python -m benchmarks.password_schemes
+    python -m benchmarks.password_schemes --runs 20
+"""
+import argparse
+import statistics
+import time
+
+import bcrypt
+from werkzeug.security import generate_password_hash
+
+from services.passwords import PasswordHasher
+
+PASSWORD = 'correct horse battery staple'
+
+
+def schemes():
+    for rounds in (10, 11, 12, 13):
+        yield f'bcrypt (cost {rounds})', bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+    yield 'werkzeug scrypt', generate_password_hash(PASSWORD, method='scrypt')
+    yield 'werkzeug pbkdf2:sha256', generate_password_hash(PASSWORD, method='pbkdf2:sha256')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='verifications timed per scheme')
+    options = parser.parse_args()
+
+    hasher = PasswordHasher() # Uninitialized: verifies inline, measuring the raw scheme cost
+    print(f"{'scheme':<26}{'hash length':>12}{'p50 ms':>10}{'max ms':>10}")
+    for name, hashed in schemes():
+        timings = []
+        for _ in range(options.runs):
+            started = time.perf_counter()
+            assert hasher.verify(PASSWORD, hashed)
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f'{name:<26}{len(hashed):>12}{statistics.median(timings):>10.1f}{max(timings):>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark of a GET /api/properties page's serialization cost: the previous
+hand-written Property.serialize + Flask's stdlib JSON provider against the
+precompiled serializer (services/serializers.py) + FastJSONProvider
+(services/json_provider.py, orjson when installed).
+
+Works on in-memory objects, so it needs no database:
+
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --page-size 100 --runs 500
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from models import Property, Image
+from services import json_provider
+from services.json_provider import FastJSONProvider
+
+
+def legacy_serialize(prop):
+    """Property.serialize as it was before the precompiled serializers."""
+    return {
+        'id': str(prop.id),
+        'title': prop.title,
+        'description': prop.description,
+        'price': prop.price,
+        'is_featured': prop.is_featured,
+        'location': {
+            'address': prop.address,
+            'city': prop.city,
+            'state': prop.state,
+            'zipCode': prop.zip_code,
+            'latitude': prop.latitude,
+            'longitude': prop.longitude,
+        },
+        'propertyType': prop.property_type,
+        'status': prop.status,
+        'features': {
+            'bedrooms': prop.bedrooms,
+            'bathrooms': prop.bathrooms,
+            'area': prop.area,
+            'yearBuilt': prop.year_built,
+            'parking': None,
+        },
+        'amenities': [amenity.strip() for amenity in prop.amenities.split(',')] if prop.amenities else [],
+        'images': [img.url for img in prop.images] if prop.images else [],
+        'ownerId': str(prop.user_id),
+        'createdAt': prop.created_at.isoformat() if prop.created_at else None,
+        'updatedAt': prop.updated_at.isoformat() if prop.updated_at else None,
+        'isFeatured': False
+    }
+
+
+def make_page(page_size):
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    page = []
+    for i in range(page_size):
+        prop = Property(
+            id=i + 1, user_id=7, title=f'Spacious {i % 5 + 1} bedroom house', description='Bright, quiet street. ' * 10,
+            location=None, is_featured=i % 10 == 0, address=f'{i} Admiralty Way', city='Lagos', state='Lagos',
+            zip_code='101233', latitude=6.43 + i / 1000, longitude=3.42 + i / 1000, geohash=None,
+            price=150000.0 + i, property_type='house', status='for_sale', bedrooms=i % 5 + 1, bathrooms=2,
+            area=180.5, year_built=2012, amenities='pool, gym, parking, security',
+            created_at=created + timedelta(hours=i), updated_at=created + timedelta(hours=i),
+        )
+        prop.images = [Image(id=i * 3 + n, property_id=i + 1, url=f'https://res.cloudinary.com/demo/{i}/{n}.jpg') for n in range(3)]
+        page.append(prop)
+    return page
+
+
+def time_path(app, provider, serialize, page, runs):
+    timings = []
+    with app.app_context():
+        for _ in range(runs):
+            started = time.perf_counter()
+            body = provider.response({'total': len(page), 'properties': [serialize(p) for p in page]}).get_data()
+            timings.append((time.perf_counter() - started) * 1000)
+    return body, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page-size', type=int, default=100, help='properties per listing page')
+    parser.add_argument('--runs', type=int, default=300, help='pages serialized per path')
+    options = parser.parse_args()
+
+    app = Flask(__name__)
+    page = make_page(options.page_size)
+    paths = [
+        ('dict building + stdlib json', DefaultJSONProvider(app), legacy_serialize),
+        ('precompiled + stdlib json', DefaultJSONProvider(app), Property.serialize),
+        (f"precompiled + {'orjson' if json_provider.orjson else 'stdlib json (orjson not installed)'}", FastJSONProvider(app), Property.serialize),
+    ]
+
+    baseline_body, baseline_p50 = None, None
+    print(f"{options.page_size} properties per page, {options.runs} runs")
+    print(f"{'path':<44}{'p50 ms':>10}{'p99 ms':>10}{'speedup':>10}")
+    for name, provider, serialize in paths:
+        body, timings = time_path(app, provider, serialize, page, options.runs)
+        p50 = statistics.median(timings)
+        p99 = statistics.quantiles(timings, n=100)[98]
+        if baseline_body is None:
+            baseline_body, baseline_p50 = body, p50
+        assert json.loads(body) == json.loads(baseline_body), f'{name} output differs from the previous serializer'
+        print(f'{name:<44}{p50:>10.2f}{p99:>10.2f}{baseline_p50 / p50:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
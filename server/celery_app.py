@@ -0,0 +1,36 @@
+from celery import Celery
+from flask import Flask
+
+def create_celery_app(app: Flask = None) -> Celery:
+    """
+    Creates a Celery application instance.
+    Tasks declared with @shared_task (see services/tasks.py) bind to it and run
+    inside the Flask app context. With CELERY_TASK_ALWAYS_EAGER the tasks run
+    in-process instead of going through the broker (tests, or no broker configured).
+    """
+    app = app or Flask(__name__)
+    celery = Celery(app.import_name)
+    celery.conf.update(
+        broker_url=app.config.get("CELERY_BROKER_URL", "memory://"),
+        result_backend=app.config.get("CELERY_RESULT_BACKEND"),
+        task_always_eager=app.config.get("CELERY_TASK_ALWAYS_EAGER", False),
+        task_ignore_result=True,
+        # Don't lose an email if a worker dies mid-send
+        task_acks_late=True,
+        worker_prefetch_multiplier=1,
+        # CPU-heavy image processing gets its own queue and workers:
+        # celery -A app:celery worker -Q images --concurrency=<cores>
+        task_routes={'services.tasks.generate_image_derivatives_task': {'queue': 'images'}},
+    )
+
+    class ContextTask(celery.Task):
+        """Make celery work with Flask context."""
+
+        def __call__(self, *args, **kwargs):
+            with app.app_context():
+                return self.run(*args, **kwargs)
+
+    celery.Task = ContextTask
+    celery.set_default()
+    app.extensions["celery"] = celery
+    return celery
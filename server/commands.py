@@ -0,0 +1,98 @@
+import sys
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from models import db, User, Image
+from services.cache import response_cache
+from services.property_io import FORMATS, DEFAULT_BATCH_SIZE, read_rows, import_properties, export_rows, write_csv, write_ndjson
+from services.property_query import listing_query
+from services.images import generate_derivatives, invalidate_property_images
+from services.passwords import calibrate_rounds
+
+properties_cli = AppGroup('properties', help='Bulk property import/export.')
+passwords_cli = AppGroup('passwords', help='Password hashing settings.')
+
+
+def _format_for(path, fmt):
+    if fmt:
+        return fmt
+    return 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+def _open(path, mode):
+    # newline='' leaves CSV line endings to the csv module
+    if path == '-':
+        return click.get_text_stream('stdin' if mode == 'r' else 'stdout')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+@properties_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--owner-id', type=int, required=True, help='User that will own the imported listings.')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Defaults to the file extension.')
+@click.option('--batch-size', type=click.IntRange(min=1), default=DEFAULT_BATCH_SIZE, show_default=True)
+def import_command(path, owner_id, fmt, batch_size):
+    """Import listings from a CSV or NDJSON file ('-' for stdin)."""
+    if db.session.get(User, owner_id) is None:
+        raise click.ClickException(f'User {owner_id} not found')
+    with _open(path, 'r') as stream:
+        summary = import_properties(read_rows(stream, _format_for(path, fmt)), owner_id, batch_size=batch_size)
+    if summary['imported']:
+        response_cache.invalidate_namespace('properties')
+
+    for error in summary['errors']:
+        if 'batch' in error:
+            click.echo(f"batch {error['batch']} (rows {error['firstRow']}-{error['lastRow']}): {error['error']}", err=True)
+        else:
+            click.echo(f"row {error['row']}: {error['error']}", err=True)
+    click.echo(f"Imported {summary['imported']} properties in {summary['batches']} batches, {summary['failed']} failed")
+    if summary['failed']:
+        sys.exit(1)
+
+
+@properties_cli.command('export')
+@click.argument('path', type=click.Path(dir_okay=False, writable=True, allow_dash=True), default='-')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Defaults to the file extension.')
+def export_command(path, fmt):
+    """Export every listing as CSV or NDJSON ('-' for stdout)."""
+    rows = export_rows(listing_query())
+    chunks = write_csv(rows) if _format_for(path, fmt) == 'csv' else write_ndjson(rows)
+    with _open(path, 'w') as out:
+        for chunk in chunks:
+            out.write(chunk)
+
+
+@properties_cli.command('derivatives')
+@click.option('--all', 'regenerate', is_flag=True, help='Regenerate images that already have derivatives.')
+def derivatives_command(regenerate):
+    """Generate thumbnail/medium/large derivatives for existing images."""
+    query = db.session.query(Image.id).order_by(Image.id)
+    if not regenerate:
+        query = query.filter(Image.derivatives.is_(None))
+    image_ids = [image_id for image_id, in query]
+    failed = 0
+    property_ids = set()
+    with click.progressbar(image_ids, label='Generating derivatives') as bar:
+        for image_id in bar:
+            try:
+                property_ids.add(generate_derivatives(image_id, invalidate=False))
+            except Exception as e:
+                db.session.rollback()
+                failed += 1
+                click.echo(f"\nimage {image_id}: {e}", err=True)
+    for property_id in property_ids - {None}:
+        invalidate_property_images(property_id)
+    click.echo(f"Processed {len(image_ids) - failed} images, {failed} failed")
+
+
+@passwords_cli.command('calibrate')
+@click.option('--target-ms', type=click.IntRange(min=1), help='Hash time to aim for. Defaults to BCRYPT_TARGET_MS.')
+def calibrate_command(target_ms):
+    """Suggest BCRYPT_ROUNDS for this machine. Run it once on production hardware and pin the result."""
+    target_ms = target_ms or current_app.config.get('BCRYPT_TARGET_MS', 250)
+    # Best of a few probes, so a busy moment doesn't pick a lower cost
+    rounds = max(calibrate_rounds(target_ms) for _ in range(3))
+    click.echo(f'BCRYPT_ROUNDS={rounds}')
+    current = current_app.config.get('BCRYPT_ROUNDS')
+    if current and current != rounds:
+        click.echo(f'(currently {current}; raising it rehashes passwords on their next login, lowering it keeps existing hashes)', err=True)
@@ -31,6 +31,24 @@ MAIL_DEFAULT_SENDER_ENV = os.environ.get('MAIL_DEFAULT_SENDER')
 
 FRONTEND_URL_ENV = os.environ.get('FRONTEND_URL', 'http://localhost:3310') # Default frontend URL
 
+# Celery - without a broker URL, tasks (e.g. emails) run eagerly in the web process
+CELERY_BROKER_URL_ENV = os.environ.get('CELERY_BROKER_URL')
+CELERY_RESULT_BACKEND_ENV = os.environ.get('CELERY_RESULT_BACKEND')
+
+# Gunicorn worker processes (gunicorn reads WEB_CONCURRENCY as its --workers default, see Dockerfile)
+WEB_CONCURRENCY_ENV = int(os.environ.get('WEB_CONCURRENCY', '1'))
+
+# Response cache - 'memory' (per worker), 'redis' (shared, needs CACHE_REDIS_URL; the default with several workers) or 'null' to disable
+CACHE_BACKEND_ENV = os.environ.get('CACHE_BACKEND', 'redis' if WEB_CONCURRENCY_ENV > 1 else 'memory')
+CACHE_REDIS_URL_ENV = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+# Realtime chat events - 'memory' (single worker only) or 'redis' (fan-out across workers, the default with several workers)
+EVENTS_BACKEND_ENV = os.environ.get('EVENTS_BACKEND', 'redis' if WEB_CONCURRENCY_ENV > 1 else 'memory')
+EVENTS_REDIS_URL_ENV = os.environ.get('EVENTS_REDIS_URL', CACHE_REDIS_URL_ENV)
+
+# Image storage - 'cloudinary', 'local' (files under STORAGE_LOCAL_ROOT) or 's3' (any S3-compatible service, needs boto3)
+STORAGE_BACKEND_ENV = os.environ.get('STORAGE_BACKEND', 'cloudinary')
+
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', DATABASE_URL)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -43,6 +61,8 @@ class Config:
     JWT_COOKIE_CSRF_PROTECT = False
 
     JWT_ACCESS_COOKIE_PATH = '/'  # Ensures it's accessible across your site
+    # Seconds to cache the current user's profile/role/is_active across requests (0 = off, one query per request)
+    AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '0'))
     # JWT_COOKIE_HTTPONLY = True # Default and recommended for access/refresh tokens
                                  # CSRF cookies are non-HttpOnly by default.
                                  # Set to False only if you explicitly need JS to read access/refresh tokens,
@@ -60,9 +80,63 @@ class Config:
     MAIL_USE_TLS = MAIL_USE_TLS_ENV.lower() in ('true', '1', 't')
     MAIL_USE_SSL = MAIL_USE_SSL_ENV.lower() in ('true', '1', 't')
     MAIL_DEFAULT_SENDER = MAIL_DEFAULT_SENDER_ENV if MAIL_DEFAULT_SENDER_ENV else MAIL_USERNAME_ENV # Often defaults to username
+    # SMTP connection pool (services/mail_pool.py)
+    MAIL_POOL_SIZE = int(os.getenv('MAIL_POOL_SIZE', '2')) # Idle connections kept open per worker
+    MAIL_POOL_IDLE_TIMEOUT = int(os.getenv('MAIL_POOL_IDLE_TIMEOUT', '60')) # Seconds
+    # Queued emails are collected for up to MAIL_BATCH_WINDOW seconds (0 = send each on its own) or MAIL_BATCH_SIZE emails
+    MAIL_BATCH_WINDOW = float(os.getenv('MAIL_BATCH_WINDOW', '1.0'))
+    MAIL_BATCH_SIZE = int(os.getenv('MAIL_BATCH_SIZE', '50'))
 
     FRONTEND_URL = FRONTEND_URL_ENV
 
+    # GET /api/properties: larger ?page_size= values are clamped to this
+    MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', '100'))
+
+    # Password hashing (services/passwords.py)
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12')) # Work factor shared by all workers; `flask passwords calibrate` suggests one
+    BCRYPT_TARGET_MS = int(os.getenv('BCRYPT_TARGET_MS', '250')) # Calibration target per hash
+    BCRYPT_POOL_SIZE = int(os.getenv('BCRYPT_POOL_SIZE', '0')) or None # Hashing threads per worker, defaults to CPU count
+    BCRYPT_QUEUE_SIZE = int(os.getenv('BCRYPT_QUEUE_SIZE', '8')) # Requests allowed to wait before answering 429
+
+    # Celery task queue (worker: celery -A app:celery worker)
+    CELERY_BROKER_URL = CELERY_BROKER_URL_ENV or 'memory://'
+    CELERY_RESULT_BACKEND = CELERY_RESULT_BACKEND_ENV
+    CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False' if CELERY_BROKER_URL_ENV else 'True').lower() in ('true', '1', 't')
+
+    # Response cache for public property endpoints
+    CACHE_BACKEND = CACHE_BACKEND_ENV
+    CACHE_REDIS_URL = CACHE_REDIS_URL_ENV
+    CACHE_DEFAULT_TTL = int(os.getenv('CACHE_DEFAULT_TTL', '30')) # Seconds
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '1024'))
+    CACHE_MEMORY_MAX_TTL = int(os.getenv('CACHE_MEMORY_MAX_TTL', '5')) # TTL cap for the per-worker memory backend with several workers
+
+    WEB_CONCURRENCY = WEB_CONCURRENCY_ENV
+
+    # Realtime chat stream (GET /api/chat/stream)
+    EVENTS_BACKEND = EVENTS_BACKEND_ENV
+    EVENTS_REDIS_URL = EVENTS_REDIS_URL_ENV
+    EVENTS_KEEPALIVE_SECONDS = int(os.getenv('EVENTS_KEEPALIVE_SECONDS', '15'))
+    # Open streams per worker, each holding a thread; keep below gunicorn's --threads (0 = no limit)
+    EVENTS_MAX_STREAMS = int(os.getenv('EVENTS_MAX_STREAMS', '8'))
+
+    # Image uploads (services/storage.py)
+    STORAGE_BACKEND = STORAGE_BACKEND_ENV
+    STORAGE_LOCAL_ROOT = os.getenv('STORAGE_LOCAL_ROOT') # Defaults to <instance>/uploads
+    STORAGE_PUBLIC_URL = os.getenv('STORAGE_PUBLIC_URL', '/api/upload/files') # Base URL local files are served from
+    S3_BUCKET = os.getenv('S3_BUCKET')
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL') # For S3-compatible services; None means AWS
+    S3_REGION = os.getenv('S3_REGION')
+    S3_PUBLIC_URL = os.getenv('S3_PUBLIC_URL') # CDN/bucket URL; defaults to <endpoint>/<bucket>
+    UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', str(10 * 1024 * 1024)))
+    # Request body caps, enforced by Werkzeug before a view reads the body: one image plus multipart overhead,
+    # and the non-file form fields Werkzeug buffers in memory. POST /api/properties/import uses IMPORT_MAX_BYTES.
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', str(UPLOAD_MAX_BYTES + 64 * 1024)))
+    MAX_FORM_MEMORY_SIZE = int(os.getenv('MAX_FORM_MEMORY_SIZE', str(64 * 1024)))
+    IMPORT_MAX_BYTES = int(os.getenv('IMPORT_MAX_BYTES', str(256 * 1024 * 1024)))
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', str(64 * 1024))) # Bytes read per chunk when streaming to storage
+    UPLOAD_TOKEN_TTL = int(os.getenv('UPLOAD_TOKEN_TTL', '900')) # Seconds a direct upload token stays valid
+    IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', '0')) or None # In-process derivative threads without a broker, defaults to CPU count
+
     CLOUDINARY_API_KEY = CLOUDINARY_API_KEY
     CLOUDINARY_API_SECRET = CLOUDINARY_API_SECRET
     CLOUDINARY_CLOUD_NAME = CLOUDINARY_CLOUD_NAME
@@ -0,0 +1,31 @@
+"""Add fulltext index to property for keyword search
+
+Revision ID: 3b1f0e7a9c42
+Revises: c6749e266686
+Create Date: 2025-06-12 10:14:02.318544
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b1f0e7a9c42'
+down_revision = 'c6749e266686'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FULLTEXT is MySQL-only; SQLite builds its FTS5 table at startup (services/search.py)
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.create_index('ix_property_fulltext', ['title', 'description', 'amenities'], unique=False, mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.drop_index('ix_property_fulltext')
@@ -0,0 +1,26 @@
+"""Add (chat_id, id) index to message for incremental sync
+
+Revision ID: 5e7a9b3d1c20
+Revises: 8d4c2a61f0b7
+Create Date: 2025-06-16 18:27:11.904316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e7a9b3d1c20'
+down_revision = '8d4c2a61f0b7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.create_index('ix_message_chat_id_id', ['chat_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_chat_id_id')
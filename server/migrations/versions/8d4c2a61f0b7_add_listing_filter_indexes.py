@@ -0,0 +1,78 @@
+"""Add composite indexes for listing filters, inquiries, chats and favorites
+
+Revision ID: 8d4c2a61f0b7
+Revises: 3b1f0e7a9c42
+Create Date: 2025-06-14 09:02:47.551203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4c2a61f0b7'
+down_revision = '3b1f0e7a9c42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.create_index('ix_property_created_at', ['created_at'], unique=False)
+        batch_op.create_index('ix_property_price', ['price'], unique=False)
+        batch_op.create_index('ix_property_featured_created', ['is_featured', 'created_at'], unique=False)
+        batch_op.create_index('ix_property_type_status_price', ['property_type', 'status', 'price'], unique=False)
+        batch_op.create_index('ix_property_status_price', ['status', 'price'], unique=False)
+        batch_op.create_index('ix_property_bedrooms_price', ['bedrooms', 'price'], unique=False)
+        batch_op.create_index('ix_property_city_state', ['city', 'state'], unique=False)
+        batch_op.create_index('ix_property_user_created', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.create_index('ix_message_chat_created', ['chat_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('chat', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_sender_updated', ['sender_id', 'updated_at'], unique=False)
+        batch_op.create_index('ix_chat_receiver_updated', ['receiver_id', 'updated_at'], unique=False)
+
+    with op.batch_alter_table('inquiry', schema=None) as batch_op:
+        batch_op.create_index('ix_inquiry_property_created', ['property_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_inquiry_user_created', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_inquiry_created_at', ['created_at'], unique=False)
+
+    # Drop duplicate favorites (keeping the oldest) before enforcing uniqueness.
+    # The derived table is required by MySQL, which can't select from the table being deleted from.
+    op.execute(
+        "DELETE FROM favorite WHERE id NOT IN ("
+        "SELECT id FROM (SELECT MIN(id) AS id FROM favorite GROUP BY user_id, property_id) AS keep)"
+    )
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_favorite_user_property', ['user_id', 'property_id'])
+        batch_op.create_index('ix_favorite_property', ['property_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        batch_op.drop_index('ix_favorite_property')
+        batch_op.drop_constraint('uq_favorite_user_property', type_='unique')
+
+    with op.batch_alter_table('inquiry', schema=None) as batch_op:
+        batch_op.drop_index('ix_inquiry_created_at')
+        batch_op.drop_index('ix_inquiry_user_created')
+        batch_op.drop_index('ix_inquiry_property_created')
+
+    with op.batch_alter_table('chat', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_receiver_updated')
+        batch_op.drop_index('ix_chat_sender_updated')
+
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_chat_created')
+
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.drop_index('ix_property_user_created')
+        batch_op.drop_index('ix_property_city_state')
+        batch_op.drop_index('ix_property_bedrooms_price')
+        batch_op.drop_index('ix_property_status_price')
+        batch_op.drop_index('ix_property_type_status_price')
+        batch_op.drop_index('ix_property_featured_created')
+        batch_op.drop_index('ix_property_price')
+        batch_op.drop_index('ix_property_created_at')
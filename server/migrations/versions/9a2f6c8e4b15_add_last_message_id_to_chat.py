@@ -0,0 +1,34 @@
+"""Add last_message_id to chat and backfill it
+
+Revision ID: 9a2f6c8e4b15
+Revises: 5e7a9b3d1c20
+Create Date: 2025-06-18 11:45:36.120877
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a2f6c8e4b15'
+down_revision = '5e7a9b3d1c20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('chat', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_message_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_chat_last_message_id', 'message', ['last_message_id'], ['id'])
+
+    # Backfill: point every existing chat at its newest message
+    op.execute(
+        "UPDATE chat SET last_message_id = "
+        "(SELECT MAX(message.id) FROM message WHERE message.chat_id = chat.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('chat', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_chat_last_message_id', type_='foreignkey')
+        batch_op.drop_column('last_message_id')
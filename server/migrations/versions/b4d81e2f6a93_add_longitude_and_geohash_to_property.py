@@ -0,0 +1,32 @@
+"""Add longitude and geohash to property for geo search
+
+Revision ID: b4d81e2f6a93
+Revises: 9a2f6c8e4b15
+Create Date: 2025-06-21 15:08:52.667091
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4d81e2f6a93'
+down_revision = '9a2f6c8e4b15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # No backfill: geohash needs both coordinates and longitude is new, so it is
+    # filled in as listings are saved with a longitude.
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+        batch_op.create_index('ix_property_geohash', ['geohash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('property', schema=None) as batch_op:
+        batch_op.drop_index('ix_property_geohash')
+        batch_op.drop_column('geohash')
+        batch_op.drop_column('longitude')
@@ -0,0 +1,31 @@
+"""Add dimensions and derivative URLs to image
+
+Revision ID: d7e3a1f94b26
+Revises: b4d81e2f6a93
+Create Date: 2025-06-23 10:31:17.402518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7e3a1f94b26'
+down_revision = 'b4d81e2f6a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing images keep serving their originals until derivatives are generated for them
+    with op.batch_alter_table('image', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('width', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('height', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('derivatives', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('image', schema=None) as batch_op:
+        batch_op.drop_column('derivatives')
+        batch_op.drop_column('height')
+        batch_op.drop_column('width')
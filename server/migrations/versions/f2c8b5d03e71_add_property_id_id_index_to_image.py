@@ -0,0 +1,26 @@
+"""Add (property_id, id) index to image for listing image loads
+
+Revision ID: f2c8b5d03e71
+Revises: d7e3a1f94b26
+Create Date: 2025-06-24 09:12:48.630275
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8b5d03e71'
+down_revision = 'd7e3a1f94b26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('image', schema=None) as batch_op:
+        batch_op.create_index('ix_image_property_id_id', ['property_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('image', schema=None) as batch_op:
+        batch_op.drop_index('ix_image_property_id_id')
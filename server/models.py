@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, timezone
+from services.serializers import compile_serializer, constant, isoformat, comma_list, nested
 
 db = SQLAlchemy()
 
@@ -28,21 +29,39 @@ class User(db.Model):
     reset_token_expire = db.Column(db.DateTime, nullable=True)
 
     def serialize(self):
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'phone_number': self.phone_number,
-            'profile_image': self.profile_image,
-            'is_active': self.is_active,
-            'role': self.role,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        return _serialize_user(self)
+
+_serialize_user = compile_serializer({
+    'id': 'id',
+    'username': 'username',
+    'email': 'email',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'phone_number': 'phone_number',
+    'profile_image': 'profile_image',
+    'is_active': 'is_active',
+    'role': 'role',
+    'created_at': ('created_at', isoformat),
+    'updated_at': ('updated_at', isoformat),
+}, 'User.serialize')
 
 class Property(db.Model):
+    __table_args__ = (
+        # Keyword search index (MySQL only); SQLite uses the FTS5 table managed in services/search.py
+        db.Index('ix_property_fulltext', 'title', 'description', 'amenities', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+        # Listing filters/sorts used by GET /api/properties (see services/property_query.py)
+        db.Index('ix_property_created_at', 'created_at'),
+        db.Index('ix_property_price', 'price'),
+        db.Index('ix_property_featured_created', 'is_featured', 'created_at'),
+        db.Index('ix_property_type_status_price', 'property_type', 'status', 'price'),
+        db.Index('ix_property_status_price', 'status', 'price'),
+        db.Index('ix_property_bedrooms_price', 'bedrooms', 'price'),
+        db.Index('ix_property_city_state', 'city', 'state'),
+        db.Index('ix_property_user_created', 'user_id', 'created_at'),
+        # Spatial pruning for near=/bbox= searches (prefix ranges)
+        db.Index('ix_property_geohash', 'geohash'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
@@ -54,6 +73,8 @@ class Property(db.Model):
     state = db.Column(db.String(100), nullable=False)
     zip_code = db.Column(db.String(20), nullable=False)
     latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), nullable=True) # Derived from latitude/longitude on save, see services/geo.py
     price = db.Column(db.Float, nullable=False)
     property_type = db.Column(db.String(50))
     status = db.Column(db.String(50))
@@ -71,53 +92,101 @@ class Property(db.Model):
     images = db.relationship('Image', backref='property', lazy=True, cascade="all, delete-orphan")
 
     def serialize(self):
-        return {
-            'id': str(self.id),
-            'title': self.title,
-            'description': self.description,
-            # 'user': self.user.serialize() if self.user else None, # Requires user relationship to be loaded
-            'price': self.price,
-            'is_featured': self.is_featured,
-            'location': {
-                'address': self.address,
-                'city': self.city,
-                'state': self.state,
-                'zipCode': self.zip_code,
-                'latitude': self.latitude,
-                'longitude': None,  # Add if you have longitude data
-            },
-            'propertyType': self.property_type,
-            'status': self.status,
-            'features': {
-                'bedrooms': self.bedrooms,
-                'bathrooms': self.bathrooms,
-                'area': self.area,
-                'yearBuilt': self.year_built,
-                'parking': None, # Add if you have parking data
-            },
-            # Assuming amenities are stored as a comma-separated string
-            # If stored as JSON, you might use json.loads(self.amenities)
-            'amenities': [amenity.strip() for amenity in self.amenities.split(',')] if self.amenities else [],
-            'images': [img.url for img in self.images] if self.images else [],
-            'ownerId': str(self.user_id),
-            'createdAt': self.created_at.isoformat() if self.created_at else None,
-            'updatedAt': self.updated_at.isoformat() if self.updated_at else None,
-            'isFeatured': False # Add logic if you have a way to determine this
-        }
+        return _serialize_property(self)
+
+# Also the source of the sparse fieldsets (?fields=, ?view=) in services/property_query.py
+PROPERTY_SHAPE = {
+    'id': ('id', str),
+    'title': 'title',
+    'description': 'description',
+    # 'user': self.user.serialize() if self.user else None, # Requires user relationship to be loaded
+    'price': 'price',
+    'is_featured': 'is_featured',
+    'location': {
+        'address': 'address',
+        'city': 'city',
+        'state': 'state',
+        'zipCode': 'zip_code',
+        'latitude': 'latitude',
+        'longitude': 'longitude',
+    },
+    'propertyType': 'property_type',
+    'status': 'status',
+    'features': {
+        'bedrooms': 'bedrooms',
+        'bathrooms': 'bathrooms',
+        'area': 'area',
+        'yearBuilt': 'year_built',
+        'parking': constant(None), # Add if you have parking data
+    },
+    # Amenities are stored as a comma-separated string
+    'amenities': ('amenities', comma_list),
+    'images': ('images', lambda images: [img.url for img in images] if images else []),
+    'ownerId': ('user_id', str),
+    'createdAt': ('created_at', isoformat),
+    'updatedAt': ('updated_at', isoformat),
+    'isFeatured': constant(False), # Add logic if you have a way to determine this
+}
+_serialize_property = compile_serializer(PROPERTY_SHAPE, 'Property.serialize')
+
+@db.event.listens_for(Property, 'before_insert')
+@db.event.listens_for(Property, 'before_update')
+def _set_property_geohash(mapper, connection, target):
+    # Keep the spatial index column in sync with the coordinates
+    from services.geo import encode_geohash
+    if target.latitude is not None and target.longitude is not None:
+        target.geohash = encode_geohash(float(target.latitude), float(target.longitude))
+    else:
+        target.geohash = None
 
 class Image(db.Model):
+    __table_args__ = (
+        # Batch image loads for a page (property_id IN ...) and each property's first image (Property.cover_image)
+        db.Index('ix_image_property_id_id', 'property_id', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     property_id = db.Column(db.Integer, db.ForeignKey('property.id'), nullable=False)
     url = db.Column(db.String(200), nullable=False)
+    # Filled in by the derivative pipeline (services/images.py) after upload
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
+    derivatives = db.Column(db.JSON, nullable=True) # {size: {'url', 'width', 'height'}} for each IMAGE_SIZES entry
 
     def serialize(self):
-        return {
-            'id': self.id,
-            'property_id': self.property_id,
-            'url': self.url
-        }
+        return _serialize_image(self)
+
+_serialize_image = compile_serializer({
+    'id': 'id',
+    'property_id': 'property_id',
+    'url': 'url',
+    'width': 'width',
+    'height': 'height',
+    'derivatives': 'derivatives',
+}, 'Image.serialize')
+
+# A property's first image on its own, so listing cards can load one image per property instead of all of them
+_cover_image = Image.__table__.alias('cover_image')
+Property.cover_image = db.relationship(
+    Image,
+    primaryjoin=db.and_(
+        Image.property_id == Property.id,
+        Image.id == db.select(db.func.min(_cover_image.c.id))
+            .where(_cover_image.c.property_id == Image.property_id)
+            .correlate(Image)
+            .scalar_subquery(),
+    ),
+    viewonly=True,
+    uselist=False,
+)
 
 class Message(db.Model):
+    __table_args__ = (
+        db.Index('ix_message_chat_created', 'chat_id', 'created_at'),
+        # Incremental sync / history paging in get_messages (since_id, before_id)
+        db.Index('ix_message_chat_id_id', 'chat_id', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     message = db.Column(db.Text, nullable=False)
     chat_id = db.Column(db.Integer, db.ForeignKey('chat.id'), nullable=False)
@@ -126,18 +195,26 @@ class Message(db.Model):
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
 
     def serialize(self):
-        return {
-            'id': self.id,
-            'message': self.message,
-            'chat_id': self.chat_id,
-            'sender_id': self.sender_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        return _serialize_message(self)
+
+_serialize_message = compile_serializer({
+    'id': 'id',
+    'message': 'message',
+    'chat_id': 'chat_id',
+    'sender_id': 'sender_id',
+    'created_at': ('created_at', isoformat),
+    'updated_at': ('updated_at', isoformat),
+}, 'Message.serialize')
 
 class Chat(db.Model):
+    __table_args__ = (
+        # Inbox lookups: chats where the user is either party, newest first
+        db.Index('ix_chat_sender_updated', 'sender_id', 'updated_at'),
+        db.Index('ix_chat_receiver_updated', 'receiver_id', 'updated_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    messages = db.relationship('Message', backref='chat', lazy=True)
+    messages = db.relationship('Message', backref='chat', lazy=True, foreign_keys='Message.chat_id')
     # Link to the Inquiry that originated this chat (if any)
     inquiry_id = db.Column(db.Integer, db.ForeignKey('inquiry.id'), nullable=True, unique=True)
     inquiry = db.relationship('Inquiry', foreign_keys=[inquiry_id], backref=db.backref('chat', uselist=False))
@@ -151,31 +228,40 @@ class Chat(db.Model):
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     is_read = db.Column(db.Boolean, default=False, nullable=False) # Has the recipient of the last message read it?
     last_message_sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True) # Who sent the very last message
-
-    def _retrieve_last_message(self):
-        return Message.query.filter_by(chat_id=self.id).order_by(Message.created_at.desc()).first().serialize()
-
+    # Denormalized pointer to the newest message, kept up to date by whoever adds a message.
+    # use_alter/post_update break the chat <-> message foreign key cycle.
+    last_message_id = db.Column(db.Integer, db.ForeignKey('message.id', use_alter=True, name='fk_chat_last_message_id'), nullable=True)
+    last_message = db.relationship('Message', foreign_keys=[last_message_id], post_update=True)
 
     def serialize(self, include_property=False):
-        return {
-            'id': self.id,
-            'sender_id': self.sender_id,
-            'sender': self.sender.serialize() if self.sender else None,
-            'receiver_id': self.receiver_id,
-            'receiver': self.receiver.serialize() if self.receiver else None,
-            'property_id': self.property_id,
-            'last_message': self._retrieve_last_message(),
-            'is_read': self.is_read,
-            'last_message_sender_id': self.last_message_sender_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            # You might want to include message_ids or inquiry_id if needed, e.g.:
-            'property': self.property.serialize() if include_property and self.property else None,
-        # 'message_ids': [msg.id for msg in self.messages],
-        # 'inquiry_id': self.inquiry.id if self.inquiry else None
-        }
+        data = _serialize_chat(self)
+        # You might want to include message_ids or inquiry_id if needed, e.g.:
+        data['property'] = self.property.serialize() if include_property and self.property else None
+        # data['message_ids'] = [msg.id for msg in self.messages]
+        # data['inquiry_id'] = self.inquiry.id if self.inquiry else None
+        return data
+
+_serialize_chat = compile_serializer({
+    'id': 'id',
+    'sender_id': 'sender_id',
+    'sender': ('sender', nested),
+    'receiver_id': 'receiver_id',
+    'receiver': ('receiver', nested),
+    'property_id': 'property_id',
+    'last_message': ('last_message', nested),
+    'is_read': 'is_read',
+    'last_message_sender_id': 'last_message_sender_id',
+    'created_at': ('created_at', isoformat),
+    'updated_at': ('updated_at', isoformat),
+}, 'Chat.serialize')
 
 class Inquiry(db.Model):
+    __table_args__ = (
+        db.Index('ix_inquiry_property_created', 'property_id', 'created_at'),
+        db.Index('ix_inquiry_user_created', 'user_id', 'created_at'),
+        db.Index('ix_inquiry_created_at', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), nullable=False)
@@ -189,20 +275,30 @@ class Inquiry(db.Model):
     # Relationship to Property
     property = db.relationship('Property', backref=db.backref('inquiries', lazy='dynamic'))
 
-    def serialize(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'email': self.email,
-            'message': self.message,
-            'property_id': self.property_id, # Keep this for direct access
-            'property': self.property.serialize() if self.property else None, # Keep serialized property for convenience
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'user_id': self.user_id,
-            'status': self.status
-        }
+    def serialize(self, include_property=True):
+        data = _serialize_inquiry(self)
+        # Keep serialized property for convenience
+        data['property'] = self.property.serialize() if include_property and self.property else None
+        return data
+
+_serialize_inquiry = compile_serializer({
+    'id': 'id',
+    'name': 'name',
+    'email': 'email',
+    'message': 'message',
+    'property_id': 'property_id', # Keep this for direct access
+    'created_at': ('created_at', isoformat),
+    'updated_at': ('updated_at', isoformat),
+    'user_id': 'user_id',
+    'status': 'status',
+}, 'Inquiry.serialize')
+
 class Favorite(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'property_id', name='uq_favorite_user_property'),
+        db.Index('ix_favorite_property', 'property_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     property_id = db.Column(db.Integer, db.ForeignKey('property.id'), nullable=False)
@@ -212,10 +308,12 @@ class Favorite(db.Model):
     # For example, you might want to track when the favorite was added or updated
 
     def serialize(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'property_id': self.property_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+        return _serialize_favorite(self)
+
+_serialize_favorite = compile_serializer({
+    'id': 'id',
+    'user_id': 'user_id',
+    'property_id': 'property_id',
+    'created_at': ('created_at', isoformat),
+    'updated_at': ('updated_at', isoformat),
+}, 'Favorite.serialize')
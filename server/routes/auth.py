@@ -1,19 +1,27 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from models import db, User
 from flask_jwt_extended import (
     create_access_token, jwt_required,
     get_jwt_identity, unset_jwt_cookies,
     set_access_cookies, JWTManager
 )
-from services.email_service import send_welcome_email, send_password_reset_email  # Import email functions
+from services.email_service import mail_outbox, welcome_email, password_reset_email  # Batched, sent by Celery workers
 from datetime import datetime, timedelta
-import bcrypt
+from services.passwords import hash_password, verify_password, needs_rehash
+from services.current_user import load_user
 import uuid
 
 auth_bp = Blueprint('auth', __name__)
 jwt = JWTManager()
 
 
+@jwt.user_lookup_loader
+def user_lookup_callback(_jwt_header, jwt_data):
+    # Loaded once per request; available to role_required and views via get_current_user()
+    return load_user(jwt_data['sub'])
+
+
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -31,8 +39,8 @@ def register():
     if User.query.filter((User.username == username) | (User.email == email)).first():
         return jsonify({"error": "Username or email already exists"}), 400
 
-    # Hash password with bcrypt
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    # Hash password with bcrypt (bounded worker pool, see services/passwords.py)
+    hashed_password = hash_password(password)
 
     user = User(
         username=username,
@@ -46,11 +54,11 @@ def register():
     db.session.add(user)
     db.session.commit()
 
-    # Send welcome email directly
+    # Queue the welcome email; batches are sent by a worker that retries with backoff if the mail server is down
     try:
-        send_welcome_email(email=user.email, username=user.username)
+        mail_outbox.queue(*welcome_email(user.email, user.username))
     except Exception as e:
-        print(f"Error sending welcome email: {e}")
+        current_app.logger.error(f"Error queueing welcome email: {e}")
         # Handle the error appropriately, e.g., log it, show a user-friendly message, or retry.
         return jsonify({"message": "User registered successfully, but there was an error sending the welcome email."}), 201  # Still return 201
 
@@ -72,9 +80,14 @@ def login():
     ).first()
 
     # Check password with bcrypt
-    if not user or not bcrypt.checkpw(password.encode('utf-8'), user.password.encode('utf-8')):
+    if not user or not verify_password(password, user.password):
         return jsonify({"error": "Invalid credentials"}), 401
 
+    # Transparently upgrade legacy (werkzeug) hashes and ones weaker than BCRYPT_ROUNDS
+    if needs_rehash(user.password):
+        user.password = hash_password(password)
+        db.session.commit()
+
     access_token = create_access_token(identity=str(user.id))
     response = jsonify(user.serialize())
 
@@ -114,11 +127,11 @@ def reset_password_request():
     setattr(user, 'reset_token_expire', expire_at)
     db.session.commit()
 
-    # Send password reset email directly
+    # Queue the password reset email
     try:
-        send_password_reset_email(email=user.email, token=reset_token)
+        mail_outbox.queue(*password_reset_email(user.email, reset_token))
     except Exception as e:
-        print(f"Error sending password reset email: {e}")
+        current_app.logger.error(f"Error queueing password reset email: {e}")
         return jsonify({"message": "If email exists in system, password reset email has been sent."}), 200 #still return 200
 
     return jsonify({"message": "If email exists in system, password reset email has been sent."}), 200
@@ -141,7 +154,7 @@ def reset_password():
         return jsonify({"error": "Token expired"}), 400
 
     # Hash new password with bcrypt
-    user.password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    user.password = hash_password(new_password)
     user.reset_token = None
     user.reset_token_expire = None
     db.session.commit()
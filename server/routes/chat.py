@@ -1,13 +1,63 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import or_
-from models import db, Chat, Message, User
+from flask import Blueprint, request, jsonify, Response, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_current_user
+from sqlalchemy import or_, func
+from sqlalchemy.orm import joinedload, selectinload, aliased
+from models import db, Chat, Message, User, Property
+from services.conditional import conditional, weak_etag
+from services.events import event_bus, user_channel, format_sse
 from datetime import datetime, timezone
 
 chat_bp = Blueprint('chat', __name__)
 
+MAX_MESSAGES_PAGE = 200
+
+
+def _chats_validators():
+    """
+    Inbox version for the current user: number of chats and the latest update of
+    the chats and of everything get_chats embeds in them (participants, property,
+    last message), so editing a property or profile changes the ETag too.
+    """
+    current_user_id = get_jwt_identity()
+    sender, receiver = aliased(User), aliased(User)
+    count, *updates = db.session.query(
+        func.count(Chat.id),
+        func.max(Chat.updated_at),
+        func.max(Property.updated_at),
+        func.max(sender.updated_at),
+        func.max(receiver.updated_at),
+        func.max(Message.updated_at),
+    ).select_from(Chat).outerjoin(
+        Property, Property.id == Chat.property_id
+    ).outerjoin(
+        sender, sender.id == Chat.sender_id
+    ).outerjoin(
+        receiver, receiver.id == Chat.receiver_id
+    ).outerjoin(
+        Message, Message.id == Chat.last_message_id
+    ).filter(
+        or_(Chat.sender_id == current_user_id, Chat.receiver_id == current_user_id)
+    ).one()
+    known = [update for update in updates if update is not None]
+    etag = weak_etag('chats', current_user_id, count, *[update.isoformat() if update else None for update in updates])
+    return etag, max(known) if known else None
+
+
+def _messages_validators(chat_id):
+    """Message list version for a chat the current user takes part in."""
+    current_user_id = int(get_jwt_identity())
+    chat = db.session.query(Chat.sender_id, Chat.receiver_id).filter(Chat.id == chat_id).first()
+    if not chat or current_user_id not in (chat.sender_id, chat.receiver_id):
+        return None # Let the view answer 404/403
+    count, last_id, last_updated = db.session.query(
+        func.count(Message.id), func.max(Message.id), func.max(Message.updated_at)
+    ).filter(Message.chat_id == chat_id).one()
+    return weak_etag('messages', chat_id, count, last_id, last_updated.isoformat() if last_updated else None), last_updated
+
+
 @chat_bp.route('', methods=['GET'])
 @jwt_required()
+@conditional(_chats_validators, private=True)
 def get_chats():
     """
     Get all chats for the current user.
@@ -16,11 +66,18 @@ def get_chats():
     current_user_id = get_jwt_identity()
     
     # Ensure the user exists
-    user = User.query.get(current_user_id)
+    user = get_current_user()
     if not user:
         return jsonify({"error": "User not found"}), 404
 
-    chats_query = Chat.query.filter(
+    # Participants, last message and property (with its images) are loaded for the
+    # whole inbox up front instead of lazily per chat
+    chats_query = Chat.query.options(
+        joinedload(Chat.sender),
+        joinedload(Chat.receiver),
+        joinedload(Chat.last_message),
+        selectinload(Chat.property).selectinload(Property.images),
+    ).filter(
         or_(Chat.sender_id == current_user_id, Chat.receiver_id == current_user_id)
     ).order_by(Chat.updated_at.desc()).all()
 
@@ -29,11 +86,19 @@ def get_chats():
 
 @chat_bp.route('/<int:chat_id>/messages', methods=['GET'])
 @jwt_required()
+@conditional(_messages_validators, private=True)
 def get_messages(chat_id):
     """
-    Retrieve all messages for a given chat.
+    Retrieve messages for a given chat, oldest first.
     Ensures the user is authorized to access the chat.
     Ensures the current user is part of the chat.
+
+    Optional query params (all served from the (chat_id, id) index):
+    - since_id: only messages newer than this id (incremental polling)
+    - before_id: only messages older than this id (paging history backwards)
+    - limit: at most this many messages (max MAX_MESSAGES_PAGE); with before_id
+      or on its own it returns the most recent ones.
+    Without any of them every message in the chat is returned.
     """
     current_user_id = int(get_jwt_identity())
     
@@ -46,7 +111,25 @@ def get_messages(chat_id):
     if chat.sender_id != current_user_id and chat.receiver_id != current_user_id:
         return jsonify({"error": "Unauthorized to view this chat"}), 403
 
-    messages = Message.query.filter_by(chat_id=chat_id).order_by(Message.created_at.asc()).all()
+    since_id = request.args.get('since_id', type=int)
+    before_id = request.args.get('before_id', type=int)
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, MAX_MESSAGES_PAGE))
+
+    query = Message.query.filter(Message.chat_id == chat_id)
+    if since_id is not None:
+        query = query.filter(Message.id > since_id)
+    if before_id is not None:
+        query = query.filter(Message.id < before_id)
+
+    if limit is not None and since_id is None:
+        # Newest `limit` messages, returned in chronological order
+        messages = query.order_by(Message.id.desc()).limit(limit).all()
+        messages.reverse()
+    else:
+        query = query.order_by(Message.id.asc())
+        messages = query.limit(limit).all() if limit is not None else query.all()
     return jsonify([message.serialize() for message in messages]), 200
 
 @chat_bp.route('/<int:chat_id>/messages', methods=['POST'])
@@ -84,12 +167,18 @@ def send_message(chat_id):
     chat.is_read = False
     # Set the sender of this last message
     chat.last_message_sender_id = current_user_id
+    chat.last_message = new_message
 
     db.session.add(new_message)
     db.session.add(chat) # to save updated_at
     db.session.commit()
 
-    return jsonify(new_message.serialize()), 201
+    # Push the new message to both participants' open streams
+    message_data = new_message.serialize()
+    for participant_id in (chat.sender_id, chat.receiver_id):
+        event_bus.publish(user_channel(participant_id), 'message', message_data)
+
+    return jsonify(message_data), 201
 
 @chat_bp.route('/<int:chat_id>/read', methods=['POST'])
 @jwt_required()
@@ -113,8 +202,49 @@ def mark_chat_as_read(chat_id):
         chat.is_read = True
         chat.updated_at = datetime.now(timezone.utc) # Optionally update timestamp
         db.session.commit()
+        # Read receipt for both participants (the other one sees their message was read)
+        receipt = {'chat_id': chat.id, 'is_read': True, 'reader_id': current_user_id}
+        for participant_id in (chat.sender_id, chat.receiver_id):
+            event_bus.publish(user_channel(participant_id), 'read', receipt)
         return jsonify({"message": "Chat marked as read", "chat": chat.serialize(include_property=True)}), 200
     elif chat.is_read:
         return jsonify({"message": "Chat already marked as read", "chat": chat.serialize(include_property=True)}), 200
     else: # User is the last sender, no action needed from them to mark as read
         return jsonify({"message": "No action needed to mark chat as read by sender of last message", "chat": chat.serialize(include_property=True)}), 200
+
+
+@chat_bp.route('/stream', methods=['GET'])
+@jwt_required()
+def stream_events():
+    """
+    Server-Sent Events stream of the current user's chat activity:
+    'message' events carry a serialized Message, 'read' events a read receipt.
+    Replaces polling get_chats/get_messages; after a reconnect clients catch up
+    with GET /<chat_id>/messages?since_id=<last seen id>. Answers 503 when this
+    worker already holds EVENTS_MAX_STREAMS streams.
+    """
+    current_user_id = int(get_jwt_identity())
+    subscription = event_bus.subscribe([user_channel(current_user_id)])
+    keepalive = current_app.config.get('EVENTS_KEEPALIVE_SECONDS', 15)
+
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                received = subscription.get(timeout=keepalive)
+                if received is None:
+                    # Comment frame keeps proxies from closing an idle connection
+                    yield ': keepalive\n\n'
+                    continue
+                event, data = received
+                yield format_sse(event, data, event_id=data.get('id') if event == 'message' else None)
+        finally:
+            subscription.close()
+
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no', # Disable nginx response buffering
+    })
+    # Frees the stream slot even if the body is never iterated (client gone before the first chunk)
+    response.call_on_close(subscription.close)
+    return response
@@ -1,14 +1,18 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, User, Favorite
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_current_user
+from sqlalchemy.exc import IntegrityError
+from models import db, Favorite
+from services.property_query import favorite_property_ids
 
 favourites_bp = Blueprint('favourites', __name__)
 
+MAX_LOOKUP_IDS = 500
+
 @favourites_bp.route('', methods=['GET'])
 @jwt_required()
 def get_favourites():
     user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = get_current_user()
     if not user:
         return jsonify({'error': 'Unauthorized'}), 401
 
@@ -17,6 +21,31 @@ def get_favourites():
     return jsonify(data)
 
 
+@favourites_bp.route('/lookup', methods=['POST'])
+@jwt_required()
+def lookup_favourites():
+    """
+    Which of the given properties the user has favourited, for the hearts on a
+    page of listing cards: {"property_ids": [1, 2, 3]} -> {"favorites": {"1": true, "2": false, ...}}.
+    """
+    data = request.get_json(silent=True) or {}
+    property_ids = data.get('property_ids')
+    user_id = get_jwt_identity()
+
+    if not isinstance(property_ids, list):
+        return jsonify({'error': 'property_ids must be a list'}), 400
+    if len(property_ids) > MAX_LOOKUP_IDS:
+        return jsonify({'error': f'At most {MAX_LOOKUP_IDS} property_ids per lookup'}), 400
+    try:
+        # Listings serialize ids as strings, so accept both
+        property_ids = [int(property_id) for property_id in property_ids]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'property_ids must be integers'}), 400
+
+    favorite_ids = favorite_property_ids(user_id, property_ids)
+    return jsonify({'favorites': {str(property_id): property_id in favorite_ids for property_id in property_ids}})
+
+
 @favourites_bp.route('', methods=['POST'])
 @jwt_required()
 def add_favourite():
@@ -26,13 +55,17 @@ def add_favourite():
 
     if not property_id:
         return jsonify({'error': 'Property ID is required'}), 400
-    if not User.query.get(user_id):
+    if not get_current_user():
         return jsonify({'error': 'Unauthorized'}), 401
     if Favorite.query.filter_by(user_id=user_id, property_id=property_id).first():
         return jsonify({'error': 'Property already in favourites'}), 400
     favourite = Favorite(user_id=user_id, property_id=property_id)
     db.session.add(favourite)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError: # A concurrent request added it after the check above (uq_favorite_user_property)
+        db.session.rollback()
+        return jsonify({'error': 'Property already in favourites'}), 400
     return jsonify(favourite.serialize()), 201
 
 
@@ -1,88 +1,101 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_current_user, verify_jwt_in_request
 from models import db, Inquiry, Property, User, Chat, Message # Added Chat and Message
-from services.email_service import send_inquiry_notification_email  # Celery task stub
+from services.email_service import mail_outbox, inquiry_notification_email  # Batched, sent by Celery workers
 from services.role_required import role_required # For authorization
-from sqlalchemy import or_ # Import or_
+from services.events import event_bus, user_channel
+from services.transactions import after_commit
+from sqlalchemy import or_, and_, select # Import or_
+from sqlalchemy.orm import joinedload, selectinload
+from services.property_query import encode_cursor, decode_cursor
+from services.streaming import STREAM_CHUNK_ROWS, json_array_chunks, json_object_chunks, streamed_json
 from datetime import datetime, timezone
 
 inquiries_bp = Blueprint('inquiries', __name__)
 
+MAX_INQUIRIES_PAGE = 500
+INQUIRY_SORT = '-created_at' # Cursor tag for the admin listing order
+
 @inquiries_bp.route('', methods=['POST'])
 def submit_inquiry():
+    """
+    Records an inquiry and, for registered inquirers, opens a chat with the
+    property owner whose first message is the inquiry. Inquiry, chat and message
+    are saved in one transaction; the agent is notified once it has committed.
+    """
     data = request.get_json()
     name = data.get('name')
     email = data.get('email')
     message = data.get('message')
     property_id = data.get('property_id')
-    
-    user = User.query.filter_by(email=email).first()
-
-    current_user_id = user.id if user else None
 
     if not all([name, email, message, property_id]):
         return jsonify({"error": "Name, email, message and property_id are required"}), 400
 
-    property_obj = Property.query.get(property_id)
-    if not property_obj:
+    # One round trip: the property (images batch-loaded for the response), the
+    # owner's email for the notification and the inquirer's account, if any
+    inquirer_id = select(User.id).where(User.email == email).scalar_subquery()
+    row = (
+        db.session.query(Property, User.email, inquirer_id.label('inquirer_id'))
+        .join(User, User.id == Property.user_id)
+        .options(selectinload(Property.images))
+        .filter(Property.id == property_id)
+        .first()
+    )
+    if not row:
         return jsonify({"error": "Property does not exist"}), 404
+    property_obj, agent_email, inquiry_user_id = row
 
-    inquiry_user_id = None
-    if current_user_id:
+    if inquiry_user_id:
+        # The email belongs to a registered user: they must be signed in to use it
         verify_jwt_in_request()
-        user_making_inquiry = User.query.get(current_user_id)
-        if user_making_inquiry:
-            inquiry_user_id = user_making_inquiry.id
-            # Optionally prefill name/email if not provided or override
-            # name = name or user_making_inquiry.first_name
-            # email = email or user_making_inquiry.email
 
+    now = datetime.now(timezone.utc)
     inquiry = Inquiry(
         name=name,
         email=email,
         message=message,
-        property_id=property_id,
+        property=property_obj,
         user_id=inquiry_user_id,
-        status='pending' # Default status
+        status='pending', # Default status
+        created_at=now,
     )
     db.session.add(inquiry)
-    db.session.commit()
 
-    user = User.query.filter_by(email=email).first()
-    # Use inquiry_user_id if available (for registered users), otherwise it's an anonymous inquiry
-    # The chat sender should be the user who made the inquiry.
-    chat_initiator_id = inquiry_user_id if inquiry_user_id else user.id if user else None # Fallback to user found by email
-    if chat_initiator_id: # Only create chat if we can identify the initiator
+    chat = None
+    if inquiry_user_id: # Only create chat if we can identify the initiator
         chat = Chat(
-            sender_id=chat_initiator_id, 
+            sender_id=inquiry_user_id, # The inquirer starts the chat
             receiver_id=property_obj.user_id,  # Property owner is the receiver
-            property_id=property_id,
-            inquiry_id=inquiry.id,  # Link the chat to the inquiry
-            last_message_sender_id=chat_initiator_id, # The inquirer sent the first "message" (the inquiry itself)
+            property_id=property_obj.id,
+            inquiry=inquiry,  # Link the chat to the inquiry
+            last_message_sender_id=inquiry_user_id, # The inquirer sent the first "message" (the inquiry itself)
             is_read=False # Property owner (receiver) has not read it yet
         )
+        # The inquiry's message is the first chat message
+        chat.last_message = Message(message=message, chat=chat, sender_id=inquiry_user_id, created_at=now)
         db.session.add(chat)
-        # Commit here to get chat.id if needed immediately, or commit once at the end
-        db.session.commit()
-
-        # Create the initial message in the chat
-        initial_chat_message = Message(
-            message=message, # Use the inquiry's message as the first chat message
-            chat_id=chat.id,
-            sender_id=chat_initiator_id, # The inquirer sent this message
-            created_at=inquiry.created_at,  # Use the inquiry's created_at for consistency
-        )
-        db.session.add(initial_chat_message)
-        db.session.commit()
 
-    # Notify the listing agent asynchronously via email (Celery task)
-    # Assuming property_obj.user is the listing agent
-    agent = User.query.get(property_obj.user_id)
-    if agent:
-        # send_inquiry_notification_email.delay(agent.email, inquiry.id)
-        pass
+    db.session.flush() # Assigns ids; everything is committed together below
+    inquiry_data = inquiry.serialize() # Serialized before commit() expires the loaded state
+
+    # Side effects run only once the data is committed
+    after_commit(_queue_inquiry_notification, agent_email, inquiry.id)
+    if chat is not None:
+        message_data = chat.last_message.serialize()
+        for participant_id in (chat.sender_id, chat.receiver_id):
+            after_commit(event_bus.publish, user_channel(participant_id), 'message', message_data)
+    db.session.commit()
+
+    return jsonify(inquiry_data), 201
 
-    return jsonify(inquiry.serialize()), 201
+
+def _queue_inquiry_notification(agent_email, inquiry_id):
+    # Notify the listing agent asynchronously via email, batched with other queued emails
+    try:
+        mail_outbox.queue(*inquiry_notification_email(agent_email, inquiry_id))
+    except Exception as e:
+        current_app.logger.error(f"Error queueing inquiry notification email: {e}")
 
 @inquiries_bp.route('', methods=['GET'])
 @jwt_required()
@@ -90,9 +103,79 @@ def submit_inquiry():
 def get_all_inquiries():
     """
     Get all inquiries. (Admin only)
+    Streamed from the database in chunks, so memory stays flat however many
+    inquiries there are. Query params:
+    - include_property=false: only property_id, without the embedded property
+    - limit (max MAX_INQUIRIES_PAGE) / cursor: keyset pagination; the response
+      becomes {"inquiries": [...], "next_cursor": ...}. Without them the full
+      list is returned as a plain array.
     """
-    inquiries = Inquiry.query.order_by(Inquiry.created_at.desc()).all()
-    return jsonify([inq.serialize() for inq in inquiries]), 200
+    include_property = request.args.get('include_property', default='true').lower() != 'false'
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+
+    query = Inquiry.query.order_by(Inquiry.created_at.desc(), Inquiry.id.desc())
+    if include_property:
+        # Property and its images loaded per chunk instead of per inquiry
+        query = query.options(joinedload(Inquiry.property).selectinload(Property.images))
+
+    if limit is None and cursor is None:
+        rows = (inq.serialize(include_property) for inq in _inquiry_chunks(query))
+        return streamed_json(json_array_chunks(rows))
+
+    if limit is not None and limit < 1:
+        return jsonify({"error": "limit must be positive"}), 400
+    limit = min(limit or MAX_INQUIRIES_PAGE, MAX_INQUIRIES_PAGE)
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, INQUIRY_SORT, Inquiry.created_at)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    page = {'last': None, 'count': 0}
+
+    def rows():
+        # One extra row tells whether there is a next page
+        for inq in _inquiry_chunks(query, after, limit + 1):
+            if page['count'] == limit:
+                page['more'] = True
+                return
+            page['count'] += 1
+            page['last'] = (inq.created_at, inq.id)
+            yield inq.serialize(include_property)
+
+    def trailer():
+        next_cursor = encode_cursor(INQUIRY_SORT, *page['last']) if page.get('more') else None
+        return {'next_cursor': next_cursor}
+
+    return streamed_json(json_object_chunks('inquiries', rows(), trailer))
+
+
+def _inquiry_chunks(query, after=None, limit=None):
+    """
+    Yields the inquiries of `query` (newest first) that come after the
+    (created_at, id) `after`, at most `limit` of them. Each chunk of
+    STREAM_CHUNK_ROWS is an ordinary buffered query continuing from the last
+    row of the previous one: the eager loads run their own SELECTs, which a
+    server-side cursor (yield_per) would block on drivers like mysqlclient.
+    """
+    while limit is None or limit > 0:
+        chunk_query = query
+        if after is not None:
+            created_at, last_id = after
+            chunk_query = query.filter(or_(
+                Inquiry.created_at < created_at,
+                and_(Inquiry.created_at == created_at, Inquiry.id < last_id)
+            ))
+        size = STREAM_CHUNK_ROWS if limit is None else min(limit, STREAM_CHUNK_ROWS)
+        chunk = chunk_query.limit(size).all()
+        yield from chunk
+        if len(chunk) < size:
+            return
+        if limit is not None:
+            limit -= size
+        after = (chunk[-1].created_at, chunk[-1].id)
 
 @inquiries_bp.route('/user/<int:user_id>', methods=['GET'])
 @jwt_required()
@@ -101,8 +184,7 @@ def get_user_inquiries(user_id):
     Get all inquiries made by a specific user.
     User must be the one specified in user_id or an admin.
     """
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    current_user = get_current_user()
 
     if not current_user:
         return jsonify({"error": "User not found"}), 404
@@ -128,8 +210,7 @@ def get_property_inquiries(property_id):
     Get all inquiries for a specific property.
     User must be the owner of the property or an admin.
     """
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    current_user = get_current_user()
     property_obj = Property.query.get(property_id)
 
     if not current_user:
@@ -137,7 +218,7 @@ def get_property_inquiries(property_id):
     if not property_obj:
         return jsonify({"error": "Property not found"}), 404
 
-    if property_obj.user_id != current_user_id and current_user.role != 'admin':
+    if property_obj.user_id != current_user.id and current_user.role != 'admin':
         return jsonify({"error": "Unauthorized to view inquiries for this property"}), 403
 
     inquiries = Inquiry.query.filter_by(property_id=property_id).order_by(Inquiry.created_at.desc()).all()
@@ -150,8 +231,7 @@ def update_inquiry_status(inquiry_id):
     Update the status of an inquiry.
     User must be the owner of the property related to the inquiry or an admin.
     """
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
+    current_user = get_current_user()
     inquiry = Inquiry.query.get(inquiry_id)
 
     if not current_user:
@@ -163,7 +243,7 @@ def update_inquiry_status(inquiry_id):
     if not property_obj:
         return jsonify({"error": "Associated property not found"}), 404 # Should not happen if data is consistent
 
-    if property_obj.user_id != current_user_id and current_user.role != 'admin':
+    if property_obj.user_id != current_user.id and current_user.role != 'admin':
         return jsonify({"error": "Unauthorized to update this inquiry"}), 403
 
     data = request.get_json()
@@ -1,104 +1,238 @@
-from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+import io
+from flask import Blueprint, request, jsonify, current_app, stream_with_context, g
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_current_user, verify_jwt_in_request
 from models import db, User, Property, Image, Inquiry
-from sqlalchemy import or_, and_
 from services.role_required import role_required
+from services.property_query import (
+    listing_query, detail_query, apply_filters, apply_sort, keyset_page, listing_origin,
+    parse_facets, facet_counts, parse_fields, fieldset_serializer, parse_includes, favorite_property_ids,
+)
+from services import geo
+from services.geo import haversine_km
+from services.images import image_pipeline, image_url, IMAGE_SIZES
+from services.transactions import after_commit
+from services.search import index_property, remove_property
+from services.property_io import (
+    FORMATS, DEFAULT_BATCH_SIZE, property_values, clean_property_values,
+    read_rows, import_properties, export_rows, write_csv, write_ndjson,
+)
+from services.cache import response_cache, cached_response
+from services.conditional import conditional, weak_etag
+from urllib.parse import urlencode
+from datetime import datetime, timezone
 
 properties_bp = Blueprint('properties', __name__)
 
+
+def _listing_cache_key():
+    # Per-user listings are never cached; cached pages + POST /api/favourites/lookup keep hearts cacheable
+    if request.args.get('variant') == 'mine' or 'is_favorite' in request.args.get('include', ''):
+        return None
+    normalized_args = urlencode(sorted(request.args.items(multi=True)))
+    return response_cache.namespace_key('properties', normalized_args)
+
+
+def _property_cache_key(property_id):
+    # Keyed by the version the ETag was just built from (_property_validators), so a cached body
+    # is only ever sent with the validators of the version it holds, whichever worker cached it
+    return f"property:{property_id}:{g.get('property_version')}"
+
+
+def _invalidate_property_cache(property_id):
+    """
+    Drops every cached listing page and the property's cached detail. The
+    detail's version also includes updated_at, which catches writes this
+    cache never heard of, but timestamps can repeat within a second (MySQL
+    DATETIME), so every write through the API bumps the generation too.
+    """
+    response_cache.invalidate_namespace('properties')
+    response_cache.invalidate_namespace(f'property:{property_id}')
+
+
+def _image_size():
+    """The ?image_size= derivative (thumbnail, medium, large) for listing images, or None for originals. Raises ValueError."""
+    size = request.args.get('image_size')
+    if size in (None, '', 'original'):
+        return None
+    if size not in IMAGE_SIZES:
+        raise ValueError(f"image_size must be one of original, {', '.join(IMAGE_SIZES)}")
+    return size
+
+
+def _favorites_for(includes):
+    """The current user's id when ?include=is_favorite is requested, else None. Anonymous users get ''."""
+    if 'is_favorite' not in includes:
+        return None
+    verify_jwt_in_request(optional=True)
+    return get_jwt_identity() or ''
+
+
+def _serialize_listing(items, origin=None, image_size=None, fields=None, favorites_of=None):
+    """
+    Serializes a page of properties (only `fields` if given, see parse_fields),
+    adding distanceKm when searching near a point and using the requested image
+    derivative (originals until it exists). With `favorites_of` (a user id, or
+    '' for anonymous users) each property gets isFavorite, looked up for the
+    whole page in one query.
+    """
+    serialize = fieldset_serializer(fields) if fields else Property.serialize
+    favorite_ids = None
+    if favorites_of is not None:
+        favorite_ids = favorite_property_ids(favorites_of, [p.id for p in items]) if favorites_of else set()
+    properties = []
+    for p in items:
+        data = serialize(p)
+        if favorite_ids is not None:
+            data['isFavorite'] = p.id in favorite_ids
+        if image_size and 'images' in data:
+            data['images'] = [image_url(img, image_size) for img in p.images]
+        if origin and p.latitude is not None and p.longitude is not None:
+            data['distanceKm'] = round(haversine_km(origin[0], origin[1], p.latitude, p.longitude), 3)
+        properties.append(data)
+    return properties
+
+
 @properties_bp.route('', methods=['GET'])
+@cached_response(_listing_cache_key)
 def get_properties():
-    query = Property.query
-
-    location = request.args.get('location')
-    # Renamed for clarity with frontend params
-    min_price = request.args.get('minPrice', type=float)
-    max_price = request.args.get('maxPrice', type=float)
-    property_type = request.args.get('property_type')
-    status = request.args.get('status')
-    # New filters
-    min_bedrooms = request.args.get('minBedrooms', type=int)
-    min_bathrooms = request.args.get('minBathrooms', type=int) # Assuming float for bathrooms if half baths are possible
-    min_area = request.args.get('minArea', type=float)
-    keywords = request.args.get('keywords')
-
     page = request.args.get('page', default=1, type=int)
     page_size = request.args.get('page_size', default=10, type=int)
+    if page_size < 1:
+        return jsonify({'error': 'page_size must be positive'}), 400
+    page_size = min(page_size, current_app.config['MAX_PAGE_SIZE'])
     sort = request.args.get('sort', default='created_at')
 
     variant = request.args.get('variant')
 
+    # Sparse fieldsets (?fields=title,price,location.city or ?view=card): only those columns are SELECTed
+    try:
+        fields = parse_fields(request.args.get('fields'), request.args.get('view'))
+        includes = parse_includes(request.args.get('include', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     if variant == 'mine':
         verify_jwt_in_request()
         user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user = get_current_user()
         if not user:
             return jsonify({'error': 'Unauthorized'}), 401
-        properties = Property.query.filter_by(user_id=user_id).all()
-        data = [p.serialize() for p in properties]
+        properties = listing_query(fields).filter_by(user_id=user_id).all()
+        data = _serialize_listing(properties, fields=fields, favorites_of=_favorites_for(includes))
         return jsonify(data)
-    elif variant == 'featured':
-        query = query.filter(Property.is_featured == True)
-    
-    if location:
-        location_term = f"%{location.lower()}%"
-        query = query.filter(
-            or_(
-                Property.address.ilike(location_term),
-                Property.city.ilike(location_term),
-                Property.state.ilike(location_term),
-                Property.zip_code.ilike(location_term) # if zip code search is desired
-            )
-        )
-    if min_price is not None:
-        query = query.filter(Property.price >= min_price)
-    if max_price is not None:
-        query = query.filter(Property.price <= max_price)
-    if property_type:
-        query = query.filter(Property.property_type == property_type)
-    if status:
-        query = query.filter(Property.status == status)
-    if min_bedrooms is not None:
-        query = query.filter(Property.bedrooms >= min_bedrooms)
-    if min_bathrooms is not None:
-        query = query.filter(Property.bathrooms >= min_bathrooms)
-    if min_area is not None:
-        query = query.filter(Property.area >= min_area)
-    if keywords:
-        keyword_term = f"%{keywords.lower()}%"
-        query = query.filter(
-            or_(
-                Property.title.ilike(keyword_term),
-                Property.description.ilike(keyword_term),
-                Property.amenities.ilike(keyword_term) # Assumes amenities is a string field
-            )
-        )
+
+    # Filters (location, price, type, status, features, keywords, featured variant, geo)
+    try:
+        origin = listing_origin(request.args)
+        # distanceKm needs the coordinates whatever the fieldset
+        columns = ('latitude', 'longitude') if origin else ()
+        query = apply_filters(listing_query(fields, columns), request.args)
+        facet_names = parse_facets(request.args.get('facets', ''))
+        image_size = _image_size()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    favorites_of = _favorites_for(includes)
+
+    keywords = request.args.get('keywords')
+
+    # Sidebar counts for the same filter set (?facets=property_type,status,...), cached with the page
+    extra = {'facets': facet_counts(query, facet_names)} if facet_names else {}
+
+    # Keyset pagination (opt-in with ?cursor=, empty for the first page): no COUNT(*), no OFFSET
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        try:
+            items, next_cursor = keyset_page(query, sort, page_size, cursor=cursor, keywords=keywords, origin=origin)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({
+            'page_size': page_size,
+            'next_cursor': next_cursor,
+            'properties': _serialize_listing(items, origin, image_size, fields, favorites_of),
+            **extra
+        })
 
     # Sorting
-    if sort.startswith('-'):
-        sort_field = sort[1:]
-        order = getattr(Property, sort_field).desc()
-    else:
-        sort_field = sort
-        order = getattr(Property, sort_field).asc()
-    query = query.order_by(order)
+    try:
+        query = apply_sort(query, sort, keywords=keywords, origin=origin)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     pagination = query.paginate(page=page, per_page=page_size, error_out=False)
-    properties = [p.serialize() for p in pagination.items]
+    properties = _serialize_listing(pagination.items, origin, image_size, fields, favorites_of)
 
     return jsonify({
         'total': pagination.total,
         'pages': pagination.pages,
         'current_page': pagination.page,
         'page_size': pagination.per_page,
-        'properties': properties
+        'properties': properties,
+        **extra
+    })
+
+
+
+def _clusters_cache_key():
+    normalized_args = urlencode(sorted(request.args.items(multi=True)))
+    return response_cache.namespace_key('properties', f'clusters?{normalized_args}')
+
+
+@properties_bp.route('/clusters', methods=['GET'])
+@cached_response(_clusters_cache_key)
+def get_property_clusters():
+    """
+    Map pins for the listings matching the get_properties filters inside ?bbox=,
+    aggregated into geohash cells sized for ?zoom=. Map clients request one
+    bbox per tile, so each tile's payload is cached until a property changes.
+    """
+    if not request.args.get('bbox'):
+        return jsonify({'error': 'bbox is required'}), 400
+    zoom = request.args.get('zoom', type=int)
+    if zoom is None or not 0 <= zoom <= geo.MAX_ZOOM:
+        return jsonify({'error': f'zoom must be an integer between 0 and {geo.MAX_ZOOM}'}), 400
+
+    try:
+        query = apply_filters(Property.query, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    precision = geo.precision_for_zoom(zoom)
+    clusters = []
+    total = 0
+    for cell, count, latitude, longitude, min_price, max_price, property_id in geo.cluster_query(query, precision):
+        total += count
+        clusters.append({
+            'geohash': cell,
+            'count': count,
+            'latitude': latitude,
+            'longitude': longitude,
+            'minPrice': min_price,
+            'maxPrice': max_price,
+            'propertyId': str(property_id) if count == 1 else None,
+        })
+
+    return jsonify({
+        'zoom': zoom,
+        'precision': precision,
+        'total': total,
+        'clusters': clusters
     })
 
 
+def _property_validators(property_id):
+    row = db.session.query(Property.updated_at).filter(Property.id == property_id).first()
+    if row is None:
+        return None
+    generation = response_cache.generation(f'property:{property_id}')
+    g.property_version = f"{generation}:{row.updated_at.isoformat() if row.updated_at else ''}"
+    return weak_etag('property', property_id, g.property_version), row.updated_at
+
 
 @properties_bp.route('/<int:property_id>', methods=['GET'])
+@conditional(_property_validators)
+@cached_response(_property_cache_key)
 def get_property(property_id):
-    property_obj = Property.query.get_or_404(property_id)
+    property_obj = detail_query().get_or_404(property_id)
     data = property_obj.serialize()
     return jsonify(data)
 
@@ -108,68 +242,91 @@ def get_property(property_id):
 # @role_required('admin')
 def create_property():
     user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = get_current_user()
     if not user:
         return jsonify({'error': 'Unauthorized'}), 401
 
     data = request.get_json()
-    
-    title = data.get('title')
-    description = data.get('description')
-    price = data.get('price')
-    property_type = data.get('property_type')
-    status = data.get('status')
-    amenities = data.get('amenities')
-    images = data.get('images', [])  # list of image URLs
-
-    # Extract nested location data
-    location_data = data.get('location', {})
-    address = location_data.get('address')
-    city = location_data.get('city')
-    state = location_data.get('state')
-    zip_code_val = location_data.get('zipCode') # Frontend sends 'zipCode'
-    latitude = location_data.get('latitude')
-
-    # Extract nested features data
-    features_data = data.get('features', {})
-    bedrooms = features_data.get('bedrooms')
-    bathrooms = features_data.get('bathrooms')
-    area = features_data.get('area')
-    year_built_val = features_data.get('year_built') # Frontend sends 'year_built'
-
-    # Validate required fields
-    if not all([title, description, address, city, state, zip_code_val, price]):
-        return jsonify({'error': 'Missing required property fields'}), 400
-
-    prop = Property(
-        user_id=user_id,
-        title=title,
-        description=description,
-        address=address,
-        city=city,
-        state=state,
-        zip_code=zip_code_val, # Assign to model's 'zip_code'
-        latitude=latitude,
-        price=price,
-        property_type=property_type,
-        status=status,
-        bedrooms=bedrooms,
-        bathrooms=bathrooms,
-        area=area,
-        year_built=year_built_val, # Assign to model's 'year_built'
-        amenities=amenities
-    )
+
+    # Same validation as the bulk importer (services/property_io.py)
+    values, images = property_values(data)  # images: list of image URLs
+    try:
+        values = clean_property_values(values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    prop = Property(user_id=user_id, **values)
     db.session.add(prop)
-    db.session.commit()
+    db.session.flush() # Assigns prop.id; property and images commit together
 
     # Add images
-    for url in images:
-        img = Image(property_id=prop.id, url=url)
-        db.session.add(img)
+    new_images = [Image(property_id=prop.id, url=url) for url in images]
+    db.session.add_all(new_images)
+    index_property(prop)
+    db.session.flush()
+    after_commit(image_pipeline.queue, [img.id for img in new_images]) # Thumbnails etc. in the background
     db.session.commit()
+    _invalidate_property_cache(prop.id)
 
     return jsonify(prop.serialize()), 201
 
+
+def _transfer_format(default=None):
+    fmt = request.args.get('format')
+    if fmt is None and request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        fmt = 'ndjson'
+    elif fmt is None and request.mimetype == 'text/csv':
+        fmt = 'csv'
+    return fmt or default
+
+
+@properties_bp.route('/import', methods=['POST'])
+@jwt_required()
+@role_required('admin')
+def import_properties_endpoint():
+    """
+    Bulk import from a CSV or NDJSON request body (?format= or the
+    Content-Type), streamed and inserted in batches. Listings belong to
+    ?owner_id= (an agent) or the importing admin.
+    """
+    fmt = _transfer_format()
+    if fmt not in FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(FORMATS)}"}), 400
+    owner_id = request.args.get('owner_id', default=get_current_user().id, type=int)
+    if db.session.get(User, owner_id) is None:
+        return jsonify({'error': 'Owner not found'}), 404
+    batch_size = min(request.args.get('batch_size', default=DEFAULT_BATCH_SIZE, type=int), DEFAULT_BATCH_SIZE)
+    if batch_size < 1:
+        return jsonify({'error': 'batch_size must be positive'}), 400
+
+    request.max_content_length = current_app.config['IMPORT_MAX_BYTES'] # Streamed, so above the app-wide MAX_CONTENT_LENGTH
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    summary = import_properties(read_rows(stream, fmt), owner_id, batch_size=batch_size)
+    if summary['imported']:
+        response_cache.invalidate_namespace('properties')
+    return jsonify(summary), 200 if not summary['failed'] else 207
+
+
+@properties_bp.route('/export', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+def export_properties_endpoint():
+    """Streams every property matching the listing filters as CSV or NDJSON."""
+    fmt = _transfer_format(default='csv')
+    if fmt not in FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(FORMATS)}"}), 400
+    try:
+        query = apply_filters(listing_query(), request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    rows = export_rows(query)
+    body = write_csv(rows) if fmt == 'csv' else write_ndjson(rows)
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = current_app.response_class(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=properties.{fmt}'
+    return response
+
 @properties_bp.route('/<int:property_id>/feature', methods=['PATCH'])
 @jwt_required()
 @role_required('admin')
@@ -177,18 +334,18 @@ def feature_property(property_id):
     property_obj = Property.query.get_or_404(property_id)
     property_obj.is_featured = not property_obj.is_featured
     db.session.commit()
+    _invalidate_property_cache(property_obj.id)
     return jsonify(property_obj.serialize())
 
 
 @properties_bp.route('/<int:property_id>', methods=['PUT'])
 @jwt_required()
 def update_property(property_id):
-    user_id = get_jwt_identity()
     prop = Property.query.get_or_404(property_id)
-    user = User.query.get(user_id)
+    user = get_current_user()
 
     # Check ownership or admin
-    if prop.user_id != user_id and user.role != 'admin':
+    if prop.user_id != user.id and user.role != 'admin':
         return jsonify({'error': 'Unauthorized - not owner or admin'}), 403
 
     data = request.get_json()
@@ -207,7 +364,8 @@ def update_property(property_id):
             'city': 'city',
             'state': 'state',
             'zipCode': 'zip_code',  # Frontend 'zipCode' to model 'zip_code'
-            'latitude': 'latitude'
+            'latitude': 'latitude',
+            'longitude': 'longitude'
         }
         for frontend_key, model_key in location_update_map.items():
             if frontend_key in location_data:
@@ -229,31 +387,37 @@ def update_property(property_id):
     # Handle images update: list new, delete existing by URL
     images = data.get('images')
     if images is not None:
+        # Images live in their own table, so bump updated_at explicitly to change the property's ETag
+        prop.updated_at = datetime.now(timezone.utc)
         # Delete current images
         Image.query.filter_by(property_id=prop.id).delete()
         # Add new images
-        for url in images:
-            img = Image(property_id=prop.id, url=url)
-            db.session.add(img)
+        new_images = [Image(property_id=prop.id, url=url) for url in images]
+        db.session.add_all(new_images)
+        db.session.flush()
+        after_commit(image_pipeline.queue, [img.id for img in new_images])
 
+    index_property(prop)
     db.session.commit()
+    _invalidate_property_cache(prop.id)
     return jsonify(prop.serialize())
 
 
 @properties_bp.route('/<int:property_id>', methods=['DELETE'])
 @jwt_required()
 def delete_property(property_id):
-    user_id = get_jwt_identity()
     prop = Property.query.get_or_404(property_id)
-    user = User.query.get(user_id)
+    user = get_current_user()
 
     # Check ownership or admin
-    if prop.user_id != user_id and user.role != 'admin':
+    if prop.user_id != user.id and user.role != 'admin':
         return jsonify({'error': 'Unauthorized - not owner or admin'}), 403
 
     # Images will be deleted automatically due to cascade="all, delete-orphan" 
     # in the Property.images relationship if you added that to models.py.
     # Delete property
     db.session.delete(prop)
+    remove_property(prop.id)
     db.session.commit()
+    _invalidate_property_cache(property_id)
     return jsonify({'message': 'Property deleted successfully'})
@@ -1,25 +1,20 @@
-from flask import Blueprint, request, jsonify
-import cloudinary
-import cloudinary.uploader
-from config import Config
+from flask import Blueprint, request, jsonify, send_from_directory, abort
+from itsdangerous import BadSignature, SignatureExpired
 from services.role_required import role_required
+from services.storage import storage, LocalStorage, UploadTooLarge
 from flask_jwt_extended import jwt_required
 
-
-# Configuration
-cloudinary.config(
-    cloud_name=Config.CLOUDINARY_CLOUD_NAME,
-    api_key=Config.CLOUDINARY_API_KEY,
-    api_secret=Config.CLOUDINARY_API_SECRET,  # Click 'View API Keys' above to copy your API secret
-    secure=True
-)
-
 upload_bp = Blueprint('upload', __name__)
 
+
 @upload_bp.route('/', methods=['POST'])
 @jwt_required()
 # @role_required('admin')
 def upload_image():
+    """
+    Multipart upload through the API. Prefer POST /token + a direct upload:
+    this endpoint keeps a worker busy for the whole transfer.
+    """
     if 'image' not in request.files:
         return jsonify({'error': 'No image file provided'}), 400
 
@@ -29,7 +24,75 @@ def upload_image():
         return jsonify({'error': 'No selected file'}), 400
 
     try:
-        upload_result = cloudinary.uploader.upload(image_file)
-        return jsonify({'secure_url': upload_result['secure_url']}), 200
+        key = storage.new_key(image_file.mimetype)
+        url = storage.save(key, image_file.stream, image_file.mimetype)
+        return jsonify({'secure_url': url, 'key': key}), 200
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+@upload_bp.route('/token', methods=['POST'])
+@jwt_required()
+def create_upload_token():
+    """
+    Issues a direct upload target for one image: {"content_type": ..., "size": ...}.
+    The client sends the file to `upload` (method, url, plus form fields or
+    headers), then uses the final URL in the property's `images`. `url` is
+    known in advance except on Cloudinary, which returns it from the upload.
+    """
+    data = request.get_json() or {}
+    content_type = data.get('content_type')
+    size = data.get('size')
+    try:
+        key = storage.new_key(content_type)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if size is not None and (not isinstance(size, int) or size > storage.max_bytes):
+        return jsonify({'error': f'Images are limited to {storage.max_bytes} bytes'}), 413
+
+    return jsonify({
+        'key': key,
+        'url': storage.url(key),
+        'upload': storage.upload_target(key, content_type),
+        'expires_in': storage.token_ttl,
+        'max_bytes': storage.max_bytes,
+    }), 200
+
+
+@upload_bp.route('/direct/<token>', methods=['PUT'])
+def direct_upload(token):
+    """Local storage's direct upload target: streams the raw request body to disk in chunks, once per token."""
+    if not isinstance(storage.backend, LocalStorage):
+        abort(404)
+    try:
+        target = storage.load_upload_token(token)
+    except SignatureExpired:
+        return jsonify({'error': 'Upload token expired'}), 410
+    except BadSignature:
+        return jsonify({'error': 'Invalid upload token'}), 403
+
+    if request.mimetype != target['content_type']:
+        return jsonify({'error': f"Content-Type must be {target['content_type']}"}), 400
+    if request.content_length is not None and request.content_length > target['max_bytes']:
+        return jsonify({'error': f"Images are limited to {target['max_bytes']} bytes"}), 413
+
+    try:
+        # Keys are served as immutable, so a replayed token must not replace the file
+        url = storage.save(target['key'], request.stream, target['content_type'], overwrite=False)
+    except FileExistsError:
+        return jsonify({'error': 'Upload token already used'}), 409
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    return jsonify({'key': target['key'], 'url': url}), 201
+
+
+@upload_bp.route('/files/<path:key>', methods=['GET'])
+def serve_file(key):
+    """Serves local storage files (development; in production let the web server serve STORAGE_LOCAL_ROOT)."""
+    if not isinstance(storage.backend, LocalStorage):
+        abort(404)
+    return send_from_directory(storage.backend.root, key, max_age=31536000) # Keys are unique, never overwritten
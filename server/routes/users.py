@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, User, Property, Favorite
-from werkzeug.security import generate_password_hash
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_current_user
+from sqlalchemy.exc import IntegrityError
+from models import db, Property, Favorite
+from services.passwords import hash_password
+from services.current_user import invalidate_cached_user
+from services.property_query import favorites_query
 from datetime import datetime, timezone
 
 users_bp = Blueprint('users', __name__)
@@ -9,15 +12,13 @@ users_bp = Blueprint('users', __name__)
 @users_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
-    user_id = get_jwt_identity()
-    user = User.query.get_or_404(user_id)
+    user = get_current_user()
     return jsonify(user.serialize()), 200
 
 @users_bp.route('/profile', methods=['PUT'])
 @jwt_required()
 def update_profile():
-    user_id = get_jwt_identity()
-    user = User.query.get_or_404(user_id)
+    user = get_current_user()
     data = request.get_json()
 
     # Validate input if needed; here we assume basic update
@@ -26,12 +27,13 @@ def update_profile():
     for field in updatable_fields:
         if field in data:
             if field == 'password':
-                user.password = generate_password_hash(data[field])
+                user.password = hash_password(data[field])
             else:
                 setattr(user, field, data[field])
 
     user.updated_at = datetime.now(timezone.utc)
     db.session.commit()
+    invalidate_cached_user(user.id)
     return jsonify(user.serialize()), 200
 
 
@@ -39,7 +41,6 @@ def update_profile():
 @jwt_required()
 def add_favorite(property_id):
     user_id = get_jwt_identity()
-    user = User.query.get_or_404(user_id)
     property_obj = Property.query.get_or_404(property_id)
 
     # Check if already favorite
@@ -49,7 +50,11 @@ def add_favorite(property_id):
 
     fav = Favorite(user_id=user_id, property_id=property_id)
     db.session.add(fav)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError: # A concurrent request added it after the check above (uq_favorite_user_property)
+        db.session.rollback()
+        return jsonify({"message": "Property already in favorites"}), 200
     return jsonify({"message": "Property added to favorites"}), 201
 
 @users_bp.route('/favorites/<int:property_id>', methods=['DELETE'])
@@ -67,9 +72,9 @@ def remove_favorite(property_id):
 @jwt_required()
 def get_favorites():
     user_id = get_jwt_identity()
-    favorites = Favorite.query.filter_by(user_id=user_id).all()
+    favorite_properties = favorites_query(user_id).all()
 
-    properties = [property_to_dict(fav.property) for fav in favorites]
+    properties = [property_to_dict(property_obj) for property_obj in favorite_properties]
 
     return jsonify(properties), 200
 
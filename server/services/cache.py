@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app
+
+
+class LRUCache:
+    """In-process LRU cache with per-entry TTL. Each gunicorn worker has its own copy."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {} # Kept out of the LRU so a namespace generation is never evicted
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class RedisCache:
+    """
+    Cache backed by a Redis-compatible client (redis.Redis, fakeredis, ...).
+    Shared by all workers, so invalidation is seen everywhere immediately.
+    """
+
+    def __init__(self, client, prefix='realestate:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+
+class ResponseCache:
+    """
+    Caches serialized JSON responses. Entries are grouped in namespaces; bumping
+    a namespace's generation makes all of its entries unreachable at once (they
+    then age out through TTL/LRU), while single keys can be deleted directly.
+
+    Configured via CACHE_BACKEND ('memory', 'redis' or 'null'), CACHE_REDIS_URL,
+    CACHE_DEFAULT_TTL and CACHE_MAX_ENTRIES.
+
+    Invalidation only reaches the cache it runs against, so with several
+    workers (WEB_CONCURRENCY > 1) the 'memory' backend lets the other workers
+    serve stale entries until they expire. Use 'redis' there (the default);
+    if 'memory' is chosen anyway, every TTL is capped at CACHE_MEMORY_MAX_TTL.
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.default_ttl = 30
+        self.max_ttl = None
+
+    def init_app(self, app, redis_client=None):
+        backend = app.config.get('CACHE_BACKEND', 'memory')
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 30)
+        self.max_ttl = None
+        if backend == 'memory' and redis_client is None and app.config.get('WEB_CONCURRENCY', 1) > 1:
+            self.max_ttl = app.config.get('CACHE_MEMORY_MAX_TTL', 5)
+            app.logger.warning(
+                f"CACHE_BACKEND 'memory' is per worker and WEB_CONCURRENCY is {app.config['WEB_CONCURRENCY']}: "
+                f"other workers may serve stale responses for up to {self.max_ttl}s after a change. Use CACHE_BACKEND=redis."
+            )
+        if backend == 'redis' or redis_client is not None:
+            if redis_client is None:
+                import redis  # Optional dependency, only needed for the redis backend
+                redis_client = redis.Redis.from_url(app.config['CACHE_REDIS_URL'])
+            self.backend = RedisCache(redis_client)
+        elif backend == 'memory':
+            self.backend = LRUCache(max_entries=app.config.get('CACHE_MAX_ENTRIES', 1024))
+        else:
+            self.backend = None
+        app.extensions['response_cache'] = self
+
+    def _call(self, method, *args, **kwargs):
+        # A cache outage should only cost us the cache, never the request
+        if self.backend is None:
+            return None
+        try:
+            return getattr(self.backend, method)(*args, **kwargs)
+        except Exception as e:
+            current_app.logger.warning(f"Response cache {method} failed: {e}")
+            return None
+
+    def get(self, key):
+        return self._call('get', key)
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl or self.default_ttl
+        if self.max_ttl is not None:
+            ttl = min(ttl, self.max_ttl)
+        self._call('set', key, value, ttl=ttl)
+
+    def delete(self, *keys):
+        self._call('delete', *keys)
+
+    def generation(self, namespace):
+        """Current generation of a namespace: starts at 0, invalidate_namespace() increments it."""
+        generation = self._call('get', f'generation:{namespace}')
+        return int(generation) if generation is not None else 0
+
+    def namespace_key(self, namespace, key):
+        """Key inside a namespace, scoped to the namespace's current generation."""
+        return f'{namespace}:{self.generation(namespace)}:{key}'
+
+    def invalidate_namespace(self, namespace):
+        self._call('incr', f'generation:{namespace}')
+
+
+response_cache = ResponseCache() # Initialized by app.py
+
+
+def cached_response(key_func, ttl=None):
+    """
+    Serves a view's successful JSON response from the response cache.
+    `key_func` receives the view's arguments and returns the cache key, or None
+    to bypass the cache for this request.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            key = key_func(*args, **kwargs)
+            if key is None:
+                return fn(*args, **kwargs)
+
+            cached = response_cache.get(key)
+            if cached is not None:
+                response = current_app.response_class(cached, mimetype='application/json')
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = current_app.make_response(fn(*args, **kwargs))
+            if response.status_code == 200:
+                response_cache.set(key, response.get_data(), ttl=ttl)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return decorator
+    return wrapper
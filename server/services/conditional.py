@@ -0,0 +1,64 @@
+import hashlib
+from datetime import timezone
+from functools import wraps
+from flask import current_app, request
+
+
+def weak_etag(*parts):
+    """Builds an opaque validator from row ids, counts and timestamps."""
+    raw = ':'.join('' if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _as_utc(value):
+    # Timestamps are stored as naive UTC datetimes
+    if value is not None and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _is_not_modified(etag, last_modified):
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+    if request.if_none_match:
+        return etag is not None and request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def conditional(validator, private=False):
+    """
+    Adds ETag/Last-Modified to successful GET responses and answers matching
+    If-None-Match / If-Modified-Since requests with 304 before the view runs,
+    so no serialization happens for unchanged resources.
+
+    `validator` receives the view's arguments and returns (etag, last_modified)
+    from a cheap query, or None to skip conditional handling (e.g. the resource
+    doesn't exist or the user may not see it - the view then answers 404/403).
+    Use private=True for per-user resources so shared caches never store them.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            validators = validator(*args, **kwargs)
+            if validators is None:
+                return fn(*args, **kwargs)
+            etag, last_modified = validators
+            last_modified = _as_utc(last_modified)
+
+            if _is_not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            if etag is not None:
+                response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Clients must revalidate with the validators above before reusing a copy
+            response.headers['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+            return response
+        return decorator
+    return wrapper
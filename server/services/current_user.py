@@ -0,0 +1,43 @@
+from flask import current_app
+from sqlalchemy.orm import make_transient_to_detached
+from models import db, User
+from services.cache import LRUCache
+
+# Columns kept in the cross-request cache. Secrets (password, reset token) are
+# left out; if a handler touches them they are loaded from the database on access.
+CACHED_COLUMNS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'phone_number',
+    'profile_image', 'role', 'is_active', 'created_at', 'updated_at',
+)
+
+_user_cache = LRUCache(max_entries=4096)
+
+
+def load_user(identity):
+    """
+    Loads the User behind a JWT identity. Registered as Flask-JWT-Extended's
+    user_lookup_loader, so it runs once per request and the result is shared by
+    role_required and the handler through `current_user`.
+
+    With AUTH_USER_CACHE_TTL > 0 the user's profile/role/is_active columns are
+    also cached across requests in this worker for that many seconds, and a hit
+    costs no query at all.
+    """
+    ttl = current_app.config.get('AUTH_USER_CACHE_TTL', 0)
+    if ttl:
+        cached = _user_cache.get(str(identity))
+        if cached is not None:
+            # Attach to the session as a clean persistent object without a SELECT
+            user = User(**cached)
+            make_transient_to_detached(user)
+            return db.session.merge(user, load=False)
+
+    user = db.session.get(User, int(identity))
+    if user is not None and ttl:
+        _user_cache.set(str(identity), {column: getattr(user, column) for column in CACHED_COLUMNS}, ttl=ttl)
+    return user
+
+
+def invalidate_cached_user(user_id):
+    """Call after changing a user's profile, role or active flag."""
+    _user_cache.delete(str(user_id))
@@ -1,33 +1,36 @@
+import atexit
+import threading
 from flask import current_app
 from flask_mail import Mail, Message
+from services.mail_pool import SMTPConnectionPool
 
 mail = Mail() # Define the Mail instance here; it will be initialized by app.py
+mail_pool = SMTPConnectionPool(mail) # Reuses SMTP connections across sends; initialized by app.py
 
-def send_welcome_email(email, username):
-    """Sends a welcome email to the user."""
+
+# Emails are (to, subject, body) tuples, so they can be queued and passed to Celery as JSON
+
+def welcome_email(email, username):
     subject = "Welcome to Our Real Estate Platform"
     body = f"Hello {username},\n\nThank you for registering with us! We're excited to have you on board.\n\nBest regards,\nReal Estate Team"
-    send_email(email, subject, body)
+    return email, subject, body
 
 
-def send_password_reset_email(email, token):
-    """Sends a password reset email to the user."""
+def password_reset_email(email, token):
     subject = "Password Reset Request"
     frontend_url = current_app.config.get('FRONTEND_URL', 'http://localhost:3000') # Fallback if not configured
     reset_link = f"{frontend_url}/reset-password?token={token}"
     body = f"To reset your password, click the following link: {reset_link}\n\nIf you did not request this, please ignore this email."
-    send_email(email, subject, body)
+    return email, subject, body
 
 
-def send_inquiry_notification_email(agent_email, inquiry_id):
-    """Sends a notification email to the agent about a new inquiry."""
+def inquiry_notification_email(agent_email, inquiry_id):
     subject = "New Property Inquiry"
     body = f"You have received a new inquiry. Please check the details for inquiry ID: {inquiry_id}."
-    send_email(agent_email, subject, body)
+    return agent_email, subject, body
 
 
-def send_email(to, subject, body):
-    """Sends an email using Flask-Mail."""
+def _sender_email():
     # Use MAIL_DEFAULT_SENDER from app config, fallback to MAIL_USERNAME
     sender_email = current_app.config.get('MAIL_DEFAULT_SENDER')
     if not sender_email: # If MAIL_DEFAULT_SENDER is None or empty string
@@ -37,10 +40,81 @@ def send_email(to, subject, body):
         current_app.logger.error("Email sender (MAIL_DEFAULT_SENDER or MAIL_USERNAME) is not configured.")
         # Depending on your app's needs, you might raise an error here or return
         raise ValueError("Email sender not configured. Please set MAIL_DEFAULT_SENDER or MAIL_USERNAME in your environment.")
+    return sender_email
+
+
+def send_bulk_email(emails):
+    """
+    Sends several (to, subject, body) emails over one pooled SMTP connection
+    and logs the pool's throughput metrics. Returns the emails that could not
+    be delivered. Raises if no connection can be opened at all.
+    """
+    emails = [tuple(email) for email in emails]
+    sender_email = _sender_email()
+    messages = [Message(subject=subject, recipients=[to], body=body, sender=sender_email) for to, subject, body in emails]
+    failures = mail_pool.send_batch(messages)
+    failed = {id(msg) for msg, _ in failures}
+    for msg, error in failures:
+        current_app.logger.error(f"Error sending email to {msg.recipients[0]} with subject '{msg.subject}': {error}")
+    current_app.logger.info(f"Sent {len(emails) - len(failures)}/{len(emails)} emails; SMTP pool metrics: {mail_pool.metrics()}")
+    return [email for email, msg in zip(emails, messages) if id(msg) in failed]
+
+
+class MailOutbox:
+    """
+    Collects the emails this worker queues and hands them off in batches, so a
+    burst (inquiry notifications, welcome emails) goes out over one SMTP
+    connection in one send_email_batch_task instead of a task per message.
+
+    A batch is flushed MAIL_BATCH_WINDOW seconds after its first email, or as
+    soon as it holds MAIL_BATCH_SIZE emails, to the Celery workers or, without
+    a broker (CELERY_TASK_ALWAYS_EAGER), sent from a background thread here.
+    Emails still waiting when the process exits are flushed at exit; a hard
+    kill loses at most one window's worth, so keep the window short.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.window = 1.0
+        self.max_size = 50
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.window = app.config.get('MAIL_BATCH_WINDOW', 1.0)
+        self.max_size = app.config.get('MAIL_BATCH_SIZE', 50)
+        atexit.register(self.flush)
+        app.extensions['mail_outbox'] = self
+
+    def queue(self, to, subject, body):
+        """Adds an email to the current batch (see welcome_email() etc. for the arguments)."""
+        with self._lock:
+            self._pending.append((to, subject, body))
+            full = len(self._pending) >= self.max_size or self.window <= 0
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Hands off the pending emails as one batch now."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not batch:
+            return
+        from services.tasks import send_email_batch_task
+        with self.app.app_context():
+            try:
+                send_email_batch_task.delay(batch)
+            except Exception as e:
+                current_app.logger.error(f"Error sending a batch of {len(batch)} emails: {e}")
+
 
-    msg = Message(subject=subject, recipients=[to], body=body, sender=sender_email)
-    try:
-        mail.send(msg)
-    except Exception as e:
-        current_app.logger.error(f"Error sending email to {to} with subject '{subject}': {e}")
-        raise #re-raise
\ No newline at end of file
+mail_outbox = MailOutbox() # Initialized by app.py
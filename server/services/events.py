@@ -0,0 +1,175 @@
+import json
+import queue
+import threading
+from flask import current_app
+from werkzeug.exceptions import ServiceUnavailable
+
+
+class StreamLimitReached(ServiceUnavailable):
+    """Raised when this worker already holds EVENTS_MAX_STREAMS open streams (answered with 503)."""
+    description = "Too many open event streams right now. Please retry shortly."
+
+
+class InMemorySubscription:
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = channels
+        self.queue = queue.Queue()
+
+    def get(self, timeout=None):
+        """Next (event, data) pair, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class InMemoryBroker:
+    """Process-local pub/sub. Only reaches subscribers in the same worker, so use it for tests/development."""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = InMemorySubscription(self, channels)
+        with self._lock:
+            for channel in channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.get(channel, set()).discard(subscription)
+
+    def publish(self, channel, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.queue.put((event, data))
+
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    def get(self, timeout=None):
+        message = self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if not message:
+            return None
+        payload = json.loads(message['data'])
+        return payload['event'], payload['data']
+
+    def close(self):
+        self.pubsub.close()
+
+
+class RedisBroker:
+    """Pub/sub over a Redis-compatible client, so events fan out across all gunicorn workers."""
+
+    def __init__(self, client, prefix='realestate:events:'):
+        self.client = client
+        self.prefix = prefix
+
+    def subscribe(self, channels):
+        pubsub = self.client.pubsub()
+        pubsub.subscribe(*[self.prefix + channel for channel in channels])
+        return RedisSubscription(pubsub)
+
+    def publish(self, channel, event, data):
+        self.client.publish(self.prefix + channel, json.dumps({'event': event, 'data': data}))
+
+
+class LimitedSubscription:
+    """A subscription holding one of the bus's stream slots until it is closed."""
+
+    def __init__(self, subscription, slots):
+        self.subscription = subscription
+        self.slots = slots
+        self._closed = False
+
+    def get(self, timeout=None):
+        return self.subscription.get(timeout=timeout)
+
+    def close(self):
+        if self._closed: # Closed by the stream and again when the response closes
+            return
+        self._closed = True
+        try:
+            self.subscription.close()
+        finally:
+            self.slots.release()
+
+
+class EventBus:
+    """
+    Publishes realtime events (new chat messages, read receipts) to per-user
+    channels. Configured via EVENTS_BACKEND ('memory' or 'redis') and EVENTS_REDIS_URL;
+    'memory' is refused when WEB_CONCURRENCY says there are several workers.
+
+    Every open stream holds a worker thread until the client disconnects, so
+    at most EVENTS_MAX_STREAMS subscriptions are open per worker (0 = no
+    limit); keep it below the worker's thread count so ordinary requests
+    always find a thread.
+    """
+
+    def __init__(self):
+        self.broker = InMemoryBroker()
+        self._slots = None
+
+    def init_app(self, app, redis_client=None):
+        backend = app.config.get('EVENTS_BACKEND', 'memory')
+        if backend == 'memory' and redis_client is None and app.config.get('WEB_CONCURRENCY', 1) > 1:
+            # Events published in one worker would silently never reach streams held by the others
+            raise RuntimeError(
+                f"EVENTS_BACKEND 'memory' only works with a single worker (WEB_CONCURRENCY is "
+                f"{app.config['WEB_CONCURRENCY']}); use EVENTS_BACKEND=redis"
+            )
+        if backend == 'redis' or redis_client is not None:
+            if redis_client is None:
+                import redis  # Optional dependency, only needed for the redis backend
+                redis_client = redis.Redis.from_url(app.config['EVENTS_REDIS_URL'])
+            self.broker = RedisBroker(redis_client)
+        else:
+            self.broker = InMemoryBroker()
+        max_streams = app.config.get('EVENTS_MAX_STREAMS', 0)
+        self._slots = threading.BoundedSemaphore(max_streams) if max_streams else None
+        app.extensions['event_bus'] = self
+
+    def publish(self, channel, event, data):
+        # Realtime delivery is best effort: clients can always resync over HTTP
+        try:
+            self.broker.publish(channel, event, data)
+        except Exception as e:
+            current_app.logger.warning(f"Failed to publish '{event}' to {channel}: {e}")
+
+    def subscribe(self, channels):
+        """Opens a subscription; close() it when done. Raises StreamLimitReached when this worker is full."""
+        if self._slots is None:
+            return self.broker.subscribe(channels)
+        if not self._slots.acquire(blocking=False):
+            raise StreamLimitReached()
+        try:
+            return LimitedSubscription(self.broker.subscribe(channels), self._slots)
+        except BaseException:
+            self._slots.release()
+            raise
+
+
+event_bus = EventBus() # Initialized by app.py
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def format_sse(event, data, event_id=None):
+    """Formats one Server-Sent Events frame."""
+    frame = f'event: {event}\n'
+    if event_id is not None:
+        frame += f'id: {event_id}\n'
+    return frame + f'data: {json.dumps(data)}\n\n'
@@ -0,0 +1,174 @@
+import math
+from sqlalchemy import and_, or_, func
+from models import Property
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+GEOHASH_PRECISION = 9 # Stored precision, ~5m cells
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Coarsest cover allowed for a search area; more cells means more index range scans
+MAX_COVER_CELLS = 32
+MAX_ZOOM = 22
+# Cluster cells are about 1/8 of a web map tile wide at every zoom level
+CLUSTER_CELLS_PER_TILE_BITS = 3
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Standard base32 geohash. Nearby points share prefixes, so a B-tree index on it works as a grid index."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        value, bounds = (longitude, lng_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            bounds[0] = mid
+        else:
+            bits <<= 1
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def _cell_size(precision):
+    """(height, width) in degrees of a geohash cell at this precision."""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def covering_cells(min_lat, min_lng, max_lat, max_lng):
+    """
+    Geohash prefixes whose cells together cover the bounding box, using the
+    finest precision that needs at most MAX_COVER_CELLS cells.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = _cell_size(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        cols = math.floor(max_lng / width) - math.floor(min_lng / width) + 1
+        if rows * cols <= MAX_COVER_CELLS or precision == 1:
+            break
+
+    cells = set()
+    lat = min_lat
+    while True:
+        lng = min_lng
+        while True:
+            cells.add(encode_geohash(min(lat, max_lat), min(lng, max_lng), precision))
+            if lng >= max_lng:
+                break
+            lng = min(lng + width, max_lng)
+        if lat >= max_lat:
+            break
+        lat = min(lat + height, max_lat)
+    return sorted(cells)
+
+
+def precision_for_zoom(zoom):
+    """Geohash precision used to cluster listings on a web map at this zoom level."""
+    # A zoom z tile is 360 / 2**z degrees wide; a geohash cell has ceil(5p/2) longitude bits
+    target_bits = zoom + CLUSTER_CELLS_PER_TILE_BITS
+    precision = 1
+    while precision < GEOHASH_PRECISION and (5 * (precision + 1) + 1) // 2 <= target_bits:
+        precision += 1
+    return precision
+
+
+def cluster_query(query, precision):
+    """
+    Groups a filtered Property query by geohash prefix in a single aggregate
+    SELECT. Rows are (cell, count, latitude, longitude, min_price, max_price,
+    property_id); latitude/longitude are the cell's centroid and property_id is
+    only meaningful for single-listing cells.
+    """
+    cell = func.substr(Property.geohash, 1, precision).label('cell')
+    return (
+        query.order_by(None)
+        .with_entities(
+            cell,
+            func.count(Property.id),
+            func.avg(Property.latitude),
+            func.avg(Property.longitude),
+            func.min(Property.price),
+            func.max(Property.price),
+            func.min(Property.id),
+        )
+        .group_by(cell)
+        .order_by(cell)
+    )
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(min_lat, min_lng, max_lat, max_lng) enclosing a circle."""
+    lat_delta = radius_km / KM_PER_DEGREE
+    lng_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return (
+        max(latitude - lat_delta, -90.0), max(longitude - lng_delta, -180.0),
+        min(latitude + lat_delta, 90.0), min(longitude + lng_delta, 180.0),
+    )
+
+
+def within_bounding_box(min_lat, min_lng, max_lat, max_lng):
+    """
+    Filter for properties inside the box. The geohash prefix ranges let the
+    database prune through ix_property_geohash; the lat/lng comparison then
+    trims the cells' overhang exactly.
+    """
+    prefix_ranges = [
+        and_(Property.geohash >= cell, Property.geohash < cell + '~') # '~' sorts after every base32 char
+        for cell in covering_cells(min_lat, min_lng, max_lat, max_lng)
+    ]
+    return and_(
+        or_(*prefix_ranges),
+        Property.latitude.between(min_lat, max_lat),
+        Property.longitude.between(min_lng, max_lng),
+    )
+
+
+def squared_distance_expression(latitude, longitude):
+    """
+    Squared distance in km^2 from the origin as plain SQL arithmetic
+    (equirectangular approximation, well under 1% error at city/region scale),
+    so it can be filtered and sorted on both MySQL and SQLite without trig
+    functions. Compare it against radius_km ** 2.
+    """
+    lng_scale = math.cos(math.radians(latitude))
+    dy = Property.latitude - latitude
+    dx = (Property.longitude - longitude) * lng_scale
+    return (dx * dx + dy * dy) * (KM_PER_DEGREE * KM_PER_DEGREE)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance, used for the distance reported on each result."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def parse_point(value):
+    """'lat,lng' -> (lat, lng). Raises ValueError."""
+    try:
+        latitude, longitude = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError("near must be 'latitude,longitude'")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("near is out of range")
+    return latitude, longitude
+
+
+def parse_bbox(value):
+    """'min_lng,min_lat,max_lng,max_lat' (west,south,east,north) -> (min_lat, min_lng, max_lat, max_lng). Raises ValueError."""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError("bbox must be 'min_lng,min_lat,max_lng,max_lat'")
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise ValueError("bbox is out of range")
+    return min_lat, min_lng, max_lat, max_lng
@@ -0,0 +1,152 @@
+import hashlib
+import io
+import os
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image as PILImage, ImageOps
+from flask import current_app
+from models import db, Image
+from services.cache import response_cache
+from services.storage import storage
+
+# Derivative name -> longest edge in pixels. Images are never upscaled.
+IMAGE_SIZES = {
+    'thumbnail': 320,
+    'medium': 800,
+    'large': 1600,
+}
+WEBP_QUALITY = 80
+EXIF_ORIENTATION = 0x0112
+
+
+def image_url(image, size=None):
+    """URL of an image's derivative, or of the original if there is none (yet)."""
+    if size and image.derivatives and size in image.derivatives:
+        return image.derivatives[size]['url']
+    return image.url
+
+
+def read_source(url):
+    """
+    Original image bytes, read through the configured storage backend.
+    Image URLs come from users, so anything that is not a file of that
+    backend is refused rather than fetched (no requests to arbitrary hosts).
+    """
+    key = storage.key_for_url(url)
+    if key is None:
+        raise ValueError(f"Image URL is not in the configured storage: {url}")
+    with closing(storage.open(key)) as source:
+        data = source.read(storage.max_bytes + 1)
+    if len(data) > storage.max_bytes:
+        raise ValueError(f"Source image is larger than {storage.max_bytes} bytes")
+    return data
+
+
+def render_derivatives(data):
+    """
+    Decodes an image once and renders every IMAGE_SIZES variant as WebP.
+    Returns (width, height, {size: (webp_bytes, width, height)}) where the first
+    two are the original's (EXIF-rotated) dimensions.
+    """
+    with PILImage.open(io.BytesIO(data)) as original:
+        width, height = original.size
+        if original.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8): # Rotated 90/270 degrees
+            width, height = height, width
+        # JPEGs can be decoded directly at 1/2, 1/4 or 1/8 scale, far cheaper than a full decode + resize
+        scale = max(IMAGE_SIZES.values()) / max(original.size)
+        if scale < 1:
+            original.draft('RGB', (round(original.width * scale), round(original.height * scale)))
+        picture = ImageOps.exif_transpose(original)
+        if picture.mode not in ('RGB', 'RGBA'):
+            has_alpha = 'A' in picture.getbands() or 'transparency' in picture.info
+            picture = picture.convert('RGBA' if has_alpha else 'RGB')
+
+        rendered = {}
+        # Largest first, each one downscaled from the previous: much cheaper than resizing the original every time
+        source = picture
+        for size, edge in sorted(IMAGE_SIZES.items(), key=lambda item: -item[1]):
+            resized = source.copy()
+            resized.thumbnail((edge, edge), PILImage.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, 'WEBP', quality=WEBP_QUALITY)
+            rendered[size] = (buffer.getvalue(), resized.width, resized.height)
+            source = resized
+        return width, height, rendered
+
+
+def invalidate_property_images(property_id):
+    """Drops cached listings (requested with image_size=) and the property's cached detail."""
+    response_cache.invalidate_namespace('properties')
+    response_cache.invalidate_namespace(f'property:{property_id}')
+
+
+def generate_derivatives(image_id, invalidate=True):
+    """
+    Renders, stores and records the derivatives of one Image row and returns its
+    property id. The cache is invalidated once the property's last pending image
+    is done rather than once per image; pass invalidate=False to do it yourself.
+    """
+    image = db.session.get(Image, image_id)
+    if image is None: # Replaced or deleted since the task was queued
+        return None
+    property_id = image.property_id
+    width, height, rendered = render_derivatives(read_source(image.url))
+
+    # Keyed by the source URL, so a re-processed image never reuses a cached URL
+    source_hash = hashlib.sha1(image.url.encode('utf-8')).hexdigest()[:12]
+    derivatives = {}
+    for size, (payload, size_width, size_height) in rendered.items():
+        key = f'derivatives/{image.id}/{source_hash}/{size}.webp'
+        url = storage.save(key, io.BytesIO(payload), 'image/webp')
+        derivatives[size] = {'url': url, 'width': size_width, 'height': size_height}
+
+    image.width, image.height, image.derivatives = width, height, derivatives
+    db.session.commit()
+    # Checked after the commit, so of images finishing concurrently at least the last one sees none pending
+    pending = db.session.query(Image.id).filter(Image.property_id == property_id, Image.derivatives.is_(None)).first()
+    if invalidate and pending is None:
+        invalidate_property_images(property_id)
+    return property_id
+
+
+class ImagePipeline:
+    """
+    Queues derivative generation for new images.
+
+    With a broker, each image is a generate_image_derivatives_task on the
+    'images' Celery queue; run a dedicated worker sized to the machine's cores
+    (celery -A app:celery worker -Q images --concurrency=<cores>).
+    Without one (CELERY_TASK_ALWAYS_EAGER), images are processed in this
+    process on a pool of IMAGE_WORKERS threads (default: CPU count) rather than
+    inline in the request; Pillow releases the GIL while resizing and encoding.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._executor = None
+
+    def init_app(self, app):
+        self.app = app
+        if app.config.get('CELERY_TASK_ALWAYS_EAGER'):
+            workers = app.config.get('IMAGE_WORKERS') or os.cpu_count() or 2
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='images')
+        app.extensions['image_pipeline'] = self
+
+    def _process(self, image_id):
+        with self.app.app_context():
+            try:
+                generate_derivatives(image_id)
+            except Exception as e:
+                current_app.logger.error(f"Failed to generate derivatives for image {image_id}: {e}")
+
+    def queue(self, image_ids):
+        """Schedules derivatives for the given Image ids. Call after they are committed."""
+        from services.tasks import generate_image_derivatives_task
+        for image_id in image_ids:
+            if self._executor is not None:
+                self._executor.submit(self._process, image_id)
+            else:
+                generate_image_derivatives_task.delay(image_id)
+
+
+image_pipeline = ImagePipeline() # Initialized by app.py
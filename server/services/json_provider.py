@@ -0,0 +1,45 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError: # Optional: falls back to the stdlib json module
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson when it is installed, with the same
+    output as the default provider: sorted keys, compact separators and the
+    default provider's handling of dates, Decimal, UUID and dataclasses.
+    (orjson writes non-ASCII characters as UTF-8 instead of \\u escapes, which
+    decodes to the same JSON.) Without orjson it is the default provider.
+    Pretty-printed debug responses also go through the stdlib encoder.
+    """
+
+    def _options(self):
+        # Hand datetimes to self.default so they keep Flask's HTTP date format
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def _dumps_bytes(self, obj):
+        return orjson.dumps(obj, default=self.default, option=self._options())
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        if orjson is None or pretty:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        # Encoded straight to bytes; no intermediate str
+        return self._app.response_class(self._dumps_bytes(obj), mimetype=self.mimetype)
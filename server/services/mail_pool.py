@@ -0,0 +1,155 @@
+import os
+import smtplib
+import threading
+import time
+from flask import current_app
+
+
+class SMTPConnectionPool:
+    """
+    Keeps authenticated Flask-Mail SMTP connections open between sends, so a
+    burst of emails pays the connect + TLS handshake + AUTH cost once instead of
+    per message. Each worker process has its own pool (it is reset after a fork).
+
+    Configured via MAIL_POOL_SIZE (idle connections kept open) and
+    MAIL_POOL_IDLE_TIMEOUT (seconds before an idle connection is dropped; SMTP
+    servers close idle sessions on their side too).
+    """
+
+    def __init__(self, mail):
+        self.mail = mail
+        self.max_size = 2
+        self.idle_timeout = 60
+        self._idle = [] # (connection, last_used) pairs, most recently used last
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._metrics = self._empty_metrics()
+
+    def init_app(self, app):
+        self.max_size = app.config.get('MAIL_POOL_SIZE', 2)
+        self.idle_timeout = app.config.get('MAIL_POOL_IDLE_TIMEOUT', 60)
+
+    @staticmethod
+    def _empty_metrics():
+        return {
+            'messages_sent': 0,
+            'messages_failed': 0,
+            'batches': 0,
+            'connections_opened': 0,
+            'reconnects': 0,
+            'send_seconds': 0.0,
+        }
+
+    def metrics(self):
+        """Snapshot of this worker's counters plus derived throughput."""
+        with self._lock:
+            snapshot = dict(self._metrics)
+            snapshot['idle_connections'] = len(self._idle)
+        sent, seconds = snapshot['messages_sent'], snapshot['send_seconds']
+        snapshot['messages_per_second'] = sent / seconds if seconds else 0.0
+        snapshot['messages_per_connection'] = sent / snapshot['connections_opened'] if snapshot['connections_opened'] else 0.0
+        return snapshot
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._metrics[key] += amount
+
+    def _open(self):
+        connection = self.mail.connect().__enter__()
+        self._count('connections_opened')
+        return connection
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.__exit__(None, None, None)
+        except (smtplib.SMTPException, OSError):
+            pass # Already dropped by the server
+
+    def _acquire(self):
+        stale = []
+        connection = None
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked worker: never share the parent's sockets
+                self._idle, self._pid = [], os.getpid()
+                self._metrics = self._empty_metrics()
+            now = time.monotonic()
+            while self._idle:
+                candidate, last_used = self._idle.pop()
+                if now - last_used < self.idle_timeout:
+                    connection = candidate
+                    break
+                stale.append(candidate)
+        for candidate in stale:
+            self._close(candidate)
+        return connection or self._open()
+
+    def _release(self, connection):
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append((connection, time.monotonic()))
+                return
+        self._close(connection)
+
+    def _send_one(self, connection, message):
+        try:
+            connection.send(message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+            # Pooled connection was closed by the server: reconnect once and retry
+            current_app.logger.info(f"SMTP connection lost ({e}), reconnecting")
+            self._close(connection)
+            connection.host = connection.configure_host()
+            self._count('connections_opened')
+            self._count('reconnects')
+            connection.send(message)
+
+    def send(self, message):
+        """Sends one message over a pooled connection. Raises on failure."""
+        failures = self.send_batch([message])
+        if failures:
+            raise failures[0][1]
+
+    def send_batch(self, messages):
+        """
+        Sends several messages over a single connection. A message the server
+        rejects doesn't stop the rest of the batch; returns [(message, error)]
+        for the ones that failed. Raises if no connection can be opened at all.
+        """
+        failures = []
+        broken = None
+        started = time.perf_counter()
+        connection = self._acquire()
+        try:
+            for position, message in enumerate(messages):
+                try:
+                    self._send_one(connection, message)
+                    self._count('messages_sent')
+                except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                    broken = e
+                except smtplib.SMTPException as e:
+                    # Rejected by the server (bad recipient, ...); the session is still usable
+                    failures.append((message, e))
+                except OSError as e:
+                    broken = e
+                except Exception as e:
+                    failures.append((message, e))
+                if broken is not None:
+                    # The connection is unusable even after reconnecting: fail the rest of the batch
+                    failures.extend((remaining, broken) for remaining in messages[position:])
+                    break
+        finally:
+            if broken is None:
+                self._release(connection)
+            else:
+                self._close(connection)
+            self._count('messages_failed', len(failures))
+            self._count('batches')
+            self._count('send_seconds', time.perf_counter() - started)
+        return failures
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._close(connection)
@@ -0,0 +1,132 @@
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from werkzeug.exceptions import TooManyRequests
+from werkzeug.security import check_password_hash
+
+MIN_BCRYPT_ROUNDS = 10
+MAX_BCRYPT_ROUNDS = 15
+DEFAULT_BCRYPT_ROUNDS = 12
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+# Formats written by werkzeug.security.generate_password_hash (older profile updates)
+WERKZEUG_PREFIXES = ('scrypt:', 'pbkdf2:')
+
+
+def hash_scheme(hashed):
+    """'bcrypt', 'werkzeug' or None for a stored password hash."""
+    if hashed.startswith(BCRYPT_PREFIXES):
+        return 'bcrypt'
+    if hashed.startswith(WERKZEUG_PREFIXES):
+        return 'werkzeug'
+    return None
+
+
+class HashingPoolSaturated(TooManyRequests):
+    """Raised when every hashing worker is busy and the wait queue is full (answered with 429)."""
+    description = "Too many authentication requests right now. Please retry shortly."
+
+
+def calibrate_rounds(target_ms, probe_rounds=MIN_BCRYPT_ROUNDS):
+    """
+    Picks the bcrypt work factor whose hash time on this machine is closest to
+    `target_ms`. Each extra round doubles the cost, so one timed probe is enough.
+    Run once per deployment (flask passwords calibrate) and pin the result in
+    BCRYPT_ROUNDS, so every worker hashes with the same cost.
+    """
+    salt = bcrypt.gensalt(probe_rounds)
+    started = time.perf_counter()
+    bcrypt.hashpw(b'calibration-probe', salt)
+    probe_ms = max((time.perf_counter() - started) * 1000, 0.001)
+    rounds = probe_rounds + round(math.log2(target_ms / probe_ms))
+    return max(MIN_BCRYPT_ROUNDS, min(MAX_BCRYPT_ROUNDS, rounds))
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a bounded thread pool (bcrypt releases the GIL while hashing),
+    so a burst of logins can only occupy BCRYPT_POOL_SIZE cores; up to
+    BCRYPT_QUEUE_SIZE more requests wait, anything beyond that gets a 429.
+
+    The work factor is pinned by BCRYPT_ROUNDS (see calibrate_rounds to pick
+    it), never measured per worker: workers that disagreed would keep
+    rewriting each other's hashes.
+
+    New hashes are always bcrypt; legacy werkzeug hashes and bcrypt hashes
+    weaker than BCRYPT_ROUNDS still verify and are replaced on the next
+    successful login (see needs_rehash).
+    """
+
+    def __init__(self):
+        self.rounds = DEFAULT_BCRYPT_ROUNDS
+        self._executor = None
+        self._slots = None
+
+    def init_app(self, app):
+        workers = app.config.get('BCRYPT_POOL_SIZE') or os.cpu_count() or 2
+        queue_size = app.config.get('BCRYPT_QUEUE_SIZE', workers * 4)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+        self.rounds = app.config.get('BCRYPT_ROUNDS') or DEFAULT_BCRYPT_ROUNDS
+        app.logger.info(f"Password hashing: bcrypt cost {self.rounds}, {workers} workers, queue of {queue_size}")
+        app.extensions['password_hasher'] = self
+
+    def _run(self, fn, *args):
+        if self._executor is None: # Not initialized (e.g. scripts): hash inline
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolSaturated()
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        salt = bcrypt.gensalt(self.rounds)
+        return self._run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password, hashed):
+        """
+        Checks a password against a stored hash of any recognized scheme.
+        Unknown or corrupted hashes simply fail verification.
+        """
+        scheme = hash_scheme(hashed)
+        try:
+            if scheme == 'bcrypt':
+                return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+            if scheme == 'werkzeug':
+                return self._run(check_password_hash, hashed, password)
+        except ValueError: # Malformed/truncated hash
+            return False
+        return False
+
+    def needs_rehash(self, hashed):
+        """
+        True for legacy (non-bcrypt) hashes and bcrypt hashes weaker than the
+        configured work factor. Stronger ones are kept: lowering BCRYPT_ROUNDS
+        must never downgrade stored hashes.
+        """
+        if hash_scheme(hashed) != 'bcrypt':
+            return True
+        try:
+            return int(hashed.split('$')[2]) < self.rounds
+        except (IndexError, ValueError):
+            return True
+
+
+password_hasher = PasswordHasher() # Initialized by app.py
+
+
+def hash_password(password):
+    return password_hasher.hash(password)
+
+
+def verify_password(password, hashed):
+    return password_hasher.verify(password, hashed)
+
+
+def needs_rehash(hashed):
+    return password_hasher.needs_rehash(hashed)
@@ -0,0 +1,286 @@
+import csv
+import io
+import json
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from models import db, Property, Image
+from services.geo import encode_geohash
+from services.search import index_properties
+from services.images import image_pipeline
+from services.transactions import after_commit
+
+REQUIRED_FIELDS = ('title', 'description', 'address', 'city', 'state', 'zip_code', 'price')
+NUMERIC_FIELDS = {
+    'price': float,
+    'latitude': float,
+    'longitude': float,
+    'area': float,
+    'bedrooms': int,
+    'bathrooms': int,
+    'year_built': int,
+}
+# Property columns accepted on import, in CSV column order
+PROPERTY_FIELDS = (
+    'title', 'description', 'price', 'property_type', 'status', 'amenities',
+    'address', 'city', 'state', 'zip_code', 'latitude', 'longitude',
+    'bedrooms', 'bathrooms', 'area', 'year_built',
+)
+EXPORT_FIELDS = ('id', 'user_id') + PROPERTY_FIELDS + ('is_featured', 'images', 'created_at', 'updated_at')
+FORMATS = ('csv', 'ndjson')
+IMAGE_SEPARATOR = '|' # Between image URLs in the CSV 'images' column
+
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+EXPORT_CHUNK_ROWS = 500
+
+
+def property_values(data):
+    """
+    Flattens a create_property JSON payload (nested location/features) into
+    Property column values. Returns (values, image_urls).
+    """
+    location = data.get('location') or {}
+    features = data.get('features') or {}
+    values = {
+        'title': data.get('title'),
+        'description': data.get('description'),
+        'price': data.get('price'),
+        'property_type': data.get('property_type'),
+        'status': data.get('status'),
+        'amenities': data.get('amenities'),
+        'address': location.get('address'),
+        'city': location.get('city'),
+        'state': location.get('state'),
+        'zip_code': location.get('zipCode'), # Frontend sends 'zipCode'
+        'latitude': location.get('latitude'),
+        'longitude': location.get('longitude'),
+        'bedrooms': features.get('bedrooms'),
+        'bathrooms': features.get('bathrooms'),
+        'area': features.get('area'),
+        'year_built': features.get('year_built'), # Frontend sends 'year_built'
+    }
+    return values, data.get('images', [])
+
+
+def _number(kind, value):
+    if kind is int and isinstance(value, str):
+        value = float(value) # Accept '3' and '3.0' from spreadsheets
+    return kind(value)
+
+
+def clean_property_values(values):
+    """
+    Validates Property column values with the rules create_property applies
+    and converts numeric fields. Blank strings count as missing.
+    Returns the cleaned values; raises ValueError with the reason.
+    """
+    cleaned = {}
+    for field in PROPERTY_FIELDS:
+        value = values.get(field)
+        if isinstance(value, str) and not value.strip():
+            value = None
+        if value is not None and field in NUMERIC_FIELDS:
+            try:
+                value = _number(NUMERIC_FIELDS[field], value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid {field}: {value!r}")
+        cleaned[field] = value
+
+    if not all(cleaned[field] for field in REQUIRED_FIELDS):
+        raise ValueError('Missing required property fields')
+    return cleaned
+
+
+def _csv_rows(stream):
+    for row in csv.DictReader(stream):
+        images = row.get('images') or ''
+        yield row, [url.strip() for url in images.split(IMAGE_SEPARATOR) if url.strip()]
+
+
+def _ndjson_rows(stream):
+    for line in stream:
+        if not line.strip():
+            yield None, [] # Keep line numbers aligned
+            continue
+        data = json.loads(line)
+        if not isinstance(data, dict):
+            raise ValueError('Each line must be a JSON object')
+        if 'location' in data or 'features' in data:
+            yield property_values(data) # Same payload as POST /api/properties
+        else:
+            yield data, data.get('images') or []
+
+
+def read_rows(stream, fmt):
+    """
+    Lazily parses an import file from a text stream. Yields
+    (row_number, values, image_urls, error) per data row, where error is a
+    message for rows that could not be parsed or validated.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    rows = _csv_rows(stream) if fmt == 'csv' else _ndjson_rows(stream)
+    row_number = 0
+    while True:
+        row_number += 1
+        try:
+            values, images = next(rows)
+        except StopIteration:
+            return
+        except (ValueError, csv.Error) as e: # Malformed line
+            yield row_number, None, [], str(e)
+            if fmt == 'csv':
+                return # The CSV reader can't resume after a broken row
+            rows = _ndjson_rows(stream)
+            continue
+        if values is None:
+            continue
+        try:
+            yield row_number, clean_property_values(values), images, None
+        except ValueError as e:
+            yield row_number, None, [], str(e)
+
+
+def _insert_properties(rows):
+    """Inserts Property rows and returns their new ids, in row order."""
+    dialect = db.session.get_bind().dialect
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        # One executemany (multi-row INSERT ... RETURNING) per batch
+        return db.session.scalars(
+            insert(Property).returning(Property.id, sort_by_parameter_order=True), rows
+        ).all()
+    # No RETURNING for executemany (MySQL): the ORM inserts row by row and reads each cursor.lastrowid
+    properties = [Property(**row) for row in rows]
+    db.session.add_all(properties)
+    db.session.flush()
+    return [prop.id for prop in properties]
+
+
+def _insert_batch(batch, owner_id):
+    """Inserts one batch of validated rows in a single transaction."""
+    rows = []
+    for _, values, _ in batch:
+        geohash = None
+        if values['latitude'] is not None and values['longitude'] is not None:
+            # Bulk inserts skip the model's before_insert listener
+            geohash = encode_geohash(values['latitude'], values['longitude'])
+        rows.append(dict(values, user_id=owner_id, geohash=geohash))
+
+    ids = _insert_properties(rows)
+    images = [
+        {'property_id': property_id, 'url': url}
+        for property_id, (_, _, urls) in zip(ids, batch)
+        for url in urls
+    ]
+    if images:
+        db.session.execute(insert(Image), images)
+        image_ids = db.session.scalars(select(Image.id).where(Image.property_id.in_(ids))).all()
+        after_commit(image_pipeline.queue, image_ids) # Derivatives once the batch is committed
+    index_properties(dict(row, id=property_id) for property_id, row in zip(ids, rows))
+    db.session.commit()
+
+
+def import_properties(rows, owner_id, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Imports rows from read_rows() for `owner_id`, committing every `batch_size`
+    valid rows. A batch that fails to insert is rolled back and reported as a
+    whole; invalid rows are reported individually and skipped.
+    Returns a summary with the imported/failed counts and the first errors.
+    """
+    summary = {'imported': 0, 'failed': 0, 'batches': 0, 'errors': []}
+
+    def report(error):
+        summary['failed'] += error.pop('rows', 1)
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append(error)
+
+    def flush(batch):
+        if not batch:
+            return
+        summary['batches'] += 1
+        try:
+            _insert_batch(batch, owner_id)
+            summary['imported'] += len(batch)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            report({
+                'batch': summary['batches'],
+                'firstRow': batch[0][0],
+                'lastRow': batch[-1][0],
+                'rows': len(batch),
+                'error': str(e.orig) if getattr(e, 'orig', None) else str(e),
+            })
+
+    batch = []
+    for row_number, values, images, error in rows:
+        if error:
+            report({'row': row_number, 'error': error})
+            continue
+        batch.append((row_number, values, images))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    flush(batch)
+    return summary
+
+
+def _property_chunks(query):
+    """
+    Yields the properties of `query` by id, EXPORT_CHUNK_ROWS at a time. Each
+    chunk is an ordinary buffered query continuing after the last id of the
+    previous one: the image selectinload runs its own SELECT, which a
+    server-side cursor (yield_per) would block on drivers like mysqlclient.
+    """
+    last_id = None
+    while True:
+        chunk_query = query if last_id is None else query.filter(Property.id > last_id)
+        chunk = chunk_query.order_by(Property.id).limit(EXPORT_CHUNK_ROWS).all()
+        yield from chunk
+        if len(chunk) < EXPORT_CHUNK_ROWS:
+            return
+        last_id = chunk[-1].id
+
+
+def export_rows(query):
+    """
+    Yields one flat dict per property (the import columns plus id, owner and
+    timestamps), reading the query in chunks with images batch-loaded per chunk.
+    """
+    for prop in _property_chunks(query):
+        row = {field: getattr(prop, field) for field in EXPORT_FIELDS if field != 'images'}
+        row['images'] = [img.url for img in prop.images]
+        for field in ('created_at', 'updated_at'):
+            row[field] = row[field].isoformat() if row[field] else None
+        yield row
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return IMAGE_SEPARATOR.join(value)
+    return '' if value is None else value
+
+
+def write_csv(rows):
+    """Encodes export rows as CSV text chunks of EXPORT_CHUNK_ROWS rows."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow({field: _csv_value(value) for field, value in row.items()})
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_ndjson(rows):
+    """Encodes export rows as newline delimited JSON text chunks."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, separators=(',', ':')))
+        if len(lines) == EXPORT_CHUNK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
@@ -0,0 +1,370 @@
+import base64
+import json
+from datetime import datetime
+from functools import lru_cache
+from sqlalchemy import or_, and_, case, func, select, DateTime
+from sqlalchemy.orm import joinedload, selectinload, load_only
+from models import db, Property, Image, Favorite, PROPERTY_SHAPE
+from services.search import keyword_filter, relevance
+from services.serializers import compile_serializer
+from services.images import image_url
+from services import geo
+
+DEFAULT_RADIUS_KM = 25
+MAX_RADIUS_KM = 500
+
+BEDROOM_FACET_MAX = 5 # 5+ is the last bucket
+PRICE_FACET_EDGES = (50000, 100000, 250000, 500000, 1000000)
+
+
+def _bucket_expression(column, edges):
+    """CASE expression labelling a numeric column with its 'low-high' bucket ('high+' for the last)."""
+    labels = [f"{low}-{high}" for low, high in zip((0,) + edges, edges)]
+    return case(
+        *[(column < high, label) for high, label in zip(edges, labels)],
+        else_=f"{edges[-1]}+"
+    )
+
+
+# Facets available through ?facets=, as grouping expressions
+FACETS = {
+    'property_type': Property.property_type,
+    'status': Property.status,
+    'city': Property.city,
+    'bedrooms': case((Property.bedrooms >= BEDROOM_FACET_MAX, f"{BEDROOM_FACET_MAX}+"), else_=Property.bedrooms),
+    'price': _bucket_expression(Property.price, PRICE_FACET_EDGES),
+}
+
+
+def _thumbnail(image):
+    return image_url(image, 'thumbnail') if image is not None else None
+
+
+# Listing fields that aren't part of Property.serialize, in the same shape notation
+EXTRA_FIELDS = {
+    'thumbnail': ('cover_image', _thumbnail), # The first image's thumbnail derivative
+}
+# Per-user annotations available through ?include=
+LISTING_INCLUDES = ('is_favorite',)
+# Presets for ?view=
+LISTING_VIEWS = {
+    'card': (
+        'id', 'title', 'price', 'location.city', 'location.state', 'propertyType', 'status',
+        'features.bedrooms', 'features.bathrooms', 'thumbnail',
+    ),
+}
+
+
+def _fieldset_shape(fields):
+    """Serializer shape for field paths ('title', 'location', 'location.city', ...). Raises ValueError."""
+    shape = {}
+    for field in fields:
+        key, _, sub = field.partition('.')
+        spec = PROPERTY_SHAPE.get(key, EXTRA_FIELDS.get(key))
+        if spec is None or (sub and not (isinstance(spec, dict) and sub in spec)):
+            raise ValueError(f"Invalid field: {field}")
+        if not sub:
+            shape[key] = spec
+        elif shape.get(key) is not spec: # Not already requested whole
+            shape.setdefault(key, {})[sub] = spec[sub]
+    return shape
+
+
+def _shape_attributes(shape):
+    for spec in shape.values():
+        if isinstance(spec, dict):
+            yield from _shape_attributes(spec)
+        elif isinstance(spec, tuple):
+            yield spec[0]
+        elif isinstance(spec, str):
+            yield spec
+
+
+def parse_fields(fields, view=None):
+    """
+    Field paths for ?fields= (comma separated, dotted for nested keys such as
+    location.city) plus the ?view= preset, always including id. Returns None
+    when neither is given, meaning the full Property.serialize().
+    Raises ValueError for unknown fields or views.
+    """
+    names = [name.strip() for name in (fields or '').split(',') if name.strip()]
+    if view:
+        if view not in LISTING_VIEWS:
+            raise ValueError(f"view must be one of {', '.join(LISTING_VIEWS)}")
+        names = list(LISTING_VIEWS[view]) + names
+    if not names:
+        return None
+    fields = tuple(dict.fromkeys(['id'] + names))
+    _fieldset_shape(fields)
+    return fields
+
+
+@lru_cache(maxsize=128)
+def fieldset_serializer(fields):
+    """Precompiled serializer for a parse_fields() result."""
+    return compile_serializer(_fieldset_shape(fields), f"Property[{','.join(fields)}]")
+
+
+def listing_query(fields=None, columns=()):
+    """
+    Base query for property listings.
+    Images for every property on the page are batch-loaded in a single extra
+    SELECT ... WHERE property_id IN (...) instead of one query per property.
+
+    With `fields` (see parse_fields) only the Property columns those fields
+    need, plus `columns`, are selected, and images are loaded only if a field
+    uses them. Serialize the results with fieldset_serializer(fields): anything
+    else would lazy-load the skipped columns row by row.
+    """
+    if fields is None:
+        return Property.query.options(selectinload(Property.images))
+
+    attributes = set(_shape_attributes(_fieldset_shape(fields))) | set(columns)
+    relationships = Property.__mapper__.relationships
+    options = [load_only(*[getattr(Property, name) for name in sorted(attributes) if name not in relationships])]
+    for name in sorted(attributes & set(relationships.keys())): # images, cover_image
+        options.append(selectinload(getattr(Property, name)).load_only(Image.url, Image.derivatives))
+    return Property.query.options(*options)
+
+
+def detail_query():
+    """Query for a single property with its images joined in the same statement."""
+    return Property.query.options(joinedload(Property.images))
+
+
+def favorites_query(user_id):
+    """Properties favourited by a user, with images batch-loaded."""
+    return (
+        listing_query()
+        .join(Favorite, Favorite.property_id == Property.id)
+        .filter(Favorite.user_id == user_id)
+        .order_by(Favorite.created_at.desc())
+    )
+
+
+def favorite_property_ids(user_id, property_ids):
+    """
+    The subset of `property_ids` the user has favourited, as a set, in one
+    SELECT ... WHERE user_id = ? AND property_id IN (...) on the
+    uq_favorite_user_property index.
+    """
+    property_ids = list(property_ids)
+    if not property_ids:
+        return set()
+    return set(db.session.scalars(
+        select(Favorite.property_id)
+        .where(Favorite.user_id == user_id, Favorite.property_id.in_(property_ids))
+    ))
+
+
+def listing_origin(args):
+    """(lat, lng) from ?near=lat,lng, or None. Raises ValueError if malformed."""
+    near = args.get('near')
+    return geo.parse_point(near) if near else None
+
+
+def apply_filters(query, args):
+    """
+    Applies the listing filters supported by GET /api/properties.
+    `args` is the request's query args (or any mapping with a `get(key, type=...)`).
+    Raises ValueError for malformed geo parameters (near, radius_km, bbox).
+    """
+    location = args.get('location')
+    min_price = args.get('minPrice', type=float)
+    max_price = args.get('maxPrice', type=float)
+    property_type = args.get('property_type')
+    status = args.get('status')
+    min_bedrooms = args.get('minBedrooms', type=int)
+    min_bathrooms = args.get('minBathrooms', type=int)
+    min_area = args.get('minArea', type=float)
+    keywords = args.get('keywords')
+
+    if args.get('variant') == 'featured':
+        query = query.filter(Property.is_featured == True)
+
+    if location:
+        location_term = f"%{location.lower()}%"
+        query = query.filter(
+            or_(
+                Property.address.ilike(location_term),
+                Property.city.ilike(location_term),
+                Property.state.ilike(location_term),
+                Property.zip_code.ilike(location_term) # if zip code search is desired
+            )
+        )
+    if min_price is not None:
+        query = query.filter(Property.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Property.price <= max_price)
+    if property_type:
+        query = query.filter(Property.property_type == property_type)
+    if status:
+        query = query.filter(Property.status == status)
+    if min_bedrooms is not None:
+        query = query.filter(Property.bedrooms >= min_bedrooms)
+    if min_bathrooms is not None:
+        query = query.filter(Property.bathrooms >= min_bathrooms)
+    if min_area is not None:
+        query = query.filter(Property.area >= min_area)
+    if keywords:
+        # Full-text index lookup (MySQL FULLTEXT / SQLite FTS5), see services/search.py
+        query = query.filter(keyword_filter(keywords))
+
+    # Geo filters: prune by geohash cells first, then compare exact coordinates/distance
+    bbox = args.get('bbox')
+    if bbox:
+        query = query.filter(geo.within_bounding_box(*geo.parse_bbox(bbox)))
+    origin = listing_origin(args)
+    if origin:
+        radius_km = args.get('radius_km', default=DEFAULT_RADIUS_KM, type=float)
+        if not 0 < radius_km <= MAX_RADIUS_KM:
+            raise ValueError(f"radius_km must be between 0 and {MAX_RADIUS_KM}")
+        query = query.filter(
+            geo.within_bounding_box(*geo.bounding_box(*origin, radius_km)),
+            geo.squared_distance_expression(*origin) <= radius_km ** 2,
+        )
+    return query
+
+
+def parse_includes(value):
+    """Names from a comma separated ?include= value (is_favorite). Raises ValueError for unknown ones."""
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in LISTING_INCLUDES]
+    if unknown:
+        raise ValueError(f"Invalid include: {', '.join(unknown)}")
+    return set(names)
+
+
+def parse_facets(value):
+    """Facet names from a comma separated ?facets= value. Raises ValueError for unknown facets."""
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in FACETS]
+    if unknown:
+        raise ValueError(f"Invalid facet: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def facet_counts(query, names):
+    """
+    Counts the filtered listings per value of each requested facet.
+    Runs a single GROUP BY over all requested facets together and sums the
+    combinations per facet in Python, instead of one COUNT query per facet value.
+    Returns {facet: {value: count}}; NULL values are skipped.
+    """
+    expressions = [FACETS[name].label(name) for name in names]
+    rows = (
+        query.order_by(None)
+        .with_entities(*expressions, func.count(Property.id))
+        .group_by(*expressions)
+        .all()
+    )
+    counts = {name: {} for name in names}
+    for row in rows:
+        count = row[-1]
+        for name, value in zip(names, row[:-1]):
+            if value is None:
+                continue
+            value = str(value)
+            counts[name][value] = counts[name].get(value, 0) + count
+    return counts
+
+
+def sort_key(sort, keywords=None, origin=None):
+    """
+    Resolves a sort parameter to (expression, descending).
+    Any Property column is accepted; a leading '-' sorts descending.
+    sort=relevance orders by full-text match score for `keywords` (best first)
+    and falls back to the default created_at order when there are no keywords.
+    sort=distance orders by distance from `origin` (the near= point).
+    Raises ValueError for unknown sort fields.
+    """
+    if sort.lstrip('-') == 'distance':
+        if not origin:
+            raise ValueError("sort=distance requires near=latitude,longitude")
+        return geo.squared_distance_expression(*origin), sort.startswith('-')
+    if sort.lstrip('-') == 'relevance':
+        if not keywords:
+            return Property.created_at, False
+        return relevance(keywords), True
+    descending = sort.startswith('-')
+    field = sort[1:] if descending else sort
+    if field not in Property.__table__.columns:
+        raise ValueError(f"Invalid sort field: {field}")
+    return getattr(Property, field), descending
+
+
+def apply_sort(query, sort, keywords=None, origin=None):
+    """Orders the query by the given sort parameter (see sort_key)."""
+    expression, descending = sort_key(sort, keywords, origin)
+    return query.order_by(expression.desc() if descending else expression.asc())
+
+
+def encode_cursor(sort, value, last_id):
+    """Opaque cursor pointing just after the row with the given sort value and id."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({'sort': sort, 'value': value, 'id': last_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort, expression):
+    """Returns (value, last_id) from a cursor. Raises ValueError if it is malformed or for another sort."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(payload, dict) or not isinstance(payload.get('id'), int):
+        raise ValueError("Invalid cursor")
+    if payload.get('sort') != sort:
+        raise ValueError("Cursor does not match the requested sort")
+
+    value = payload.get('value')
+    if value is not None and isinstance(expression.type, DateTime):
+        value = datetime.fromisoformat(value)
+    return value, payload['id']
+
+
+def _after(expression, descending, value, last_id):
+    """
+    Keyset condition for rows that come after (value, last_id) in
+    ORDER BY expression, id. MySQL and SQLite sort NULLs first ascending and
+    last descending, so NULL sort values are handled explicitly.
+    """
+    if descending:
+        if value is None:
+            return and_(expression.is_(None), Property.id < last_id)
+        return or_(expression < value, and_(expression == value, Property.id < last_id), expression.is_(None))
+    if value is None:
+        return or_(and_(expression.is_(None), Property.id > last_id), expression.isnot(None))
+    return or_(expression > value, and_(expression == value, Property.id > last_id))
+
+
+def keyset_page(query, sort, page_size, cursor=None, keywords=None, origin=None):
+    """
+    Fetches one page ordered by (sort field, id) starting after `cursor`.
+    Unlike paginate() this issues no COUNT(*) and no OFFSET scan, so every page
+    costs the same. Returns (properties, next_cursor); next_cursor is None on the last page.
+    Raises ValueError for an invalid sort, cursor or page_size.
+    """
+    if page_size < 1:
+        raise ValueError("page_size must be positive")
+    expression, descending = sort_key(sort, keywords, origin)
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort, expression)
+        query = query.filter(_after(expression, descending, value, last_id))
+
+    if descending:
+        query = query.order_by(expression.desc(), Property.id.desc())
+    else:
+        query = query.order_by(expression.asc(), Property.id.asc())
+
+    # Fetch one extra row to know whether there is a next page
+    rows = query.add_columns(expression.label('sort_value')).limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    next_cursor = None
+    if has_more:
+        last_property, last_value = rows[-1]
+        next_cursor = encode_cursor(sort, last_value, last_property.id)
+    return [row[0] for row in rows], next_cursor
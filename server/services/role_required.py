@@ -1,17 +1,16 @@
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from flask_jwt_extended import verify_jwt_in_request, get_current_user
 from functools import wraps
 from flask import jsonify
-from models import User
 
 def role_required(*roles):
     def wrapper(fn):
         @wraps(fn)
         def decorator(*args, **kwargs):
-            # Verify user JWT is valid
+            # Verify user JWT is valid; the user is loaded once per request by the
+            # JWT user_lookup_loader and reused by the view through get_current_user()
             verify_jwt_in_request()
-            user_id = get_jwt_identity()
-            user = User.query.get(user_id)
-            if not user or user.role not in roles:
+            user = get_current_user()
+            if not user or not user.is_active or user.role not in roles:
                 return jsonify({"error": "Access forbidden: insufficient permissions"}), 403
             return fn(*args, **kwargs)
         return decorator
@@ -0,0 +1,124 @@
+import re
+from sqlalchemy import or_, text, select, literal, literal_column, table, column
+from sqlalchemy.dialects.mysql import match
+from models import db, Property
+
+# SQLite has no FULLTEXT index, so tests/local development use an FTS5 table
+# whose rowid mirrors property.id. On MySQL the FULLTEXT index declared on
+# Property (ix_property_fulltext) is maintained by the database itself.
+FTS_TABLE = 'property_fts'
+fts_table = table(FTS_TABLE, column('rowid'), column(FTS_TABLE))
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _dialect():
+    return db.engine.dialect.name
+
+
+def _fts_query(keywords):
+    """Turns free text into an FTS5 query: every word as a quoted prefix term, OR-ed together."""
+    tokens = _TOKEN_RE.findall(keywords.lower())
+    return ' OR '.join(f'"{token}"*' for token in tokens)
+
+
+def _mysql_match(keywords):
+    return match(Property.title, Property.description, Property.amenities, against=keywords)
+
+
+def init_search_index():
+    """
+    Creates the SQLite FTS5 table (if needed) and indexes any properties missing from it.
+    Must be called inside an app context, after db.create_all().
+    """
+    if _dialect() != 'sqlite':
+        return
+    db.session.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(title, description, amenities)"
+    ))
+    db.session.execute(text(
+        f"INSERT INTO {FTS_TABLE} (rowid, title, description, amenities) "
+        f"SELECT id, title, description, COALESCE(amenities, '') FROM property "
+        f"WHERE id NOT IN (SELECT rowid FROM {FTS_TABLE})"
+    ))
+    db.session.commit()
+
+
+def index_property(prop):
+    """
+    (Re)indexes a single property. Runs in the caller's transaction, so call it
+    before the commit that persists the property (prop.id must already be set).
+    """
+    if _dialect() != 'sqlite':
+        return
+    remove_property(prop.id)
+    index_properties([{'id': prop.id, 'title': prop.title, 'description': prop.description, 'amenities': prop.amenities}])
+
+
+def index_properties(rows):
+    """
+    Indexes new properties given as mappings with id, title, description and
+    amenities, in one executemany. Runs in the caller's transaction.
+    """
+    if _dialect() != 'sqlite':
+        return
+    params = [
+        {'id': row['id'], 'title': row['title'], 'description': row['description'], 'amenities': row['amenities'] or ''}
+        for row in rows
+    ]
+    if params:
+        db.session.execute(
+            text(f"INSERT INTO {FTS_TABLE} (rowid, title, description, amenities) "
+                 f"VALUES (:id, :title, :description, :amenities)"),
+            params
+        )
+
+
+def remove_property(property_id):
+    """Drops a property from the search index. Runs in the caller's transaction."""
+    if _dialect() != 'sqlite':
+        return
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': property_id})
+
+
+def keyword_filter(keywords):
+    """Filter clause matching properties whose title, description or amenities contain the keywords."""
+    dialect = _dialect()
+    if dialect == 'mysql':
+        return _mysql_match(keywords)
+    if dialect == 'sqlite':
+        fts_query = _fts_query(keywords)
+        if not fts_query:
+            return literal(False)
+        matching_ids = select(fts_table.c.rowid).where(
+            literal_column(FTS_TABLE).op('MATCH')(fts_query)
+        )
+        return Property.id.in_(matching_ids)
+
+    # Any other database: fall back to a substring scan
+    keyword_term = f"%{keywords.lower()}%"
+    return or_(
+        Property.title.ilike(keyword_term),
+        Property.description.ilike(keyword_term),
+        Property.amenities.ilike(keyword_term)
+    )
+
+
+def relevance(keywords):
+    """Relevance score for the keywords; higher is a better match."""
+    dialect = _dialect()
+    if dialect == 'mysql':
+        return _mysql_match(keywords)
+    if dialect == 'sqlite':
+        fts_query = _fts_query(keywords)
+        if not fts_query:
+            return literal(0)
+        # bm25() is only defined inside a MATCH query and is lower for better matches
+        return (
+            select(-literal_column(f'bm25({FTS_TABLE})'))
+            .select_from(fts_table)
+            .where(literal_column(FTS_TABLE).op('MATCH')(fts_query))
+            .where(fts_table.c.rowid == Property.id)
+            .scalar_subquery()
+        )
+    return literal(0)
@@ -0,0 +1,92 @@
+"""
+Precompiled model serializers.
+
+A serializer is declared as a shape mapping output keys to what they hold:
+
+    'key': 'column'                  the attribute's value
+    'key': ('column', converter)     converter(value)
+    'key': {...}                     a nested object with its own shape
+    'key': constant(value)           a fixed value
+
+compile_serializer() turns the shape into a single generated function that
+builds the whole (nested) dict in one expression, reading attributes straight
+from the instance __dict__ instead of going through the ORM descriptors. If an
+attribute isn't loaded (expired after a commit, deferred, an unloaded
+relationship) it falls back to regular attribute access, which loads it as usual.
+"""
+from datetime import timezone
+
+
+class constant:
+    def __init__(self, value):
+        self.value = value
+
+
+class _AttributeView:
+    """Mapping view over an object's attributes, for the slow path."""
+    __slots__ = ('obj',)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __getitem__(self, name):
+        return getattr(self.obj, name)
+
+
+def isoformat(value):
+    """
+    ISO 8601 text for a timestamp, always as naive UTC like the database returns
+    it, so objects serialized before a commit match what later reads return.
+    """
+    if not value:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+
+def comma_list(value):
+    """'a, b' -> ['a', 'b'] for comma separated text columns."""
+    return [item.strip() for item in value.split(',')] if value else []
+
+
+def nested(related):
+    """Serializes a related model (many-to-one), or None."""
+    return related.serialize() if related is not None else None
+
+
+def _expression(shape, namespace):
+    items = []
+    for key, spec in shape.items():
+        if isinstance(spec, dict):
+            value = _expression(spec, namespace)
+        elif isinstance(spec, constant):
+            name = f'_k{len(namespace)}'
+            namespace[name] = spec.value
+            value = name
+        elif isinstance(spec, tuple):
+            column, converter = spec
+            name = f'_c{len(namespace)}'
+            namespace[name] = converter
+            value = f'{name}(_d[{column!r}])'
+        else:
+            value = f'_d[{spec!r}]'
+        items.append(f'{key!r}: {value}')
+    return '{' + ', '.join(items) + '}'
+
+
+def compile_serializer(shape, name='serialize'):
+    """Returns a function obj -> dict for the given shape (see module docstring)."""
+    namespace = {}
+    source = f'def _build(_d):\n    return {_expression(shape, namespace)}\n'
+    exec(compile(source, f'<serializer {name}>', 'exec'), namespace)
+    build = namespace['_build']
+
+    def serialize(obj):
+        try:
+            return build(obj.__dict__)
+        except KeyError: # Something isn't loaded yet
+            return build(_AttributeView(obj))
+
+    serialize.__name__ = name
+    return serialize
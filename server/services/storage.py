@@ -0,0 +1,301 @@
+import os
+import re
+import tempfile
+import time
+import urllib.request
+import uuid
+from itsdangerous import URLSafeTimedSerializer
+from flask import url_for
+
+# Accepted image uploads and the extension their storage keys get
+IMAGE_TYPES = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+}
+DOWNLOAD_TIMEOUT = 30 # Seconds, for backends read over HTTP
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds UPLOAD_MAX_BYTES."""
+
+
+class _LimitedReader:
+    """File-like wrapper that reads a stream in chunks and refuses to go past max_bytes."""
+
+    def __init__(self, stream, max_bytes):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = self.stream.read(size)
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self.max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {self.max_bytes} bytes")
+        return chunk
+
+
+class LocalStorage:
+    """
+    Files on the local filesystem under `root`, served from `public_url`
+    (GET /api/upload/files/<key> unless a web server serves the directory).
+    Direct uploads go to PUT /api/upload/direct/<token>, which streams the
+    body to disk; the token is signed, so that endpoint needs no session.
+    Those saves never replace an existing file, which makes a token single-use.
+    """
+
+    def __init__(self, root, public_url, signer):
+        self.root = os.path.abspath(root)
+        self.public_url = public_url.rstrip('/')
+        self.signer = signer
+
+    def path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def save(self, key, stream, content_type, max_bytes, chunk_size, overwrite=True):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        reader = _LimitedReader(stream, max_bytes)
+        # Written to a temp file next to the target and renamed, so a partial upload is never visible
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = reader.read(chunk_size)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+            if overwrite:
+                os.replace(temp_path, path)
+            else:
+                os.link(temp_path, path) # Atomic, and fails with FileExistsError if the key is taken
+                os.unlink(temp_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return self.url(key)
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def key_for_url(self, url):
+        if url.startswith(self.public_url + '/'):
+            return url[len(self.public_url) + 1:]
+        return None
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key):
+        return f'{self.public_url}/{key}'
+
+    def upload_target(self, key, content_type, max_bytes, expires_in):
+        token = self.signer.dumps({'key': key, 'content_type': content_type, 'max_bytes': max_bytes})
+        return {
+            'method': 'PUT',
+            'url': url_for('upload.direct_upload', token=token, _external=True),
+            'headers': {'Content-Type': content_type},
+        }
+
+
+class S3Storage:
+    """
+    S3 or any S3-compatible service (MinIO, R2, ...) through a boto3 client.
+    Direct uploads are presigned POSTs, which also let S3 enforce the size limit.
+    """
+
+    def __init__(self, client, bucket, public_url):
+        self.client = client
+        self.bucket = bucket
+        self.public_url = public_url.rstrip('/')
+
+    def save(self, key, stream, content_type, max_bytes, chunk_size, overwrite=True):
+        if not overwrite and self._exists(key):
+            raise FileExistsError(f"Storage key already exists: {key}")
+        # upload_fileobj streams the body in multipart chunks instead of reading it whole
+        self.client.upload_fileobj(
+            _LimitedReader(stream, max_bytes), self.bucket, key, ExtraArgs={'ContentType': content_type}
+        )
+        return self.url(key)
+
+    def _exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        return True
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=key)['Body']
+
+    def key_for_url(self, url):
+        if url.startswith(self.public_url + '/'):
+            return url[len(self.public_url) + 1:]
+        return None
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def url(self, key):
+        return f'{self.public_url}/{key}'
+
+    def upload_target(self, key, content_type, max_bytes, expires_in):
+        post = self.client.generate_presigned_post(
+            self.bucket, key,
+            Fields={'Content-Type': content_type},
+            Conditions=[{'Content-Type': content_type}, ['content-length-range', 1, max_bytes]],
+            ExpiresIn=expires_in,
+        )
+        return {'method': 'POST', 'url': post['url'], 'fields': post['fields']}
+
+
+class CloudinaryStorage:
+    """
+    Cloudinary, the original image host. Direct uploads are signed upload
+    parameters (with overwrite off, so replaying them cannot replace the
+    file); the final URL comes back in Cloudinary's upload response.
+    """
+
+    def __init__(self, cloud_name, api_key, api_secret):
+        import cloudinary
+        cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret, secure=True)
+        self.cloud_name = cloud_name
+        self.api_key = api_key
+        self.api_secret = api_secret
+
+    @staticmethod
+    def _public_id(key):
+        return os.path.splitext(key)[0]
+
+    def save(self, key, stream, content_type, max_bytes, chunk_size, overwrite=True):
+        import cloudinary.uploader
+        result = cloudinary.uploader.upload(
+            _LimitedReader(stream, max_bytes), public_id=self._public_id(key), overwrite=overwrite
+        )
+        if not overwrite and result.get('existing'):
+            raise FileExistsError(f"Storage key already exists: {key}")
+        return result['secure_url']
+
+    def open(self, key):
+        # Unversioned delivery URL of the original, always on Cloudinary's own host
+        import cloudinary.utils
+        public_id, extension = os.path.splitext(key)
+        url, _ = cloudinary.utils.cloudinary_url(public_id, format=extension.lstrip('.') or None, secure=True)
+        return urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT)
+
+    def key_for_url(self, url):
+        # Only untransformed originals of this cloud: https://res.cloudinary.com/<cloud>/image/upload/[v<n>/]<key>
+        prefix = re.escape(f'https://res.cloudinary.com/{self.cloud_name}/image/upload/')
+        match = re.fullmatch(prefix + r'(?:v\d+/)?([\w\-/]+\.\w+)', url)
+        return match.group(1) if match else None
+
+    def delete(self, key):
+        import cloudinary.uploader
+        cloudinary.uploader.destroy(self._public_id(key))
+
+    def url(self, key):
+        return None # Versioned; only known from the upload response
+
+    def upload_target(self, key, content_type, max_bytes, expires_in):
+        import cloudinary.utils
+        # 'false' as text: the signature skips falsy values, but Cloudinary signs the field it receives
+        params = {'public_id': self._public_id(key), 'overwrite': 'false', 'timestamp': int(time.time())}
+        params['signature'] = cloudinary.utils.api_sign_request(params, self.api_secret)
+        params['api_key'] = self.api_key
+        return {
+            'method': 'POST',
+            'url': f'https://api.cloudinary.com/v1_1/{self.cloud_name}/image/upload',
+            'fields': params,
+        }
+
+
+class Storage:
+    """
+    Where uploaded images live. Configured via STORAGE_BACKEND: 'cloudinary'
+    (default), 'local' (STORAGE_LOCAL_ROOT / STORAGE_PUBLIC_URL) or 's3'
+    (S3_BUCKET, S3_ENDPOINT_URL, S3_REGION, S3_PUBLIC_URL).
+
+    Clients should upload directly to the backend with a token from
+    upload_target() and only send the resulting URL to the API, so large
+    files never occupy a web worker.
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.signer = None
+        self.max_bytes = 10 * 1024 * 1024
+        self.chunk_size = 64 * 1024
+        self.token_ttl = 900
+
+    def init_app(self, app, backend=None):
+        self.max_bytes = app.config.get('UPLOAD_MAX_BYTES', self.max_bytes)
+        self.chunk_size = app.config.get('UPLOAD_CHUNK_SIZE', self.chunk_size)
+        self.token_ttl = app.config.get('UPLOAD_TOKEN_TTL', self.token_ttl)
+        self.signer = URLSafeTimedSerializer(app.config['JWT_SECRET_KEY'], salt='direct-upload')
+
+        kind = app.config.get('STORAGE_BACKEND', 'cloudinary')
+        if backend is not None:
+            self.backend = backend
+        elif kind == 'local':
+            root = app.config.get('STORAGE_LOCAL_ROOT') or os.path.join(app.instance_path, 'uploads')
+            self.backend = LocalStorage(root, app.config.get('STORAGE_PUBLIC_URL', '/api/upload/files'), self.signer)
+        elif kind == 's3':
+            import boto3  # Optional dependency, only needed for the s3 backend
+            client = boto3.client('s3', endpoint_url=app.config.get('S3_ENDPOINT_URL'), region_name=app.config.get('S3_REGION'))
+            public_url = app.config.get('S3_PUBLIC_URL') or f"{client.meta.endpoint_url}/{app.config['S3_BUCKET']}"
+            self.backend = S3Storage(client, app.config['S3_BUCKET'], public_url)
+        else:
+            self.backend = CloudinaryStorage(
+                app.config['CLOUDINARY_CLOUD_NAME'], app.config['CLOUDINARY_API_KEY'], app.config['CLOUDINARY_API_SECRET']
+            )
+        app.extensions['storage'] = self
+
+    @staticmethod
+    def new_key(content_type, prefix='properties'):
+        """Fresh storage key for an upload. Raises ValueError for unsupported content types."""
+        if content_type not in IMAGE_TYPES:
+            raise ValueError(f"Unsupported image type: {content_type}")
+        return f'{prefix}/{uuid.uuid4().hex}{IMAGE_TYPES[content_type]}'
+
+    def save(self, key, stream, content_type, overwrite=True):
+        """
+        Streams `stream` to the backend in chunks and returns the file's URL.
+        Raises UploadTooLarge, or FileExistsError if `key` exists and not `overwrite`.
+        """
+        return self.backend.save(key, stream, content_type, self.max_bytes, self.chunk_size, overwrite=overwrite)
+
+    def open(self, key):
+        return self.backend.open(key)
+
+    def key_for_url(self, url):
+        """Key of a file of the configured backend from its URL, or None if `url` points anywhere else."""
+        return self.backend.key_for_url(url)
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def url(self, key):
+        return self.backend.url(key)
+
+    def upload_target(self, key, content_type):
+        """Where and how the client uploads the file for `key` directly."""
+        return self.backend.upload_target(key, content_type, self.max_bytes, self.token_ttl)
+
+    def load_upload_token(self, token):
+        """Payload of a LocalStorage upload token. Raises itsdangerous.BadSignature (or SignatureExpired)."""
+        return self.signer.loads(token, max_age=self.token_ttl)
+
+
+storage = Storage() # Initialized by app.py
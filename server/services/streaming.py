@@ -0,0 +1,41 @@
+from flask import current_app, stream_with_context
+
+STREAM_CHUNK_ROWS = 200
+
+
+def json_array_chunks(rows, chunk_size=STREAM_CHUNK_ROWS):
+    """Encodes an iterable of JSON values as one JSON array, emitted in chunks of chunk_size values."""
+    dumps = current_app.json.dumps
+    yield '['
+    buffer = []
+    separator = ''
+    for row in rows:
+        buffer.append(dumps(row))
+        if len(buffer) == chunk_size:
+            yield separator + ','.join(buffer)
+            buffer, separator = [], ','
+    if buffer:
+        yield separator + ','.join(buffer)
+    yield ']'
+
+
+def json_object_chunks(key, rows, trailer=None, chunk_size=STREAM_CHUNK_ROWS):
+    """
+    Encodes {key: [rows...], **trailer()} in chunks. `trailer` is called after
+    the rows are consumed, so it can report things only known at the end
+    (such as the next page cursor).
+    """
+    dumps = current_app.json.dumps
+    yield '{' + dumps(key) + ':'
+    yield from json_array_chunks(rows, chunk_size)
+    for name, value in (trailer() if trailer else {}).items():
+        yield ',' + dumps(name) + ':' + dumps(value)
+    yield '}'
+
+
+def streamed_json(chunks, status=200):
+    """
+    Response that sends JSON text chunks as they are produced, keeping the
+    request (and its database session) alive until the last chunk.
+    """
+    return current_app.response_class(stream_with_context(chunks), status=status, mimetype='application/json')
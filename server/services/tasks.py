@@ -0,0 +1,39 @@
+import random
+from celery import shared_task
+from services.email_service import send_bulk_email
+from services.images import generate_derivatives
+
+EMAIL_MAX_RETRIES = 5
+
+
+def _retry_with_backoff(task, exc, args=None):
+    """
+    Re-queues a failed task (with new `args` if given) with exponential backoff and jitter
+    (~10s, 20s, 40s ... capped at 10 min).
+    Eager (in-process) runs don't retry so a mail outage can't stall the request.
+    """
+    if task.request.is_eager:
+        raise exc
+    countdown = min(600, 10 * 2 ** task.request.retries) + random.uniform(0, 5)
+    raise task.retry(exc=exc, args=args, countdown=countdown, max_retries=EMAIL_MAX_RETRIES)
+
+
+@shared_task(bind=True)
+def send_email_batch_task(self, emails):
+    """Sends a MailOutbox batch of (to, subject, body) emails over one SMTP connection, retrying only the failed ones."""
+    try:
+        failed = send_bulk_email(emails)
+    except Exception as e: # No connection at all
+        _retry_with_backoff(self, e)
+        return
+    if failed:
+        _retry_with_backoff(self, RuntimeError(f"{len(failed)} of {len(emails)} emails failed"), args=(failed,))
+
+
+@shared_task(bind=True)
+def generate_image_derivatives_task(self, image_id):
+    # Routed to the 'images' queue (see celery_app.py)
+    try:
+        generate_derivatives(image_id)
+    except Exception as e:
+        _retry_with_backoff(self, e)
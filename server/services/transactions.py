@@ -0,0 +1,31 @@
+from flask import current_app
+from sqlalchemy import event
+from models import db
+
+_CALLBACKS_KEY = 'after_commit_callbacks'
+
+
+def after_commit(callback, *args, **kwargs):
+    """
+    Runs callback(*args, **kwargs) once the session's current transaction has
+    committed, e.g. to queue an email or publish an event only for data that
+    really was saved. Dropped if the transaction rolls back.
+    Callbacks run outside any transaction, so they must not use the session.
+    """
+    db.session.info.setdefault(_CALLBACKS_KEY, []).append((callback, args, kwargs))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _run_after_commit_callbacks(session):
+    for callback, args, kwargs in session.info.pop(_CALLBACKS_KEY, []):
+        try:
+            callback(*args, **kwargs)
+        except Exception as e: # The data is committed either way; don't fail the request
+            current_app.logger.error(f"Error in after-commit callback {getattr(callback, '__name__', callback)}: {e}")
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_after_commit_callbacks(session, previous_transaction):
+    if session.in_transaction(): # Only the outermost rollback discards pending work
+        return
+    session.info.pop(_CALLBACKS_KEY, None)
@@ -0,0 +1,133 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config.py refuses to import without these; app.py builds its module-level app from them
+os.environ.setdefault('JWT_SECRET', 'test-jwt-secret-at-least-32-bytes-long')
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+os.environ.setdefault('CLOUDINARY_API_KEY', 'test')
+os.environ.setdefault('CLOUDINARY_API_SECRET', 'test')
+os.environ.setdefault('CLOUDINARY_CLOUD_NAME', 'test')
+os.environ.setdefault('MAIL_DEFAULT_SENDER', 'noreply@example.com')
+os.environ.setdefault('BCRYPT_ROUNDS', '4') # Skip calibration, keep hashing fast
+
+from app import create_app  # noqa: E402
+from config import Config  # noqa: E402
+from models import db as _db, User, Property, Image  # noqa: E402
+from services.images import image_pipeline  # noqa: E402
+from services.passwords import password_hasher  # noqa: E402
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://' # A fresh in-memory database per app
+    JWT_COOKIE_SECURE = False
+    CACHE_BACKEND = 'memory'
+    EVENTS_BACKEND = 'memory'
+    WEB_CONCURRENCY = 1
+    STORAGE_BACKEND = 'local'
+    CELERY_TASK_ALWAYS_EAGER = True
+    BCRYPT_ROUNDS = 4
+    MAIL_BATCH_WINDOW = 0 # Hand each email off immediately (Flask-Mail suppresses sending under TESTING)
+
+
+class InlineExecutor:
+    """Runs the image pipeline's work on submit; its threads would share the in-memory database's one connection."""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@pytest.fixture
+def app_config():
+    """Config overrides for the app fixture; override this fixture in a test module to change them."""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, app_config):
+    Config = type('Config', (TestConfig,), {'STORAGE_LOCAL_ROOT': str(tmp_path / 'uploads'), **app_config})
+    app = create_app(Config)
+    image_pipeline._executor = InlineExecutor()
+    with app.app_context():
+        yield app
+        _db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+class StatementCounter:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def reset(self):
+        self.statements.clear()
+
+
+@pytest.fixture
+def statements(db):
+    """Records every SQL statement sent to the database."""
+    counter = StatementCounter()
+    event.listen(db.engine, 'before_cursor_execute', counter)
+    yield counter
+    event.remove(db.engine, 'before_cursor_execute', counter)
+
+
+@pytest.fixture
+def make_user(db):
+    def make_user(username='alice', password='password', role='user'):
+        user = User(username=username, email=f'{username}@example.com', password=password_hasher.hash(password), role=role)
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make_user
+
+
+@pytest.fixture
+def make_property(db):
+    def make_property(owner, images=2, **values):
+        values = {
+            'title': 'Test property',
+            'description': 'A test property',
+            'address': '1 Test Street',
+            'city': 'Lagos',
+            'state': 'Lagos',
+            'zip_code': '100001',
+            'price': 100000.0,
+            **values,
+        }
+        prop = Property(user_id=owner.id, **values)
+        db.session.add(prop)
+        db.session.flush()
+        db.session.add_all(Image(property_id=prop.id, url=f'https://img.example.com/{prop.id}/{n}.jpg') for n in range(images))
+        db.session.commit()
+        return prop
+    return make_property
+
+
+@pytest.fixture
+def login(client):
+    def login(user, password='password'):
+        response = client.post('/api/auth/login', json={'email': user.email, 'password': password})
+        assert response.status_code == 200, response.get_json()
+        return response
+    return login
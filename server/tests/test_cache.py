@@ -0,0 +1,46 @@
+import time
+
+import pytest
+from flask import Flask
+
+from services.cache import ResponseCache
+
+
+def _app(**config):
+    app = Flask(__name__)
+    app.config.update(config)
+    return app
+
+
+def test_memory_backend_ttl_is_capped_with_several_workers():
+    cache = ResponseCache()
+    app = _app(CACHE_BACKEND='memory', CACHE_DEFAULT_TTL=30, CACHE_MEMORY_MAX_TTL=5, WEB_CONCURRENCY=4)
+    cache.init_app(app)
+    with app.app_context():
+        cache.set('key', b'value', ttl=300)
+    _, expires_at = cache.backend._entries['key']
+    assert expires_at - time.monotonic() <= 5
+
+
+def test_memory_backend_ttl_is_not_capped_with_one_worker():
+    cache = ResponseCache()
+    app = _app(CACHE_BACKEND='memory', CACHE_DEFAULT_TTL=30, WEB_CONCURRENCY=1)
+    cache.init_app(app)
+    assert cache.max_ttl is None
+
+
+def test_redis_invalidation_reaches_other_workers():
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    workers = [ResponseCache(), ResponseCache()]
+    app = _app(CACHE_BACKEND='redis', WEB_CONCURRENCY=4)
+    for cache in workers:
+        cache.init_app(app, redis_client=fakeredis.FakeRedis(server=server))
+
+    with app.app_context():
+        key = workers[0].namespace_key('properties', 'page=1')
+        workers[0].set(key, b'listing')
+        assert workers[1].get(workers[1].namespace_key('properties', 'page=1')) == b'listing'
+
+        workers[1].invalidate_namespace('properties')
+        assert workers[0].get(workers[0].namespace_key('properties', 'page=1')) is None
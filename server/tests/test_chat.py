@@ -0,0 +1,84 @@
+import pytest
+
+from models import Chat, Message
+
+
+@pytest.fixture
+def make_chat(db, make_property):
+    def make_chat(sender, receiver, messages=0):
+        chat = Chat(sender_id=sender.id, receiver_id=receiver.id, property_id=make_property(receiver, images=2).id)
+        db.session.add(chat)
+        db.session.flush()
+        for n in range(messages):
+            chat.last_message = Message(message=f'Message {n}', chat_id=chat.id, sender_id=(sender, receiver)[n % 2].id)
+            db.session.add(chat.last_message)
+            db.session.flush()
+        db.session.commit()
+        return chat
+    return make_chat
+
+
+@pytest.fixture
+def conversation(make_user, make_chat, login):
+    """A chat with ten messages, seen by its sender. Returns (chat, message ids oldest first)."""
+    sender, owner = make_user('sender'), make_user('owner')
+    chat = make_chat(sender, owner, messages=10)
+    login(sender)
+    return chat, [m.id for m in Message.query.filter_by(chat_id=chat.id).order_by(Message.id)]
+
+
+def _message_ids(client, chat, **args):
+    response = client.get(f'/api/chat/{chat.id}/messages', query_string=args)
+    assert response.status_code == 200, response.get_json()
+    return [int(m['id']) for m in response.get_json()]
+
+
+def test_all_messages_oldest_first(client, conversation):
+    chat, ids = conversation
+    assert _message_ids(client, chat) == ids
+
+
+def test_since_id_returns_only_newer_messages(client, conversation):
+    chat, ids = conversation
+
+    assert _message_ids(client, chat, since_id=ids[6]) == ids[7:]
+    assert _message_ids(client, chat, since_id=ids[-1]) == []
+    # With a limit, the oldest of the new messages first, so polling can continue from the last one
+    assert _message_ids(client, chat, since_id=ids[2], limit=3) == ids[3:6]
+
+
+def test_limit_and_before_id_page_backwards(client, conversation):
+    chat, ids = conversation
+
+    assert _message_ids(client, chat, limit=3) == ids[-3:]
+    assert _message_ids(client, chat, before_id=ids[-3], limit=3) == ids[4:7]
+    assert _message_ids(client, chat, before_id=ids[2]) == ids[:2]
+    assert _message_ids(client, chat, limit=0) == ids[-1:] # Clamped to at least one
+
+
+def test_messages_of_other_chats_are_refused(client, conversation, make_user, make_chat):
+    other = make_chat(make_user('x'), make_user('y'), messages=1)
+    assert client.get(f'/api/chat/{other.id}/messages').status_code == 403
+
+
+def test_inbox_statement_count_is_independent_of_chat_count(client, db, make_user, make_chat, login, statements):
+    user = make_user('inbox')
+    make_chat(user, make_user('owner0'), messages=2)
+    login(user)
+
+    db.session.expunge_all() # Requests share the test's session: start from an empty identity map
+    statements.reset()
+    assert len(client.get('/api/chat').get_json()) == 1
+    one_chat = statements.count
+
+    for n in range(1, 8): # Started by either side, each with its own property, images and last message
+        participants = (user, make_user(f'owner{n}')) if n % 2 else (make_user(f'buyer{n}'), user)
+        make_chat(*participants, messages=n)
+    db.session.expunge_all()
+    statements.reset()
+    chats = client.get('/api/chat').get_json()
+
+    assert len(chats) == 8
+    assert all(chat['last_message'] and chat['property']['images'] for chat in chats)
+    # User, inbox validators, chats with participants and last message, properties, images
+    assert statements.count == one_chat == 5, statements.statements
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from models import Chat, Property, User
+
+
+def _touch(db, model, row_id, **values):
+    """Changes a row behind the app's back, like another worker would."""
+    values['updated_at'] = datetime.now(timezone.utc) + timedelta(seconds=1)
+    db.session.execute(update(model).where(model.id == row_id).values(**values))
+    db.session.commit()
+
+
+def test_property_detail_cached_body_matches_its_etag(client, db, make_user, make_property):
+    prop = make_property(make_user('owner'), title='Old title')
+
+    first = client.get(f'/api/properties/{prop.id}')
+    assert first.get_json()['title'] == 'Old title'
+    etag = first.headers['ETag']
+    # Another worker updates the property; this worker's cache never hears about it
+    _touch(db, Property, prop.id, title='New title')
+
+    revalidated = client.get(f'/api/properties/{prop.id}', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 200
+    assert revalidated.get_json()['title'] == 'New title'
+    assert revalidated.headers['ETag'] != etag
+
+    unchanged = client.get(f'/api/properties/{prop.id}', headers={'If-None-Match': revalidated.headers['ETag']})
+    assert unchanged.status_code == 304
+
+
+def test_chat_inbox_etag_changes_with_embedded_rows(client, db, make_user, make_property, login):
+    sender, owner = make_user('sender'), make_user('owner')
+    prop = make_property(owner, title='Old title')
+    db.session.add(Chat(sender_id=sender.id, receiver_id=owner.id, property_id=prop.id))
+    db.session.commit()
+    login(sender)
+
+    first = client.get('/api/chat')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert client.get('/api/chat', headers={'If-None-Match': etag}).status_code == 304
+
+    _touch(db, Property, prop.id, title='New title')
+    response = client.get('/api/chat', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()[0]['property']['title'] == 'New title'
+
+    etag = response.headers['ETag']
+    _touch(db, User, owner.id, first_name='Renamed')
+    response = client.get('/api/chat', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()[0]['receiver']['first_name'] == 'Renamed'
+
+
+def test_property_detail_changes_with_writes_in_the_same_second(client, db, make_user, make_property, login):
+    owner = make_user('owner')
+    prop = make_property(owner, title='First')
+    login(owner)
+    same_second = datetime(2026, 1, 1, 12, 0, 0) # DATETIME columns without fractions (MySQL)
+
+    assert client.put(f'/api/properties/{prop.id}', json={'title': 'Second'}).status_code == 200
+    db.session.execute(update(Property).where(Property.id == prop.id).values(updated_at=same_second))
+    db.session.commit()
+    cached = client.get(f'/api/properties/{prop.id}')
+    assert cached.get_json()['title'] == 'Second'
+
+    assert client.put(f'/api/properties/{prop.id}', json={'title': 'Third'}).status_code == 200
+    db.session.execute(update(Property).where(Property.id == prop.id).values(updated_at=same_second))
+    db.session.commit()
+
+    response = client.get(f'/api/properties/{prop.id}', headers={'If-None-Match': cached.headers['ETag']})
+    assert response.status_code == 200
+    assert response.get_json()['title'] == 'Third'
+    assert response.headers['ETag'] != cached.headers['ETag']
@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import update
+
+from models import User
+from services import cache as cache_module, current_user
+from services.cache import LRUCache
+from services.current_user import invalidate_cached_user
+
+
+class Clock:
+    """Stands in for the time module inside services/cache.py."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def app_config():
+    return {'AUTH_USER_CACHE_TTL': 30}
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, 'time', clock)
+    monkeypatch.setattr(current_user, '_user_cache', LRUCache(max_entries=16))
+    return clock
+
+
+@pytest.fixture
+def admin(make_user, login):
+    admin = make_user('admin', role='admin')
+    login(admin)
+    return admin
+
+
+def _get(client, db, path):
+    db.session.expunge_all() # Every request starts with an empty identity map, as in production
+    return client.get(path)
+
+
+def _user_selects(statements):
+    return [sql for sql in statements.statements if 'FROM user' in sql]
+
+
+def test_cached_user_costs_no_query(client, db, admin, statements):
+    assert _get(client, db, '/api/users/profile').status_code == 200
+    statements.reset()
+
+    profile = _get(client, db, '/api/users/profile').get_json()
+
+    assert profile['username'] == 'admin'
+    assert _user_selects(statements) == []
+    assert 'password' not in current_user._user_cache.get(str(admin.id)) # Secrets are never cached
+
+
+def test_cached_user_expires_after_the_ttl(client, db, admin, clock):
+    assert _get(client, db, '/api/inquiries').status_code == 200
+    db.session.execute(update(User).where(User.id == admin.id).values(role='user')) # Demoted by another worker
+    db.session.commit()
+
+    assert _get(client, db, '/api/inquiries').status_code == 200 # Still cached
+    clock.now += 31
+    assert _get(client, db, '/api/inquiries').status_code == 403
+
+
+def test_deactivation_takes_effect_once_invalidated(client, db, admin):
+    assert _get(client, db, '/api/inquiries').status_code == 200
+
+    db.session.execute(update(User).where(User.id == admin.id).values(is_active=False))
+    db.session.commit()
+    invalidate_cached_user(admin.id)
+
+    assert _get(client, db, '/api/inquiries').status_code == 403
+
+
+def test_profile_update_invalidates_the_cache(client, db, admin):
+    _get(client, db, '/api/users/profile')
+
+    assert client.put('/api/users/profile', json={'first_name': 'Ada'}).status_code == 200
+
+    assert _get(client, db, '/api/users/profile').get_json()['first_name'] == 'Ada'
+
+
+@pytest.mark.parametrize('app_config', [{'AUTH_USER_CACHE_TTL': 0}])
+def test_role_required_refuses_inactive_users(client, db, admin, statements):
+    db.session.execute(update(User).where(User.id == admin.id).values(is_active=False))
+    db.session.commit()
+    statements.reset()
+
+    response = _get(client, db, '/api/inquiries')
+
+    assert response.status_code == 403
+    assert len(_user_selects(statements)) == 1 # Without the cache: one lookup per request
@@ -0,0 +1,126 @@
+import socket
+
+import pytest
+
+from services.email_service import mail_pool, mail_outbox, send_bulk_email
+
+aiosmtpd_controller = pytest.importorskip('aiosmtpd.controller')
+
+
+class StubHandler:
+    """Records delivered messages and the SMTP session each arrived on; rejects bounce@ recipients."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith('bounce@'):
+            return '550 No such user'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((id(session), envelope.rcpt_tos[0], envelope.content))
+        return '250 Message accepted for delivery'
+
+    @property
+    def recipients(self):
+        return [to for _, to, _ in self.messages]
+
+    @property
+    def sessions(self):
+        return len({session for session, _, _ in self.messages})
+
+
+@pytest.fixture
+def smtp_stub():
+    handler = StubHandler()
+    with socket.socket() as probe: # Free port for the stub
+        probe.bind(('127.0.0.1', 0))
+        handler.port = probe.getsockname()[1]
+    controller = aiosmtpd_controller.Controller(handler, hostname='127.0.0.1', port=handler.port)
+    controller.start()
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture
+def app_config(smtp_stub):
+    return {
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': smtp_stub.port,
+        'MAIL_USE_TLS': False,
+        'MAIL_USE_SSL': False,
+        'MAIL_USERNAME': None,
+        'MAIL_PASSWORD': None,
+        'MAIL_SUPPRESS_SEND': False,
+        'MAIL_BATCH_WINDOW': 60, # Only flushed explicitly or when full
+        'MAIL_BATCH_SIZE': 3,
+    }
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool(app):
+    mail_pool.close_all()
+    mail_pool._metrics = mail_pool._empty_metrics()
+    yield
+    mail_outbox.flush()
+    mail_pool.close_all()
+
+
+def test_bulk_email_is_sent_over_one_connection(smtp_stub):
+    emails = [(f'user{n}@example.com', f'Subject {n}', 'Body') for n in range(5)]
+
+    assert send_bulk_email(emails) == []
+
+    assert smtp_stub.recipients == [to for to, _, _ in emails]
+    assert smtp_stub.sessions == 1
+    metrics = mail_pool.metrics()
+    assert metrics['messages_sent'] == 5
+    assert metrics['connections_opened'] == 1
+    assert metrics['batches'] == 1
+    assert metrics['messages_per_connection'] == 5
+
+
+def test_rejected_recipient_does_not_stop_the_batch(smtp_stub):
+    emails = [('a@example.com', 'A', 'Body'), ('bounce@example.com', 'B', 'Body'), ('c@example.com', 'C', 'Body')]
+
+    assert send_bulk_email(emails) == [('bounce@example.com', 'B', 'Body')]
+
+    assert smtp_stub.recipients == ['a@example.com', 'c@example.com']
+    assert mail_pool.metrics()['messages_failed'] == 1
+
+
+def test_pooled_connection_is_reused_across_batches(smtp_stub):
+    send_bulk_email([('a@example.com', 'A', 'Body')])
+    send_bulk_email([('b@example.com', 'B', 'Body')])
+
+    assert smtp_stub.sessions == 1
+    assert mail_pool.metrics()['connections_opened'] == 1
+
+
+def test_outbox_batches_queued_emails(smtp_stub):
+    mail_outbox.queue('a@example.com', 'A', 'Body')
+    mail_outbox.queue('b@example.com', 'B', 'Body')
+    assert smtp_stub.messages == [] # Waiting for the window or a full batch
+
+    mail_outbox.queue('c@example.com', 'C', 'Body') # MAIL_BATCH_SIZE reached
+
+    assert smtp_stub.recipients == ['a@example.com', 'b@example.com', 'c@example.com']
+    assert smtp_stub.sessions == 1
+    assert mail_pool.metrics()['batches'] == 1
+
+
+def test_registration_welcome_email_goes_through_the_outbox(client, smtp_stub):
+    for n in range(2):
+        response = client.post('/api/auth/register', json={
+            'username': f'new{n}', 'email': f'new{n}@example.com', 'password': 'password',
+        })
+        assert response.status_code == 201, response.get_json()
+    assert smtp_stub.messages == []
+
+    mail_outbox.flush()
+
+    assert smtp_stub.recipients == ['new0@example.com', 'new1@example.com']
+    assert smtp_stub.sessions == 1
+    assert b'Welcome' in smtp_stub.messages[0][2]
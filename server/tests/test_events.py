@@ -0,0 +1,80 @@
+import pytest
+from flask import Flask
+
+from services.events import EventBus, StreamLimitReached
+
+
+def _app(**config):
+    app = Flask(__name__)
+    app.config.update(config)
+    return app
+
+
+def test_memory_backend_is_refused_with_several_workers():
+    with pytest.raises(RuntimeError, match='single worker'):
+        EventBus().init_app(_app(EVENTS_BACKEND='memory', WEB_CONCURRENCY=4))
+
+
+def test_memory_backend_with_one_worker():
+    bus = EventBus()
+    bus.init_app(_app(EVENTS_BACKEND='memory', WEB_CONCURRENCY=1))
+    subscription = bus.subscribe(['user:1'])
+    with _app().app_context():
+        bus.publish('user:1', 'message', {'id': 1})
+    assert subscription.get(timeout=1) == ('message', {'id': 1})
+
+
+def test_redis_backend_reaches_subscribers_of_other_workers():
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    # Two workers, each with its own bus and connection to the same Redis
+    publisher, subscriber = EventBus(), EventBus()
+    for bus in (publisher, subscriber):
+        bus.init_app(_app(EVENTS_BACKEND='redis', WEB_CONCURRENCY=4), redis_client=fakeredis.FakeRedis(server=server))
+
+    subscription = subscriber.subscribe(['user:1'])
+    with _app().app_context():
+        publisher.publish('user:1', 'message', {'id': 1})
+    # The first read may only consume the subscribe confirmation
+    received = [subscription.get(timeout=0.1) for _ in range(3)]
+    assert ('message', {'id': 1}) in received
+    subscription.close()
+
+
+def test_open_streams_are_capped_per_worker():
+    bus = EventBus()
+    bus.init_app(_app(EVENTS_BACKEND='memory', WEB_CONCURRENCY=1, EVENTS_MAX_STREAMS=2))
+    first, second = bus.subscribe(['user:1']), bus.subscribe(['user:2'])
+
+    with pytest.raises(StreamLimitReached):
+        bus.subscribe(['user:3'])
+
+    first.close()
+    first.close() # Closing twice frees one slot only
+    third = bus.subscribe(['user:3'])
+    with pytest.raises(StreamLimitReached):
+        bus.subscribe(['user:4'])
+    second.close()
+    third.close()
+
+
+@pytest.fixture
+def app_config():
+    return {'EVENTS_MAX_STREAMS': 1}
+
+
+def test_stream_endpoint_answers_503_when_full(client, make_user, login):
+    login(make_user('streamer'))
+
+    stream = client.get('/api/chat/stream', buffered=False)
+    assert stream.status_code == 200
+
+    refused = client.get('/api/chat/stream', buffered=False)
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After']
+    assert refused.get_json()['error'] == 'Service Unavailable'
+
+    stream.close() # Client disconnects before reading anything
+    reopened = client.get('/api/chat/stream', buffered=False)
+    assert reopened.status_code == 200
+    reopened.close()
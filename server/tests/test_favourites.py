@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import event, insert
+
+from models import Favorite
+from routes.favourites import MAX_LOOKUP_IDS
+
+
+@pytest.fixture
+def listings(db, make_user, make_property):
+    """Three properties; 'fan' has favourited the first and the last."""
+    owner, fan = make_user('owner'), make_user('fan')
+    ids = [make_property(owner, title=f'Listing {n}').id for n in range(3)]
+    db.session.add_all([Favorite(user_id=fan.id, property_id=ids[0]), Favorite(user_id=fan.id, property_id=ids[2])])
+    db.session.commit()
+    return fan, ids
+
+
+def test_lookup_reports_each_property(client, login, listings):
+    fan, ids = listings
+    login(fan)
+
+    response = client.post('/api/favourites/lookup', json={'property_ids': [ids[0], str(ids[1]), ids[2], 9999]})
+
+    assert response.status_code == 200
+    assert response.get_json() == {'favorites': {str(ids[0]): True, str(ids[1]): False, str(ids[2]): True, '9999': False}}
+
+
+def test_lookup_is_per_user(client, login, make_user, listings):
+    _, ids = listings
+    login(make_user('someone_else'))
+
+    favorites = client.post('/api/favourites/lookup', json={'property_ids': ids}).get_json()['favorites']
+
+    assert not any(favorites.values())
+
+
+@pytest.mark.parametrize('property_ids', [list(range(1, MAX_LOOKUP_IDS + 2)), 'not a list', ['x']])
+def test_lookup_rejects_invalid_requests(client, login, listings, property_ids):
+    login(listings[0])
+    response = client.post('/api/favourites/lookup', json={'property_ids': property_ids})
+    assert response.status_code == 400
+
+
+def test_lookup_accepts_the_maximum(client, login, listings):
+    login(listings[0])
+    response = client.post('/api/favourites/lookup', json={'property_ids': list(range(1, MAX_LOOKUP_IDS + 1))})
+    assert response.status_code == 200
+
+
+def test_lookup_requires_login(client, listings):
+    assert client.post('/api/favourites/lookup', json={'property_ids': listings[1]}).status_code == 401
+
+
+def _is_favorite(client, **args):
+    response = client.get('/api/properties', query_string={'include': 'is_favorite', **args})
+    assert response.status_code == 200, response.get_json()
+    return {p['title']: p['isFavorite'] for p in response.get_json()['properties']}
+
+
+def test_is_favorite_for_a_logged_in_user(client, login, listings, statements):
+    login(listings[0])
+    statements.reset()
+
+    flags = _is_favorite(client)
+
+    assert flags == {'Listing 0': True, 'Listing 1': False, 'Listing 2': True}
+    assert sum('FROM favorite' in sql for sql in statements.statements) == 1 # One lookup for the page
+    assert _is_favorite(client, view='card', cursor='') == flags
+
+
+def test_is_favorite_for_anonymous_users(client, listings, statements):
+    statements.reset()
+
+    assert _is_favorite(client) == {'Listing 0': False, 'Listing 1': False, 'Listing 2': False}
+    assert not any('FROM favorite' in sql for sql in statements.statements)
+
+
+def test_listing_without_include_has_no_flag(client, listings):
+    properties = client.get('/api/properties').get_json()['properties']
+    assert properties and all('isFavorite' not in p for p in properties)
+
+
+@pytest.fixture
+def concurrent_insert():
+    """Another request adds the same favourite between the duplicate check and the commit."""
+    def before_insert(mapper, connection, target):
+        connection.execute(insert(Favorite.__table__).values(user_id=target.user_id, property_id=target.property_id))
+    event.listen(Favorite, 'before_insert', before_insert)
+    yield
+    event.remove(Favorite, 'before_insert', before_insert)
+
+
+@pytest.mark.parametrize('add, status', [
+    (lambda client, property_id: client.post('/api/favourites', json={'property_id': property_id}), 400),
+    (lambda client, property_id: client.post(f'/api/users/favorites/{property_id}'), 200),
+])
+def test_concurrent_add_reports_an_existing_favourite(client, login, listings, concurrent_insert, add, status):
+    fan, ids = listings
+    login(fan)
+
+    response = add(client, ids[1])
+
+    assert response.status_code == status, response.get_json()
+    assert client.get('/api/favourites').status_code == 200 # The session was rolled back and is usable
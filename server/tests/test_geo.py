@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+from services import geo
+
+
+@pytest.fixture
+def owner(make_user):
+    return make_user('owner')
+
+
+def _listing(client, **args):
+    response = client.get('/api/properties', query_string={'page_size': 100, **args})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['properties']
+
+
+def test_bbox_filter_matches_a_brute_force_scan_across_geohash_cells(client, owner, make_property):
+    # Around (0, 0), where the box spans the top-level cells 7, k, e and s
+    rng = random.Random(7)
+    points = {}
+    for n in range(60):
+        latitude, longitude = rng.uniform(-1, 1), rng.uniform(-1, 1)
+        points[make_property(owner, images=0, title=f'P{n}', latitude=latitude, longitude=longitude).id] = (latitude, longitude)
+    min_lng, min_lat, max_lng, max_lat = -0.4, -0.3, 0.5, 0.2
+    assert len({cell[0] for cell in geo.covering_cells(min_lat, min_lng, max_lat, max_lng)}) == 4
+
+    found = {int(p['id']) for p in _listing(client, bbox=f'{min_lng},{min_lat},{max_lng},{max_lat}')}
+
+    expected = {
+        property_id for property_id, (latitude, longitude) in points.items()
+        if min_lat <= latitude <= max_lat and min_lng <= longitude <= max_lng
+    }
+    assert expected and found == expected
+
+
+def test_radius_search_sorted_by_distance(client, owner, make_property):
+    origin = (6.45, 3.39) # Lagos
+    for title, km_north in (('Far', 40), ('Near', 1), ('Middle', 8), ('Edge', 14)):
+        make_property(owner, images=0, title=title, latitude=origin[0] + km_north / geo.KM_PER_DEGREE, longitude=origin[1])
+    make_property(owner, images=0, title='No coordinates')
+
+    listings = _listing(client, near=f'{origin[0]},{origin[1]}', radius_km=15, sort='distance')
+
+    assert [p['title'] for p in listings] == ['Near', 'Middle', 'Edge']
+    assert [round(p['distanceKm']) for p in listings] == [1, 8, 14]
+    farthest_first = _listing(client, near=f'{origin[0]},{origin[1]}', radius_km=15, sort='-distance', cursor='')
+    assert [p['title'] for p in farthest_first] == ['Edge', 'Middle', 'Near']
+
+
+@pytest.mark.parametrize('args', [
+    {'bbox': '1,2,3'},
+    {'bbox': '10,5,0,6'}, # West of east
+    {'near': '6.45'},
+    {'near': '95,3'},
+    {'near': '6.45,3.39', 'radius_km': 0},
+    {'near': '6.45,3.39', 'radius_km': 10000},
+    {'sort': 'distance'}, # Without near
+])
+def test_malformed_geo_parameters_are_rejected(client, args):
+    assert client.get('/api/properties', query_string=args).status_code == 400
+
+
+def test_covering_cells_cover_the_box():
+    box = (6.3, 3.2, 6.7, 3.6)
+    cells = geo.covering_cells(*box)
+
+    assert len(cells) <= geo.MAX_COVER_CELLS
+    rng = random.Random(3)
+    for _ in range(200):
+        point_hash = geo.encode_geohash(rng.uniform(box[0], box[2]), rng.uniform(box[1], box[3]))
+        assert any(point_hash.startswith(cell) for cell in cells)
+
+
+@pytest.fixture
+def two_towns(owner, make_property):
+    """Three listings in one town about 1 km apart and two in another town about 100 km away."""
+    points = [(6.450, 3.390), (6.455, 3.395), (6.459, 3.391), (7.380, 3.940), (7.385, 3.945)]
+    return [
+        make_property(owner, images=0, title=f'P{n}', price=100000.0 * (n + 1), latitude=lat, longitude=lng).id
+        for n, (lat, lng) in enumerate(points)
+    ]
+
+
+def _clusters(client, zoom, bbox='2,5,5,9', **args):
+    response = client.get('/api/properties/clusters', query_string={'bbox': bbox, 'zoom': zoom, **args})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+@pytest.mark.parametrize('zoom, counts', [
+    (3, [5]), # Country view: one pin
+    (5, [2, 3]), # Region view: one pin per town
+    (8, [1, 1, 3]), # The second town's listings sit on either side of a cell edge
+    (14, [1, 1, 1, 1, 1]), # Street view: every listing on its own
+])
+def test_cluster_counts_by_zoom(client, two_towns, zoom, counts):
+    body = _clusters(client, zoom)
+
+    assert body['precision'] == geo.precision_for_zoom(zoom)
+    assert body['total'] == 5
+    assert sorted(c['count'] for c in body['clusters']) == counts
+    for cluster in body['clusters']:
+        if cluster['count'] == 1:
+            assert int(cluster['propertyId']) in two_towns
+            assert cluster['minPrice'] == cluster['maxPrice']
+        else:
+            assert cluster['propertyId'] is None
+
+
+def test_clusters_apply_the_listing_filters(client, two_towns):
+    body = _clusters(client, 5, maxPrice=250000)
+
+    assert body['total'] == 2
+    [cluster] = body['clusters']
+    assert (cluster['count'], cluster['minPrice'], cluster['maxPrice']) == (2, 100000.0, 200000.0)
+    assert cluster['latitude'] == pytest.approx(6.4525)
+
+
+@pytest.mark.parametrize('args', [{'zoom': 5}, {'bbox': '2,5,5,9'}, {'bbox': '2,5,5,9', 'zoom': 30}])
+def test_clusters_require_bbox_and_zoom(client, args):
+    assert client.get('/api/properties/clusters', query_string=args).status_code == 400
@@ -0,0 +1,88 @@
+import io
+import urllib.request
+
+import pytest
+from PIL import Image as PILImage
+
+from models import Image
+from services import images
+from services.images import generate_derivatives, read_source
+from services.storage import CloudinaryStorage, storage
+
+
+@pytest.fixture(autouse=True)
+def no_network(monkeypatch):
+    def urlopen(*args, **kwargs):
+        raise AssertionError(f"Unexpected request: {args[0]}")
+    monkeypatch.setattr(urllib.request, 'urlopen', urlopen)
+
+
+def test_read_source_reads_configured_storage(app):
+    url = storage.save('properties/photo.png', io.BytesIO(b'png bytes'), 'image/png')
+
+    assert read_source(url) == b'png bytes'
+
+
+@pytest.mark.parametrize('url', [
+    'http://169.254.169.254/latest/meta-data/',
+    'http://localhost:6379/',
+    'file:///etc/passwd',
+    'https://example.com/photo.jpg',
+    '/api/upload/files/../../config.py',
+])
+def test_read_source_refuses_urls_outside_storage(app, url):
+    with pytest.raises(ValueError):
+        read_source(url)
+
+
+@pytest.mark.parametrize('url, key', [
+    ('https://res.cloudinary.com/demo/image/upload/v1712345678/properties/abc.jpg', 'properties/abc.jpg'),
+    ('https://res.cloudinary.com/demo/image/upload/sample.png', 'sample.png'),
+    ('https://res.cloudinary.com/other/image/upload/v1/properties/abc.jpg', None),
+    ('https://res.cloudinary.com.evil.test/demo/image/upload/abc.jpg', None),
+    ('http://169.254.169.254/demo/image/upload/abc.jpg', None),
+])
+def test_cloudinary_key_for_url(url, key):
+    assert CloudinaryStorage('demo', 'key', 'secret').key_for_url(url) == key
+
+
+@pytest.fixture
+def invalidations(monkeypatch):
+    namespaces = []
+    monkeypatch.setattr(images.response_cache, 'invalidate_namespace', namespaces.append)
+    return namespaces
+
+
+def _photo(name):
+    buffer = io.BytesIO()
+    PILImage.new('RGB', (40, 30), 'red').save(buffer, 'PNG')
+    buffer.seek(0)
+    return storage.save(f'properties/{name}.png', buffer, 'image/png')
+
+
+def test_cache_is_invalidated_once_per_property(db, make_user, make_property, invalidations):
+    prop = make_property(make_user('owner'), images=0)
+    rows = [Image(property_id=prop.id, url=_photo(f'photo{n}')) for n in range(3)]
+    db.session.add_all(rows)
+    db.session.commit()
+    image_ids, property_id = [row.id for row in rows], prop.id
+
+    for image_id in image_ids[:-1]:
+        assert generate_derivatives(image_id) == property_id
+    assert invalidations == [] # Other images of the property are still pending
+
+    generate_derivatives(image_ids[-1])
+
+    assert invalidations == ['properties', f'property:{property_id}']
+    assert all(db.session.get(Image, image_id).derivatives['thumbnail']['width'] == 40 for image_id in image_ids)
+
+
+def test_cache_invalidation_can_be_left_to_the_caller(db, make_user, make_property, invalidations):
+    prop = make_property(make_user('owner'), images=0)
+    image = Image(property_id=prop.id, url=_photo('photo'))
+    db.session.add(image)
+    db.session.commit()
+
+    generate_derivatives(image.id, invalidate=False)
+
+    assert invalidations == []
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Inquiry
+from routes import inquiries as inquiries_routes
+
+
+@pytest.fixture
+def inquiries(db, make_user, make_property, login, monkeypatch):
+    """Seven inquiries, newest first, streamed in chunks of 2 by an admin."""
+    monkeypatch.setattr(inquiries_routes, 'STREAM_CHUNK_ROWS', 2)
+    prop = make_property(make_user('owner'))
+    start = datetime(2026, 1, 1)
+    rows = [
+        Inquiry(name=f'Buyer {n}', email=f'buyer{n}@example.com', message='Hi', property_id=prop.id,
+                status='pending', created_at=start + timedelta(minutes=n // 2)) # Pairs share a timestamp
+        for n in range(7)
+    ]
+    db.session.add_all(rows)
+    db.session.commit()
+    login(make_user('admin', role='admin'))
+    return sorted(rows, key=lambda inq: (inq.created_at, inq.id), reverse=True)
+
+
+def test_submitted_inquiry_matches_what_get_returns(client, make_user, make_property, login):
+    owner = make_user('owner')
+    prop = make_property(owner)
+    inquirer = make_user('buyer')
+    login(inquirer)
+
+    response = client.post('/api/inquiries', json={
+        'name': 'Buyer', 'email': inquirer.email, 'message': 'Is it available?', 'property_id': prop.id,
+    })
+    assert response.status_code == 201, response.get_json()
+    created = response.get_json()
+
+    listed = client.get(f'/api/inquiries/user/{inquirer.id}').get_json()
+    assert len(listed) == 1
+    for field in ('created_at', 'updated_at'):
+        assert '+' not in created[field] # Naive UTC, like every other endpoint
+        assert created[field] == listed[0][field]
+
+
+def test_full_inquiry_stream_is_fetched_in_keyset_chunks(client, inquiries, statements):
+    statements.reset()
+
+    listed = client.get('/api/inquiries').get_json()
+
+    assert [inq['id'] for inq in listed] == [inq.id for inq in inquiries]
+    assert all(inq['property']['images'] for inq in listed)
+    # Each chunk of 2 is its own buffered SELECT; no server-side cursor stays open under the image loads
+    chunks = [sql for sql in statements.statements if sql.lstrip().startswith('SELECT') and 'FROM inquiry ' in sql]
+    assert len(chunks) == 4
+
+
+def test_inquiry_pages_follow_the_cursor(client, inquiries):
+    ids, cursor = [], None
+    while True:
+        page = client.get('/api/inquiries', query_string={'limit': 3, **({'cursor': cursor} if cursor else {})}).get_json()
+        ids.extend(inq['id'] for inq in page['inquiries'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert ids == [inq.id for inq in inquiries]
+
+
+@pytest.mark.parametrize('limit', [0, -1])
+def test_inquiry_limit_must_be_positive(client, inquiries, limit):
+    assert client.get(f'/api/inquiries?limit={limit}').status_code == 400
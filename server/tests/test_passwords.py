@@ -0,0 +1,44 @@
+import bcrypt
+import pytest
+from werkzeug.security import generate_password_hash
+
+from models import User
+from services.passwords import password_hasher
+
+
+def _bcrypt(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+@pytest.fixture
+def app_config():
+    return {'BCRYPT_ROUNDS': 5}
+
+
+def test_work_factor_comes_from_config(app):
+    assert password_hasher.rounds == 5
+
+
+@pytest.mark.parametrize('rounds, expected', [(4, True), (5, False), (6, False)])
+def test_only_weaker_bcrypt_hashes_need_rehash(app, rounds, expected):
+    assert password_hasher.needs_rehash(_bcrypt('password', rounds)) is expected
+
+
+def test_legacy_hashes_need_rehash(app):
+    assert password_hasher.needs_rehash(generate_password_hash('password'))
+
+
+@pytest.mark.parametrize('rounds, rewritten', [(4, True), (6, False)])
+def test_login_rehashes_only_weaker_hashes(client, db, make_user, login, rounds, rewritten):
+    user = make_user('alice')
+    stored = _bcrypt('password', rounds)
+    user.password = stored
+    db.session.commit()
+
+    login(user)
+
+    password = db.session.get(User, user.id).password
+    assert (password != stored) is rewritten
+    assert password_hasher.verify('password', password)
+    if rewritten:
+        assert password.split('$')[2] == '05'
@@ -0,0 +1,228 @@
+import pytest
+
+from services.search import init_search_index
+
+
+@pytest.fixture
+def owner(make_user):
+    return make_user('owner')
+
+
+@pytest.mark.parametrize('count', [1, 5, 20])
+def test_listing_statement_count_is_independent_of_page_size(client, owner, make_property, statements, count):
+    for n in range(count):
+        make_property(owner, title=f'Listing {n}', images=3)
+    statements.reset()
+
+    response = client.get(f'/api/properties?page_size={count}')
+
+    assert response.status_code == 200
+    properties = response.get_json()['properties']
+    assert len(properties) == count
+    assert all(len(p['images']) == 3 for p in properties)
+    # Page, COUNT(*) for the pagination totals and one batched image load
+    assert statements.count == 3, statements.statements
+
+
+def test_keyset_listing_statement_count(client, owner, make_property, statements):
+    for n in range(12):
+        make_property(owner, title=f'Listing {n}')
+    statements.reset()
+
+    response = client.get('/api/properties?cursor=&page_size=10')
+
+    assert response.status_code == 200
+    assert len(response.get_json()['properties']) == 10
+    # Page (no COUNT(*) with cursors) and one batched image load
+    assert statements.count == 2, statements.statements
+
+
+@pytest.mark.parametrize('cursor', [None, ''])
+@pytest.mark.parametrize('page_size', [0, -1])
+def test_page_size_must_be_positive(client, owner, make_property, cursor, page_size):
+    make_property(owner)
+    args = {'page_size': page_size, **({'cursor': cursor} if cursor is not None else {})}
+
+    response = client.get('/api/properties', query_string=args)
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'page_size must be positive'
+
+
+@pytest.mark.parametrize('cursor', [None, ''])
+def test_page_size_is_clamped(app, client, owner, make_property, cursor):
+    app.config['MAX_PAGE_SIZE'] = 3
+    for n in range(5):
+        make_property(owner, title=f'Listing {n}')
+    args = {'page_size': 1000000, **({'cursor': cursor} if cursor is not None else {})}
+
+    body = client.get('/api/properties', query_string=args).get_json()
+
+    assert body['page_size'] == 3
+    assert len(body['properties']) == 3
+
+
+def test_sparse_fieldset_returns_only_the_requested_fields(client, owner, make_property):
+    make_property(owner, title='Sparse', price=250000.0)
+
+    body = client.get('/api/properties?fields=title,price,location.city').get_json()
+
+    [listing] = body['properties']
+    assert listing == {'id': listing['id'], 'title': 'Sparse', 'price': 250000.0, 'location': {'city': 'Lagos'}}
+
+
+def test_card_view(client, owner, make_property):
+    prop = make_property(owner, title='Card', bedrooms=3, bathrooms=2)
+
+    [card] = client.get('/api/properties?view=card').get_json()['properties']
+
+    assert set(card) == {'id', 'title', 'price', 'location', 'propertyType', 'status', 'features', 'thumbnail'}
+    assert card['location'] == {'city': 'Lagos', 'state': 'Lagos'}
+    assert card['features'] == {'bedrooms': 3, 'bathrooms': 2}
+    assert card['thumbnail'] == f'https://img.example.com/{prop.id}/0.jpg' # Original until the derivative exists
+
+
+@pytest.mark.parametrize('args', [
+    {'fields': 'title,bogus'},
+    {'fields': 'location.bogus'},
+    {'fields': 'title.city'},
+    {'view': 'bogus'},
+])
+def test_unknown_fields_and_views_are_rejected(client, owner, make_property, args):
+    make_property(owner)
+
+    response = client.get('/api/properties', query_string=args)
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_sparse_fieldset_selects_only_the_needed_columns(client, owner, make_property, statements):
+    make_property(owner, images=3)
+    statements.reset()
+
+    client.get('/api/properties?fields=title,price')
+
+    page = next(sql for sql in statements.statements if 'FROM property' in sql and 'count(' not in sql.lower())
+    assert 'property.title' in page and 'property.price' in page
+    assert 'property.description' not in page and 'property.amenities' not in page
+    # Page and COUNT(*) only: no field needs the images
+    assert statements.count == 2, statements.statements
+
+
+def test_card_view_payload_is_much_smaller_than_the_full_listing(client, owner, make_property):
+    for n in range(10):
+        make_property(owner, title=f'Listing {n}', description='spacious bright garden ' * 80, images=6)
+
+    full = client.get('/api/properties?page_size=10')
+    card = client.get('/api/properties?page_size=10&view=card')
+
+    assert len(card.get_json()['properties']) == 10
+    assert len(card.data) < len(full.data) / 4
+
+
+@pytest.fixture
+def create_listing(client, owner, login):
+    """Creates a property through POST /api/properties, which keeps the search index in sync."""
+    login(owner)
+
+    def create_listing(title, description='A home', amenities=None):
+        response = client.post('/api/properties', json={
+            'title': title, 'description': description, 'amenities': amenities, 'price': 100000,
+            'location': {'address': '1 Road', 'city': 'Lagos', 'state': 'Lagos', 'zipCode': '100001'},
+        })
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()['id']
+    return create_listing
+
+
+def _search(client, keywords, **args):
+    response = client.get('/api/properties', query_string={'keywords': keywords, **args})
+    assert response.status_code == 200, response.get_json()
+    return [p['title'] for p in response.get_json()['properties']]
+
+
+def test_keyword_search_sorted_by_relevance(client, create_listing):
+    create_listing('City loft', 'Near the garden market')
+    create_listing('Garden villa', 'Garden views from every room, a private garden', amenities='garden, pool')
+    create_listing('Quiet flat', 'Top floor')
+    create_listing('Garden flat', 'Ground floor')
+
+    assert _search(client, 'garden', sort='relevance') == ['Garden villa', 'Garden flat', 'City loft']
+    assert _search(client, 'garden', sort='relevance', cursor='') == ['Garden villa', 'Garden flat', 'City loft']
+    assert _search(client, 'gard') != [] # Prefix terms
+
+
+def test_search_index_follows_updates_and_deletes(client, create_listing):
+    property_id = create_listing('Harbour cottage')
+    assert _search(client, 'harbour') == ['Harbour cottage']
+
+    assert client.put(f'/api/properties/{property_id}', json={'title': 'Lakeside cottage'}).status_code == 200
+    assert _search(client, 'lakeside') == ['Lakeside cottage']
+    assert _search(client, 'harbour') == []
+
+    assert client.delete(f'/api/properties/{property_id}').status_code == 200
+    assert _search(client, 'lakeside') == []
+
+
+def test_imported_properties_are_searchable(client, make_user, login):
+    login(make_user('admin', role='admin'))
+    csv = (
+        'title,description,price,address,city,state,zip_code,latitude,longitude,images\n'
+        'Imported bungalow,Seaside,1000,1 Road,Lagos,Lagos,100001,,,\n'
+    )
+
+    response = client.post('/api/properties/import', data=csv, content_type='text/csv')
+
+    assert response.status_code == 200, response.get_json()
+    assert _search(client, 'bungalow') == ['Imported bungalow']
+
+
+def test_startup_indexes_rows_written_outside_the_routes(client, owner, make_property):
+    make_property(owner, title='Unindexed mansion') # Written straight to the database
+    assert _search(client, 'mansion') == []
+
+    init_search_index()
+
+    assert _search(client, 'mansion', page_size=11) == ['Unindexed mansion'] # Another cache key
+
+
+@pytest.fixture
+def facet_listings(owner, make_property):
+    for city, property_type, status, bedrooms, price in [
+        ('Lagos', 'apartment', 'for_sale', 2, 80000.0),
+        ('Lagos', 'apartment', 'for_rent', 3, 120000.0),
+        ('Lagos', 'house', 'for_sale', 6, 900000.0),
+        ('Abuja', 'house', 'for_sale', 4, 300000.0),
+        ('Abuja', None, 'for_rent', 1, 40000.0),
+    ]:
+        make_property(owner, images=0, city=city, state=city, property_type=property_type, status=status, bedrooms=bedrooms, price=price)
+
+
+def test_facet_counts(client, facet_listings):
+    body = client.get('/api/properties?facets=property_type,status,city,bedrooms,price').get_json()
+
+    assert body['facets'] == {
+        'property_type': {'apartment': 2, 'house': 2}, # NULL skipped
+        'status': {'for_sale': 3, 'for_rent': 2},
+        'city': {'Lagos': 3, 'Abuja': 2},
+        'bedrooms': {'1': 1, '2': 1, '3': 1, '4': 1, '5+': 1},
+        'price': {'0-50000': 1, '50000-100000': 1, '100000-250000': 1, '250000-500000': 1, '500000-1000000': 1},
+    }
+    assert body['total'] == 5
+
+
+def test_facet_counts_follow_the_other_filters(client, facet_listings, statements):
+    statements.reset()
+
+    body = client.get('/api/properties?facets=property_type,status&location=lagos&minPrice=100000').get_json()
+
+    assert body['total'] == 2
+    assert body['facets'] == {'property_type': {'apartment': 1, 'house': 1}, 'status': {'for_rent': 1, 'for_sale': 1}}
+    # One GROUP BY for both facets, with the same WHERE clause as the page
+    [facets] = [sql for sql in statements.statements if 'GROUP BY' in sql]
+    assert 'property.price >=' in facets and 'lower(property.city) LIKE' in facets
+
+
+def test_unknown_facet_is_rejected(client):
+    assert client.get('/api/properties?facets=colour').status_code == 400
@@ -0,0 +1,200 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import Chat, Favorite, Inquiry, Message, Property, User
+from services.serializers import compile_serializer, isoformat
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+# The hand-written serialize() methods the compiled serializers replaced, kept as the reference output.
+# Since then longitude is a real column and images carry their size and derivatives.
+
+def old_user(user):
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'phone_number': user.phone_number,
+        'profile_image': user.profile_image,
+        'is_active': user.is_active,
+        'role': user.role,
+        'created_at': _iso(user.created_at),
+        'updated_at': _iso(user.updated_at),
+    }
+
+
+def old_property(prop):
+    return {
+        'id': str(prop.id),
+        'title': prop.title,
+        'description': prop.description,
+        'price': prop.price,
+        'is_featured': prop.is_featured,
+        'location': {
+            'address': prop.address,
+            'city': prop.city,
+            'state': prop.state,
+            'zipCode': prop.zip_code,
+            'latitude': prop.latitude,
+            'longitude': prop.longitude,
+        },
+        'propertyType': prop.property_type,
+        'status': prop.status,
+        'features': {
+            'bedrooms': prop.bedrooms,
+            'bathrooms': prop.bathrooms,
+            'area': prop.area,
+            'yearBuilt': prop.year_built,
+            'parking': None,
+        },
+        'amenities': [amenity.strip() for amenity in prop.amenities.split(',')] if prop.amenities else [],
+        'images': [img.url for img in prop.images] if prop.images else [],
+        'ownerId': str(prop.user_id),
+        'createdAt': _iso(prop.created_at),
+        'updatedAt': _iso(prop.updated_at),
+        'isFeatured': False,
+    }
+
+
+def old_message(message):
+    return {
+        'id': message.id,
+        'message': message.message,
+        'chat_id': message.chat_id,
+        'sender_id': message.sender_id,
+        'created_at': _iso(message.created_at),
+        'updated_at': _iso(message.updated_at),
+    }
+
+
+def old_chat(chat, include_property=False):
+    return {
+        'id': chat.id,
+        'sender_id': chat.sender_id,
+        'sender': old_user(chat.sender),
+        'receiver_id': chat.receiver_id,
+        'receiver': old_user(chat.receiver),
+        'property_id': chat.property_id,
+        'last_message': old_message(chat.last_message),
+        'is_read': chat.is_read,
+        'last_message_sender_id': chat.last_message_sender_id,
+        'created_at': _iso(chat.created_at),
+        'updated_at': _iso(chat.updated_at),
+        'property': old_property(chat.property) if include_property else None,
+    }
+
+
+def old_inquiry(inquiry):
+    return {
+        'id': inquiry.id,
+        'name': inquiry.name,
+        'email': inquiry.email,
+        'message': inquiry.message,
+        'property_id': inquiry.property_id,
+        'property': old_property(inquiry.property) if inquiry.property else None,
+        'created_at': _iso(inquiry.created_at),
+        'updated_at': _iso(inquiry.updated_at),
+        'user_id': inquiry.user_id,
+        'status': inquiry.status,
+    }
+
+
+def old_favorite(favorite):
+    return {
+        'id': favorite.id,
+        'user_id': favorite.user_id,
+        'property_id': favorite.property_id,
+        'created_at': _iso(favorite.created_at),
+        'updated_at': _iso(favorite.updated_at),
+    }
+
+
+@pytest.fixture
+def records(db, make_user, make_property):
+    """One of each model, read back from the database."""
+    owner, buyer = make_user('owner'), make_user('buyer')
+    prop = make_property(owner, images=3, amenities='Pool, Gym ,Garden', latitude=6.45, longitude=3.39, year_built=2010)
+    bare = make_property(owner, images=0, amenities=None)
+    chat = Chat(sender_id=buyer.id, receiver_id=owner.id, property_id=prop.id, last_message_sender_id=buyer.id)
+    db.session.add(chat)
+    db.session.flush()
+    chat.last_message = Message(message='Still available?', chat_id=chat.id, sender_id=buyer.id)
+    db.session.add_all([
+        chat.last_message,
+        Inquiry(name='Buyer', email='buyer@example.com', message='Hello', property_id=prop.id, user_id=buyer.id),
+        Favorite(user_id=buyer.id, property_id=prop.id),
+    ])
+    db.session.commit()
+    ids = {'owner': owner.id, 'prop': prop.id, 'bare': bare.id, 'chat': chat.id}
+    db.session.expunge_all()
+    return ids
+
+
+def test_compiled_serializers_match_the_old_output(db, records):
+    owner = db.session.get(User, records['owner'])
+    prop, bare = db.session.get(Property, records['prop']), db.session.get(Property, records['bare'])
+    chat = db.session.get(Chat, records['chat'])
+    inquiry, favorite = Inquiry.query.one(), Favorite.query.one()
+
+    assert owner.serialize() == old_user(owner)
+    assert prop.serialize() == old_property(prop)
+    assert prop.serialize()['amenities'] == ['Pool', 'Gym', 'Garden'] and len(prop.serialize()['images']) == 3
+    assert bare.serialize() == old_property(bare)
+    assert bare.serialize()['amenities'] == [] and bare.serialize()['images'] == []
+    assert chat.last_message.serialize() == old_message(chat.last_message)
+    assert chat.serialize() == old_chat(chat)
+    assert chat.serialize(include_property=True) == old_chat(chat, include_property=True)
+    assert inquiry.serialize() == old_inquiry(inquiry)
+    assert inquiry.serialize(include_property=False)['property'] is None
+    assert favorite.serialize() == old_favorite(favorite)
+
+
+def test_expired_attributes_are_loaded_on_demand(db, records):
+    prop = db.session.get(Property, records['prop'])
+    expected = old_property(prop)
+    db.session.commit() # Expires every attribute, relationships included
+
+    assert 'title' not in prop.__dict__
+    assert prop.serialize() == expected
+
+
+def test_objects_serialized_before_and_after_a_commit_agree(db):
+    user = User(username='fresh', email='fresh@example.com', password='x')
+    user.created_at = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc) # Aware, like the column defaults
+    db.session.add(user)
+    db.session.flush()
+    before, user_id = user.serialize(), user.id
+    db.session.commit()
+    db.session.expunge_all()
+
+    after = db.session.get(User, user_id).serialize()
+
+    assert before['created_at'] == after['created_at'] == '2024-05-01T12:30:00'
+
+
+@pytest.mark.parametrize('value, expected', [
+    (datetime(2024, 5, 1, 13, 30, tzinfo=timezone(timedelta(hours=1))), '2024-05-01T12:30:00'),
+    (datetime(2024, 5, 1, 0, 15, 0, 250, tzinfo=timezone(timedelta(hours=2))), '2024-04-30T22:15:00.000250'),
+    (datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc), '2024-05-01T12:30:00'),
+    (datetime(2024, 5, 1, 12, 30), '2024-05-01T12:30:00'), # Naive values are already UTC
+    (None, None),
+])
+def test_isoformat_is_naive_utc(value, expected):
+    assert isoformat(value) == expected
+
+
+def test_compile_serializer_shapes():
+    class Row:
+        def __init__(self, **values):
+            self.__dict__.update(values)
+
+    serialize = compile_serializer({'id': ('id', str), 'where': {'city': 'city'}}, 'Row.serialize')
+
+    assert serialize(Row(id=7, city='Lagos')) == {'id': '7', 'where': {'city': 'Lagos'}}
+    assert serialize.__name__ == 'Row.serialize'
@@ -0,0 +1,65 @@
+import io
+from urllib.parse import urlsplit
+
+import pytest
+
+from services import storage as storage_module
+from services.storage import CloudinaryStorage, storage
+
+
+@pytest.fixture
+def app_config():
+    return {'UPLOAD_MAX_BYTES': 1024, 'MAX_CONTENT_LENGTH': 1024 + 1024}
+
+
+@pytest.fixture
+def logged_in(make_user, login):
+    login(make_user('uploader'))
+
+
+def _direct_target(client):
+    response = client.post('/api/upload/token', json={'content_type': 'image/png', 'size': 3})
+    assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    return body['key'], urlsplit(body['upload']['url']).path
+
+
+def test_multipart_upload_over_max_content_length_is_refused(client, logged_in):
+    response = client.post('/api/upload/', data={'image': (io.BytesIO(b'x' * 4096), 'big.png', 'image/png')})
+
+    assert response.status_code == 413
+    assert response.get_json()['error'] == 'Request Entity Too Large'
+
+
+def test_direct_upload_token_is_single_use(client, logged_in):
+    key, path = _direct_target(client)
+
+    first = client.put(path, data=b'one', content_type='image/png')
+    assert first.status_code == 201, first.get_json()
+
+    replay = client.put(path, data=b'two', content_type='image/png')
+    assert replay.status_code == 409
+    with storage.open(key) as stored:
+        assert stored.read() == b'one'
+
+
+def test_cloudinary_open_reads_the_delivery_url(monkeypatch):
+    requested = []
+    monkeypatch.setattr(storage_module.urllib.request, 'urlopen', lambda url, timeout: requested.append(url) or io.BytesIO(b'image'))
+    backend = CloudinaryStorage('demo', 'key', 'secret')
+
+    with backend.open('properties/abc.jpg') as source:
+        assert source.read() == b'image'
+
+    url = urlsplit(requested[0])
+    assert (url.scheme, url.netloc) == ('https', 'res.cloudinary.com')
+    assert url.path.startswith('/demo/image/upload/') and url.path.endswith('/properties/abc.jpg')
+
+
+def test_cloudinary_direct_upload_does_not_overwrite(app):
+    backend = CloudinaryStorage('demo', 'key', 'secret')
+
+    fields = backend.upload_target('properties/abc.jpg', 'image/jpeg', 1024, 900)['fields']
+
+    assert fields['overwrite'] == 'false'
+    assert fields['public_id'] == 'properties/abc'